@@ -1,4 +1,4 @@
-
+import os
 from flask import Flask
 from flask_cors import CORS
 from routes.person_route import person_bp
@@ -8,6 +8,17 @@ from routes.translation_route import translation_bp
 from routes.detection import yolo_bp
 from routes.video_route import video_bp
 from routes.image_route import image_bp
+from routes.stream_route import stream_bp, sock
+from routes.status_route import status_bp
+from routes.speech import speech_bp
+from routes.announce_route import announce_bp
+from routes.metrics_route import metrics_bp
+from services.model_registry import model_registry
+from utils import metrics
+from utils.log import configure_logging
+import config
+
+configure_logging(config.LOG_LEVEL, config.LOG_FORMAT)
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100 MB max upload
@@ -16,7 +27,8 @@ CORS(app, resources={
     r"/*": {
         "origins": "*",
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
+        "allow_headers": ["Content-Type", "X-Frame-Width", "X-Frame-Height", "X-Pixel-Format", "X-Stream-Id", "If-None-Match"],
+        "expose_headers": ["ETag"]
     }
 })
 
@@ -25,9 +37,27 @@ app.register_blueprint(person_bp, url_prefix='/api')
 app.register_blueprint(object_bp)  # Remove url_prefix to match the frontend request
 app.register_blueprint(profile_bp, url_prefix='/api')
 app.register_blueprint(translation_bp, url_prefix='/api')
-app.register_blueprint(yolo_bp, url_prefix='/api')  # YOLO detection endpoints
+app.register_blueprint(yolo_bp)  # YOLO detection endpoints (routes already prefixed /api)
 app.register_blueprint(video_bp)  # Video upload endpoints (routes already prefixed /api)
 app.register_blueprint(image_bp)  # Image upload endpoints
+app.register_blueprint(stream_bp)  # WebSocket streaming detection (routes already prefixed /api)
+app.register_blueprint(status_bp, url_prefix='/api')  # /api/model_status readiness report
+app.register_blueprint(speech_bp, url_prefix='/api')  # /api/speak text-to-speech
+app.register_blueprint(announce_bp, url_prefix='/api')  # /api/announce from precomputed phrases
+app.register_blueprint(metrics_bp)  # /metrics for Prometheus
+metrics.init_app(app)
+sock.init_app(app)
+
+# Models load on first use; those in PRELOAD_MODELS start loading now, in the background.
+# Under gunicorn (SHARED_PRELOAD, see gunicorn.conf.py) they load right here in the master,
+# before the workers are forked, so every worker shares one copy of the weights.
+# Under the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests.
+preload = config.PRELOAD_MODELS.strip()
+preload = preload if preload == 'all' else [m.strip() for m in preload.split(',') if m.strip()]
+if config.SHARED_PRELOAD:
+    model_registry.load_shared(preload)
+elif __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN'):
+    model_registry.preload(preload, max_parallel=config.PRELOAD_PARALLEL)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
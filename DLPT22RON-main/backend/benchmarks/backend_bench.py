@@ -0,0 +1,76 @@
+"""Benchmark YOLOService inference backends (PyTorch, ONNX Runtime, OpenVINO).
+
+Run from the backend directory:
+
+    python benchmarks/backend_bench.py [--backends torch onnx openvino] [--batch 1 4]
+                                       [--signs-dir ../../signs] [--stride 30] [--max-frames 200]
+
+Frames are the images in `signs/` plus frames sampled every `--stride` frames from the
+videos in `signs/New folder/`. Every backend runs the full YOLOService path (both models
+and post-processing); agreement is the box-level F1 against the first backend listed.
+The first run of a non-torch backend includes the one-off export, which is not timed.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.sample_frames import DEFAULT_SIGNS_DIR, load_sample_frames  # noqa: E402
+from benchmarks.compare import agreement_score, detection_agreement, latency_summary  # noqa: E402
+from services.yolo_service import YOLOService  # noqa: E402
+
+
+def run_backend(backend, frames, batch_size, warmup):
+    service = YOLOService(backend=backend)
+    images = [frame for _, frame in frames]
+
+    for i in range(min(warmup, len(images))):
+        service.detect_batch(images[i:i + batch_size])
+
+    results = []
+    durations = []
+    started = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        batch = images[i:i + batch_size]
+        t0 = time.perf_counter()
+        results.extend(service.detect_batch(batch))
+        # Per-frame latency as seen by each frame of the batch
+        durations.extend([time.perf_counter() - t0] * len(batch))
+    elapsed = time.perf_counter() - started
+    return service.backends, results, durations, len(images) / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'openvino'])
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--signs-dir', default=str(DEFAULT_SIGNS_DIR))
+    parser.add_argument('--stride', type=int, default=30, help='sample every Nth video frame')
+    parser.add_argument('--max-frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_sample_frames(args.signs_dir, stride=args.stride, max_frames=args.max_frames)
+    if not frames:
+        sys.exit(f"No images or videos found in {args.signs_dir}")
+    print(f"{len(frames)} frames from {args.signs_dir}\n")
+
+    print(f"{'backend':>20} {'batch':>5} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'fps':>7} {'agreement':>9}")
+    for batch_size in args.batch:
+        reference = None
+        for backend in args.backends:
+            used, results, durations, fps = run_backend(backend, frames, batch_size, args.warmup)
+            if reference is None:
+                reference = results
+            agreement = agreement_score([detection_agreement(r, c) for r, c in zip(reference, results)])
+            summary = latency_summary(durations)
+            label = backend if set(used.values()) == {backend} else f"{backend}->{'/'.join(sorted(set(used.values())))}"
+            print(f"{label:>20} {batch_size:>5} {summary['mean_ms']:>8.1f} {summary['p50_ms']:>8.1f} "
+                  f"{summary['p95_ms']:>8.1f} {fps:>7.1f} {agreement:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
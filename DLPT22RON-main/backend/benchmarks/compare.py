@@ -0,0 +1,64 @@
+"""Helpers shared by the benchmark scripts: latency summaries and detection agreement."""
+import numpy as np
+
+from services.tracker import CATEGORIES, iou_matrix
+
+
+def latency_summary(seconds):
+    """Mean / p50 / p95 / p99 in milliseconds for a list of per-call durations."""
+    ms = np.asarray(seconds, dtype=np.float64) * 1000.0
+    if not len(ms):
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def _flatten(result):
+    detections = []
+    for category in CATEGORIES:
+        for detection in result.get(category, []):
+            label = 'person' if category == 'persons' else detection['label']
+            detections.append((label, detection['box']))
+    return detections
+
+
+def detection_agreement(reference, candidate, iou_threshold=0.5):
+    """Match two results box-to-box (same label, IoU >= threshold).
+
+    Returns (matched, reference count, candidate count); agreement is
+    2 * matched / (reference + candidate), i.e. the F1 score of candidate vs reference.
+    """
+    ref = _flatten(reference)
+    cand = _flatten(candidate)
+    if not ref or not cand:
+        return 0, len(ref), len(cand)
+
+    ious = iou_matrix([box for _, box in ref], [box for _, box in cand])
+    for i, (ref_label, _) in enumerate(ref):
+        for j, (cand_label, _) in enumerate(cand):
+            if ref_label != cand_label:
+                ious[i, j] = 0.0
+
+    matched = 0
+    used_ref, used_cand = set(), set()
+    for flat in np.argsort(-ious, axis=None):
+        i, j = np.unravel_index(flat, ious.shape)
+        if ious[i, j] < iou_threshold:
+            break
+        if i in used_ref or j in used_cand:
+            continue
+        used_ref.add(i)
+        used_cand.add(j)
+        matched += 1
+    return matched, len(ref), len(cand)
+
+
+def agreement_score(pairs):
+    """Overall F1 agreement from a list of `detection_agreement` tuples (1.0 when both are empty)."""
+    matched = sum(m for m, _, _ in pairs)
+    total = sum(r + c for _, r, c in pairs)
+    return round(2.0 * matched / total, 4) if total else 1.0
@@ -0,0 +1,281 @@
+"""HTTP load test: many camera clients posting frames to the detection endpoints at once.
+
+Run from the backend directory, against a running server or one started for the run:
+
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --clients 1 8 32 --fps 5
+    python benchmarks/load_test.py --start --server-env GUNICORN_THREADS=8 --server-env YOLO_BATCH_MAX_SIZE=1 \\
+                                   --clients 8 32 --label threads8-nobatch --json nobatch.json
+    python benchmarks/load_test.py --compare batched.json nobatch.json
+
+Frames are sampled every `--stride` frames from the clips in `signs/New folder/`,
+resized to `--width` and JPEG-encoded once, then posted as `{"frame": "data:image/jpeg;base64,..."}`
+like the browser does. Each post carries a unique JPEG comment, which leaves the pixels
+unchanged but keeps the server's result caches from answering a replayed frame that a
+real camera would never send twice. `--cacheable` posts the frames unchanged instead. Each client is a thread playing a camera at `--fps`: it
+posts a frame, waits for the answer, and skips the frames that came up while it
+waited. Those skipped frames are counted as dropped. `--fps 0` posts back to back.
+Clients are spread over `--endpoints` and start at different frames.
+
+Each `--clients` step runs for `--duration` seconds. Per `--interval` window it reports
+throughput, latency percentiles, error rate and dropped frames, then totals per
+endpoint. `--start` runs `gunicorn -c gunicorn.conf.py app:app` on a free port with
+`--server-env` overrides, preloading `yolo,person` unless PRELOAD_MODELS is given.
+Save several runs with `--json` and print them side by side with `--compare`.
+"""
+import argparse
+import base64
+import json
+import os
+import signal
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import cv2
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.compare import latency_summary  # noqa: E402
+from benchmarks.memory_report import _free_port, _wait_ready  # noqa: E402
+from utils.sample_frames import DEFAULT_SIGNS_DIR, iter_video_frames  # noqa: E402
+
+DEFAULT_ENDPOINTS = ['/api/yolo/detect', '/api/detect_persons']
+
+
+def encode_frames(args):
+    """JPEG bytes of the sampled video frames, encoded once up front."""
+    frames = []
+    for _, frame in iter_video_frames(Path(args.signs_dir) / 'New folder', args.stride):
+        if args.width and frame.shape[1] != args.width:
+            height = round(frame.shape[0] * args.width / frame.shape[1])
+            frame = cv2.resize(frame, (args.width, height), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, args.quality])
+        if ok:
+            frames.append(jpeg.tobytes())
+        if args.max_frames and len(frames) >= args.max_frames:
+            break
+    return frames
+
+
+def request_body(jpeg, tag=None):
+    """The browser's JSON payload; `tag` goes into a JPEG comment (COM) segment right after SOI."""
+    if tag is not None:
+        comment = tag.encode()
+        jpeg = jpeg[:2] + b'\xff\xfe' + struct.pack('>H', len(comment) + 2) + comment + jpeg[2:]
+    return json.dumps({"frame": 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii')}).encode()
+
+
+def post(url, body, timeout):
+    """(HTTP status, or 0 when the request failed without one)."""
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+class Client(threading.Thread):
+    """One camera: a frame every 1/fps seconds, at most one request in flight."""
+
+    def __init__(self, index, url, endpoint, frames, offset, fps, unique, started, deadline, timeout):
+        super().__init__(name=f'client-{index}', daemon=True)
+        self.url = url + endpoint
+        self.endpoint = endpoint
+        self.frames = frames
+        self.offset = offset
+        self.unique = unique
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.started = started
+        self.deadline = deadline
+        self.timeout = timeout
+        self.requests = []  # (completed at, latency s, status), times relative to the step start
+        self.dropped = []   # times of frames skipped while a request was in flight
+
+    def run(self):
+        frame = self.offset
+        due = time.perf_counter()
+        while due < self.deadline:
+            body = request_body(self.frames[frame % len(self.frames)], f"{self.name}:{frame}" if self.unique else None)
+            now = time.perf_counter()
+            if now < due:
+                time.sleep(due - now)
+            sent = time.perf_counter()
+            status = post(self.url, body, self.timeout)
+            done = time.perf_counter()
+            self.requests.append((done - self.started, done - sent, status))
+            frame += 1
+            if not self.interval:
+                due = done
+                continue
+            due += self.interval
+            while due < done and due < self.deadline:  # frames that came up during the request
+                self.dropped.append(due - self.started)
+                frame += 1
+                due += self.interval
+
+
+def summarize(requests, dropped, seconds):
+    ok = [latency for _, latency, status in requests if status == 200]
+    return {
+        "requests": len(requests),
+        "throughput_rps": round(len(ok) / seconds, 2) if seconds else 0.0,
+        "error_rate": round(1.0 - len(ok) / len(requests), 4) if requests else 0.0,
+        "dropped_frames": len(dropped),
+        **latency_summary(ok),
+    }
+
+
+def run_step(args, frames, clients):
+    started = time.perf_counter()
+    deadline = started + args.duration
+    # Clients start evenly spread over the frames so they do not post identical ones
+    threads = [Client(i, args.url, args.endpoints[i % len(args.endpoints)], frames, i * len(frames) // clients,
+                      args.fps, not args.cacheable, started, deadline, args.timeout) for i in range(clients)]
+    for client in threads:
+        client.start()
+    for client in threads:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    requests = [r for client in threads for r in client.requests]
+    dropped = [d for client in threads for d in client.dropped]
+    # Window boundaries; requests still in flight at the deadline finish in the last window
+    bounds = [args.interval * i for i in range(int(elapsed / args.interval) + 1)]
+    if elapsed - bounds[-1] > args.interval / 2 or len(bounds) == 1:
+        bounds.append(elapsed)
+    else:
+        bounds[-1] = elapsed
+    timeline = [
+        dict(t=round(end, 1),
+             **summarize([r for r in requests if start <= r[0] <= end], [d for d in dropped if start <= d <= end],
+                         end - start))
+        for start, end in zip(bounds, bounds[1:])
+    ]
+    endpoints = {
+        endpoint: summarize([r for client in threads if client.endpoint == endpoint for r in client.requests],
+                            [d for client in threads if client.endpoint == endpoint for d in client.dropped],
+                            elapsed)
+        for endpoint in args.endpoints
+    }
+    return {"clients": clients, "total": summarize(requests, dropped, elapsed), "endpoints": endpoints,
+            "timeline": timeline}
+
+
+def print_row(name, stats):
+    print(f"{name:>22} {stats['requests']:>7} {stats['throughput_rps']:>7.1f} {stats['error_rate']:>7.1%} "
+          f"{stats['dropped_frames']:>8} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+
+def print_header(first):
+    print(f"{first:>22} {'reqs':>7} {'ok/s':>7} {'errors':>7} {'dropped':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8}")
+
+
+def start_server(server_env, timeout):
+    port = _free_port()
+    env = dict(os.environ, GUNICORN_BIND=f'127.0.0.1:{port}')
+    env.setdefault('PRELOAD_MODELS', 'yolo,person')
+    for item in server_env:
+        name, _, value = item.partition('=')
+        env[name] = value
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                              cwd=str(BACKEND_DIR), env=env)
+    if not _wait_ready(port, timeout):
+        stop_server(server)
+        sys.exit(f"Server did not report ready within {timeout}s")
+    return server, f'http://127.0.0.1:{port}'
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def compare_reports(paths):
+    print_header('run / clients')
+    for path in paths:
+        with open(path) as f:
+            report = json.load(f)
+        for step in report["steps"]:
+            print_row(f"{report['label']} / {step['clients']}", step["total"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server to test (ignored with --start)')
+    parser.add_argument('--start', action='store_true', help='start gunicorn on a free port for the run')
+    parser.add_argument('--server-env', action='append', default=[], metavar='NAME=VALUE',
+                        help='environment override for the started server (repeatable)')
+    parser.add_argument('--server-timeout', type=float, default=600.0, help='seconds to wait for the server')
+    parser.add_argument('--endpoints', nargs='+', default=DEFAULT_ENDPOINTS)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32], help='client counts, one step each')
+    parser.add_argument('--fps', type=float, default=5.0, help='frames per second per client (0 = back to back)')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per step')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds per timeline window')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout')
+    parser.add_argument('--signs-dir', default=str(DEFAULT_SIGNS_DIR))
+    parser.add_argument('--stride', type=int, default=15, help='sample every Nth video frame')
+    parser.add_argument('--max-frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=640, help='resize frames to this width (0 = as recorded)')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality')
+    parser.add_argument('--cacheable', action='store_true', help='repeat frames byte for byte (result caches can hit)')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per endpoint before the first step')
+    parser.add_argument('--label', default='run', help='name of this run in --compare')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--compare', nargs='+', metavar='REPORT', help='print saved reports side by side and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare_reports(args.compare)
+
+    frames = encode_frames(args)
+    if not frames:
+        sys.exit(f"No video frames found in {Path(args.signs_dir) / 'New folder'}")
+    print(f"{len(frames)} frames, {sum(map(len, frames)) * 4 // 3 // len(frames) // 1024} KB per request")
+
+    server = None
+    if args.start:
+        server, args.url = start_server(args.server_env, args.server_timeout)
+    try:
+        for endpoint in args.endpoints:
+            for i, jpeg in enumerate(frames[:args.warmup]):
+                post(args.url + endpoint, request_body(jpeg, f"warmup:{i}"), args.timeout)
+
+        report = {"label": args.label, "url": args.url, "server_env": args.server_env,
+                  "settings": {key: getattr(args, key) for key in
+                               ('endpoints', 'fps', 'duration', 'stride', 'width', 'quality', 'cacheable')},
+                  "steps": []}
+        for clients in args.clients:
+            step = run_step(args, frames, clients)
+            report["steps"].append(step)
+            print(f"\n{clients} clients at {args.fps:g} fps for {args.duration:g}s")
+            print_header('window end s')
+            for window in step["timeline"]:
+                print_row(f"{window['t']:.1f}", window)
+            for endpoint, stats in step["endpoints"].items():
+                print_row(endpoint, stats)
+            print_row('total', step["total"])
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Per-worker RSS and PSS of the backend under gunicorn, with and without shared model weights.
+
+Run from the backend directory (Linux only, reads /proc/<pid>/smaps_rollup):
+
+    python benchmarks/memory_report.py --pid <gunicorn master pid>
+    python benchmarks/memory_report.py --compare [--workers 3] [--models yolo,object,person]
+
+--pid reports a running server: the master and each of its workers. --compare starts
+`gunicorn -c gunicorn.conf.py app:app` twice on a free port, first with every worker
+loading its own models (SHARED_PRELOAD=0, before) and then with the master loading them
+before the fork (SHARED_PRELOAD=1, after), waits until /api/model_status is ready and
+memory has settled, and prints both reports. RSS counts shared pages in every process
+that maps them; PSS divides them between those processes, so the PSS total is the
+server's real footprint.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.memory import child_pids, smaps_rollup_mb  # noqa: E402
+
+
+def process_report(master_pid):
+    processes = [('master', master_pid)] + [('worker', pid) for pid in child_pids(master_pid)]
+    rows = []
+    for role, pid in processes:
+        try:
+            rows.append(dict(role=role, pid=pid, **smaps_rollup_mb(pid)))
+        except OSError:
+            continue  # exited meanwhile
+    workers = [row for row in rows if row['role'] == 'worker']
+    return {
+        "processes": rows,
+        "total_rss_mb": round(sum(row['rss_mb'] for row in rows), 1),
+        "total_pss_mb": round(sum(row['pss_mb'] for row in rows), 1),
+        "avg_worker_rss_mb": round(sum(row['rss_mb'] for row in workers) / len(workers), 1) if workers else 0.0,
+        "avg_worker_pss_mb": round(sum(row['pss_mb'] for row in workers) / len(workers), 1) if workers else 0.0,
+    }
+
+
+def print_report(title, report):
+    print(f"\n{title}")
+    print(f"{'role':>8} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'shared MB':>10} {'private MB':>11}")
+    for row in report['processes']:
+        print(f"{row['role']:>8} {row['pid']:>8} {row['rss_mb']:>9.1f} {row['pss_mb']:>9.1f} "
+              f"{row['shared_mb']:>10.1f} {row['private_mb']:>11.1f}")
+    print(f"{'total':>8} {'':>8} {report['total_rss_mb']:>9.1f} {report['total_pss_mb']:>9.1f}")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/model_status', timeout=5) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(1.0)
+    return False
+
+
+def _wait_settled(master_pid, workers, timeout, tolerance_mb=2.0):
+    """Until all workers exist and no process's RSS moved by more than `tolerance_mb` for 3 s."""
+    deadline = time.monotonic() + timeout
+    previous = None
+    while time.monotonic() < deadline:
+        report = process_report(master_pid)
+        current = {row['pid']: row['rss_mb'] for row in report['processes']}
+        if len(current) == workers + 1 and previous is not None and current.keys() == previous.keys() \
+                and all(abs(current[pid] - previous[pid]) <= tolerance_mb for pid in current):
+            return report
+        previous = current
+        time.sleep(3.0)
+    return process_report(master_pid)
+
+
+def run_server(shared, workers, models, timeout):
+    port = _free_port()
+    env = dict(os.environ, SHARED_PRELOAD='1' if shared else '0', PRELOAD_MODELS=models,
+               WEB_CONCURRENCY=str(workers), GUNICORN_BIND=f'127.0.0.1:{port}')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                              cwd=str(BACKEND_DIR), env=env)
+    try:
+        if not _wait_ready(port, timeout):
+            print(f"Server did not report ready within {timeout}s, measuring anyway")
+        return _wait_settled(server.pid, workers, timeout)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pid', type=int, help='report a running gunicorn master and its workers')
+    parser.add_argument('--compare', action='store_true', help='start gunicorn without and with shared weights')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--models', default='yolo,object,person', help='PRELOAD_MODELS for --compare')
+    parser.add_argument('--timeout', type=float, default=600.0)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    if args.pid:
+        report = process_report(args.pid)
+        print_report(f"gunicorn master {args.pid}", report)
+    elif args.compare:
+        before = run_server(False, args.workers, args.models, args.timeout)
+        print_report(f"Before: {args.workers} workers each loading {args.models}", before)
+        after = run_server(True, args.workers, args.models, args.timeout)
+        print_report(f"After: {args.models} loaded once in the master, shared copy-on-write", after)
+        saved = before['total_pss_mb'] - after['total_pss_mb']
+        print(f"\nTotal PSS {before['total_pss_mb']:.1f} MB -> {after['total_pss_mb']:.1f} MB "
+              f"({saved:.1f} MB saved)")
+        report = {"before": before, "after": after, "saved_pss_mb": round(saved, 1)}
+    else:
+        parser.error('pass --pid or --compare')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Micro-benchmark: vectorized YOLO post-processing vs. the original per-box loop.
+
+Run from the backend directory:
+
+    python benchmarks/postprocess_bench.py [--counts 10 50 100 300 1000] [--repeat 50]
+
+Uses ultralytics' real `Boxes` (torch tensors) when available so the legacy loop pays
+the same per-box tensor indexing cost as in production; otherwise a NumPy stand-in.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.yolo_postprocess import build_real_width_table, postprocess_general  # noqa: E402
+
+TRAFFIC_COCO_IDS = {9, 11, 12, 13}
+FOCAL_LENGTH = 615
+
+
+def load_tables():
+    with open(BACKEND_DIR / 'src/dataset/coco.names', 'rt') as f:
+        class_names = f.read().rstrip('\n').split('\n')
+    average_sizes = {}
+    with open(BACKEND_DIR / 'src/dataset/average_sizes.txt', 'rt') as f:
+        for line in f:
+            obj, size = line.strip().split(',')
+            average_sizes[obj.strip()] = float(size.strip())
+    return class_names, average_sizes
+
+
+class _NumpyBoxes:
+    """Minimal stand-in for ultralytics.engine.results.Boxes."""
+
+    def __init__(self, data):
+        self.data = data
+        self.xyxy = data[:, :4]
+        self.conf = data[:, 4]
+        self.cls = data[:, 5]
+
+    def __iter__(self):
+        for i in range(len(self.data)):
+            yield _NumpyBoxes(self.data[i:i + 1])
+
+
+def make_boxes(count, frame_width, frame_height, n_classes, rng):
+    x1 = rng.uniform(0, frame_width - 50, count)
+    y1 = rng.uniform(0, frame_height - 50, count)
+    data = np.stack([
+        x1, y1,
+        x1 + rng.uniform(10, 200, count), y1 + rng.uniform(10, 200, count),
+        rng.uniform(0.35, 1.0, count),
+        rng.integers(0, n_classes, count),
+    ], axis=1).astype(np.float32)
+
+    try:
+        import torch
+        from ultralytics.engine.results import Boxes
+        return Boxes(torch.from_numpy(data), (frame_height, frame_width)), 'ultralytics'
+    except ImportError:
+        return _NumpyBoxes(data), 'numpy'
+
+
+def legacy_postprocess(boxes, frame_width, class_names, average_sizes):
+    """The per-box loop YOLOService used before vectorization."""
+    objects, persons, traffic_signs = [], [], []
+    person_count = 0
+    for box in boxes:
+        x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
+        w = x2 - x1
+        center_x = (x1 + x2) / 2
+        class_id = int(box.cls[0])
+        confidence = float(box.conf[0])
+        if class_id < len(class_names):
+            label = class_names[class_id].lower()
+        else:
+            continue
+        distance = None
+        if label in average_sizes:
+            distance = (average_sizes[label] * FOCAL_LENGTH) / (w + 1e-6)
+        if center_x < frame_width // 3:
+            position = "left"
+        elif center_x < 2 * (frame_width // 3):
+            position = "center"
+        else:
+            position = "right"
+        detection = {
+            "label": label,
+            "confidence": confidence,
+            "position": position,
+            "distance": f"{distance:.1f}m" if distance else None,
+            "box": [x1, y1, x2, y2]
+        }
+        if class_id == 0:
+            person_count += 1
+            detection["label"] = f"Person {person_count}"
+            persons.append(detection)
+        elif class_id in TRAFFIC_COCO_IDS:
+            detection["type"] = "traffic_sign"
+            traffic_signs.append(detection)
+        else:
+            objects.append(detection)
+    return {"objects": objects, "persons": persons, "traffic_signs": traffic_signs, "person_count": person_count}
+
+
+def vectorized_postprocess(boxes, frame_width, class_names, real_widths):
+    return postprocess_general(
+        np.asarray(boxes.xyxy), np.asarray(boxes.cls), np.asarray(boxes.conf),
+        frame_width, class_names, real_widths, FOCAL_LENGTH, TRAFFIC_COCO_IDS
+    )
+
+
+def time_it(fn, repeat):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return np.median(samples) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 50, 100, 300, 1000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    class_names, average_sizes = load_tables()
+    real_widths = build_real_width_table(class_names, average_sizes)
+    rng = np.random.default_rng(0)
+    frame_width, frame_height = 1280, 720
+
+    print(f"{'boxes':>6} {'legacy ms':>10} {'vector ms':>10} {'speedup':>8}  backend")
+    for count in args.counts:
+        boxes, backend = make_boxes(count, frame_width, frame_height, len(class_names), rng)
+
+        legacy = legacy_postprocess(boxes, frame_width, class_names, average_sizes)
+        vectorized = vectorized_postprocess(boxes, frame_width, class_names, real_widths)
+        if legacy != vectorized:
+            raise SystemExit(f"Output mismatch at {count} boxes")
+
+        legacy_ms = time_it(lambda: legacy_postprocess(boxes, frame_width, class_names, average_sizes), args.repeat)
+        vector_ms = time_it(lambda: vectorized_postprocess(boxes, frame_width, class_names, real_widths), args.repeat)
+        print(f"{count:>6} {legacy_ms:>10.3f} {vector_ms:>10.3f} {legacy_ms / vector_ms:>7.1f}x  {backend}")
+
+
+if __name__ == '__main__':
+    main()
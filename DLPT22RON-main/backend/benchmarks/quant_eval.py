@@ -0,0 +1,118 @@
+"""Accuracy-vs-speed report for the INT8 model variants (YOLOService and PersonService).
+
+Run from the backend directory:
+
+    python benchmarks/quant_eval.py [--services yolo person] [--yolo-fp32-backend onnx]
+                                    [--signs-dir ../../signs] [--stride 30] [--max-frames 100]
+
+Each variant is loaded in its own subprocess so memory numbers are not polluted by the
+other models. Reports model load memory, peak RSS, per-frame latency and box-level
+agreement (F1 at IoU 0.5, same label) of INT8 against FP32 on the same frames.
+The first INT8 run also calibrates and caches the quantized model (not timed).
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.compare import agreement_score, detection_agreement, latency_summary  # noqa: E402
+from utils.memory import current_rss_mb, peak_rss_mb  # noqa: E402
+from services.quantization import PRECISIONS  # noqa: E402
+from utils.sample_frames import DEFAULT_SIGNS_DIR, load_sample_frames  # noqa: E402
+
+
+def build_service(service, precision, yolo_fp32_backend):
+    if service == 'yolo':
+        from services.yolo_service import YOLOService
+        svc = YOLOService(backend=yolo_fp32_backend, precision=precision)
+        return svc.detect_objects, '/'.join(sorted(set(svc.backends.values())))
+    from services.person_service import PersonService
+    svc = PersonService(precision=precision)
+    return svc.detect_persons, f"torch-{svc.precision}"
+
+
+def run_variant(args):
+    """Subprocess body: load one variant, time it on the sample frames and dump JSON."""
+    service, precision = args.run.split(':')
+    frames = load_sample_frames(args.signs_dir, stride=args.stride, max_frames=args.max_frames)
+
+    rss_before = current_rss_mb()
+    detect, runtime = build_service(service, precision, args.yolo_fp32_backend)
+    rss_loaded = current_rss_mb()
+
+    for _, frame in frames[:args.warmup]:
+        detect(frame)
+
+    durations, results = [], []
+    for _, frame in frames:
+        t0 = time.perf_counter()
+        results.append(detect(frame))
+        durations.append(time.perf_counter() - t0)
+
+    with open(args.out, 'w') as f:
+        json.dump({
+            "runtime": runtime,
+            "model_mb": round(rss_loaded - rss_before, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "latency": latency_summary(durations),
+            "results": results,
+        }, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--services', nargs='+', default=['yolo', 'person'], choices=['yolo', 'person'])
+    parser.add_argument('--yolo-fp32-backend', default='onnx', help='runtime of the YOLO FP32 baseline')
+    parser.add_argument('--signs-dir', default=str(DEFAULT_SIGNS_DIR))
+    parser.add_argument('--stride', type=int, default=30, help='sample every Nth video frame')
+    parser.add_argument('--max-frames', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        return run_variant(args)
+
+    report = {}
+    print(f"{'variant':>13} {'runtime':>12} {'model MB':>9} {'peak MB':>8} {'mean ms':>8} "
+          f"{'p95 ms':>8} {'speedup':>8} {'agreement':>9}")
+    for service in args.services:
+        variants = {}
+        for precision in PRECISIONS:
+            with tempfile.NamedTemporaryFile(suffix='.json') as out:
+                cmd = [sys.executable, __file__, '--run', f'{service}:{precision}', '--out', out.name,
+                       '--yolo-fp32-backend', args.yolo_fp32_backend, '--signs-dir', args.signs_dir,
+                       '--stride', str(args.stride), '--max-frames', str(args.max_frames),
+                       '--warmup', str(args.warmup)]
+                subprocess.run(cmd, check=True, cwd=str(BACKEND_DIR))
+                with open(out.name) as f:
+                    variants[precision] = json.load(f)
+
+        baseline = variants['fp32']
+        for precision, variant in variants.items():
+            pairs = [detection_agreement(r, c) for r, c in zip(baseline['results'], variant['results'])]
+            variant['agreement'] = agreement_score(pairs)
+            variant['speedup'] = round(baseline['latency']['mean_ms'] / variant['latency']['mean_ms'], 2) \
+                if variant['latency']['mean_ms'] else 0.0
+            print(f"{service + ':' + precision:>13} {variant['runtime']:>12} {variant['model_mb']:>9.1f} "
+                  f"{variant['peak_rss_mb']:>8.1f} {variant['latency']['mean_ms']:>8.1f} "
+                  f"{variant['latency']['p95_ms']:>8.1f} {variant['speedup']:>7.2f}x {variant['agreement']:>9.3f}")
+        for variant in variants.values():
+            del variant['results']
+        report[service] = variants
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""Offline benchmark suite for the detection services, with baseline comparison.
+
+Run from the backend directory:
+
+    python benchmarks/run_benchmarks.py [--services yolo object person image video]
+                                        [--threads 4] [--stride 30] [--max-frames 100]
+                                        [--json report.json] [--baseline baseline.json]
+
+Frames are the images in `signs/` and `src/images/` plus frames sampled every `--stride`
+frames from the clips in `signs/New folder/`. YOLOService, ObjectService and PersonService
+are timed per frame; ImageService per image file (detection, annotation and JPEG
+encoding); VideoService per clip, sampling one frame every `--stride`. Each service runs
+in its own subprocess with fixed torch / OpenCV / OpenMP thread counts and no network
+access, after `--warmup` untimed calls, and reports latency percentiles, frames/s, peak
+RSS and the per-stage breakdown recorded by `utils/metrics.py`.
+
+`--baseline` compares against a report saved earlier with `--json` and exits with status
+1 when p50 / p95 latency or peak RSS grew, or frames/s dropped, by more than `--tolerance`.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.compare import latency_summary  # noqa: E402
+from utils.memory import current_rss_mb, peak_rss_mb  # noqa: E402
+from utils.sample_frames import (DEFAULT_SIGNS_DIR, IMAGE_SUFFIXES, VIDEO_SUFFIXES,  # noqa: E402
+                                 iter_images, iter_video_frames)
+
+SERVICES = ['yolo', 'object', 'person', 'image', 'video']
+DEFAULT_IMAGES_DIR = BACKEND_DIR / 'src' / 'images'
+# (metric, True when higher is worse) checked against the baseline
+COMPARED = [('p50_ms', True), ('p95_ms', True), ('fps', False), ('peak_rss_mb', True)]
+
+
+def offline_env(threads):
+    """Environment of a benchmark subprocess: fixed thread counts and no model downloads."""
+    env = dict(os.environ)
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        env[name] = str(threads)
+    env.update({'HF_HUB_OFFLINE': '1', 'TRANSFORMERS_OFFLINE': '1', 'YOLO_OFFLINE': '1'})
+    return env
+
+
+def set_threads(threads):
+    import cv2
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def image_files(args):
+    files = []
+    for directory in (args.signs_dir, args.images_dir):
+        files.extend(sorted(p for p in Path(directory).glob('*') if p.suffix.lower() in IMAGE_SUFFIXES))
+    return files[:args.max_frames] if args.max_frames else files
+
+
+def video_files(args):
+    clips = sorted(p for p in (Path(args.signs_dir) / 'New folder').glob('*') if p.suffix.lower() in VIDEO_SUFFIXES)
+    return clips[:args.max_videos] if args.max_videos else clips
+
+
+def frame_workload(detect, args):
+    """One timed call per sample frame: the images first, then frames sampled from the clips."""
+    frames = list(iter_images(args.signs_dir)) + list(iter_images(args.images_dir))
+    for item in iter_video_frames(Path(args.signs_dir) / 'New folder', args.stride):
+        if args.max_frames and len(frames) >= args.max_frames:
+            break
+        frames.append(item)
+    frames = frames[:args.max_frames] if args.max_frames else frames
+
+    def call(frame):
+        detect(frame)
+        return 1
+    return [(name, lambda frame=frame: call(frame)) for name, frame in frames]
+
+
+def build_workload(service, args, scratch):
+    """Load one service; returns it and its timed calls as (input name, call -> frames processed) pairs."""
+    def yolo():
+        from services.yolo_service import YOLOService
+        return YOLOService()
+
+    if service == 'yolo':
+        svc = yolo()
+        return svc, frame_workload(svc.detect_objects, args)
+    if service == 'object':
+        from services.object_service import ObjectService
+        svc = ObjectService()
+        return svc, frame_workload(svc.detect_objects, args)
+    if service == 'person':
+        from services.person_service import PersonService
+        svc = PersonService()
+        return svc, frame_workload(svc.detect_persons, args)
+
+    # ImageService and VideoService delete their input and write into static/: run them on copies
+    # and keep the annotated output in the scratch directory
+    if service == 'image':
+        from services.image_service import ImageService
+        svc = ImageService(yolo())
+        svc.static_dir = scratch
+
+        def process(path):
+            copy = scratch / f"input{path.suffix}"
+            shutil.copyfile(path, copy)
+            svc.process_image(str(copy))
+            return 1
+        return svc, [(path.name, lambda path=path: process(path)) for path in image_files(args)]
+
+    from services.video_service import VideoService
+    svc = VideoService(yolo())
+    svc.static_dir = scratch
+
+    def process(path, index):
+        copy = scratch / f"input{path.suffix}"
+        shutil.copyfile(path, copy)
+        result = svc.process_video(str(copy), frame_interval=args.stride, run_id=f"run{index}")
+        shutil.rmtree(scratch / f"run{index}", ignore_errors=True)
+        return result["total_frames_processed"]
+    calls = [(path.name, lambda path=path, i=i: process(path, i)) for i, path in enumerate(video_files(args))]
+    return svc, calls
+
+
+def stage_breakdown():
+    from utils.metrics import STAGE_SECONDS
+    stages = {}
+    for (stage, _, model), (count, total) in sorted(STAGE_SECONDS.totals().items()):
+        stages[f"{stage}[{model}]" if model else stage] = {
+            "count": count,
+            "mean_ms": round(total / count * 1000.0, 3) if count else 0.0,
+            "total_ms": round(total * 1000.0, 1),
+        }
+    return stages
+
+
+def run_service(args):
+    """Subprocess body: load one service, time it on its workload and dump JSON."""
+    from utils.metrics import STAGE_SECONDS
+
+    set_threads(args.threads)
+    with tempfile.TemporaryDirectory(prefix='bench-') as scratch:
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        svc, calls = build_workload(args.run, args, Path(scratch))
+        load_s = time.perf_counter() - started
+        rss_loaded = current_rss_mb()
+        if not calls:
+            raise SystemExit(f"No input for '{args.run}'")
+
+        for _, call in calls[:args.warmup]:
+            call()
+        STAGE_SECONDS.reset()
+
+        durations, frames = [], 0
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, call in calls:
+                t0 = time.perf_counter()
+                frames += call()
+                durations.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+
+    with open(args.out, 'w') as f:
+        json.dump({
+            "calls": len(durations),
+            "frames": frames,
+            "load_s": round(load_s, 2),
+            "model_mb": round(rss_loaded - rss_before, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+            **latency_summary(durations),
+            "stages": stage_breakdown(),
+        }, f)
+
+
+def compare(report, baseline, tolerance):
+    """Print the change of every compared metric; returns the regressions beyond `tolerance`."""
+    regressions = []
+    print(f"\n{'service':>8} {'metric':>12} {'baseline':>10} {'current':>10} {'change':>8}")
+    for service, current in report["services"].items():
+        previous = baseline.get("services", {}).get(service)
+        if not previous or "error" in current or "error" in previous:
+            continue
+        for metric, higher_is_worse in COMPARED:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            if worse:
+                regressions.append(f"{service} {metric}")
+            print(f"{service:>8} {metric:>12} {before:>10.1f} {after:>10.1f} {change:>+7.1%}"
+                  + ("  REGRESSION" if worse else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--services', nargs='+', default=SERVICES, choices=SERVICES)
+    parser.add_argument('--signs-dir', default=str(DEFAULT_SIGNS_DIR))
+    parser.add_argument('--images-dir', default=str(DEFAULT_IMAGES_DIR))
+    parser.add_argument('--stride', type=int, default=30,
+                        help='sample every Nth video frame (also the VideoService frame interval)')
+    parser.add_argument('--max-frames', type=int, default=100, help='frames / images per service (0 = all)')
+    parser.add_argument('--max-videos', type=int, default=0, help='clips for the video service (0 = all)')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed calls before measuring')
+    parser.add_argument('--repeat', type=int, default=1, help='passes over the workload')
+    parser.add_argument('--threads', type=int, default=4, help='torch / OpenCV / OpenMP threads')
+    parser.add_argument('--json', help='write the report to this file (usable later as --baseline)')
+    parser.add_argument('--baseline', help='report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative change before failing')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        return run_service(args)
+
+    import config
+    report = {
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {
+            "threads": args.threads, "stride": args.stride, "max_frames": args.max_frames,
+            "max_videos": args.max_videos, "warmup": args.warmup, "repeat": args.repeat,
+            "yolo_backend": config.YOLO_BACKEND, "yolo_precision": config.YOLO_PRECISION,
+            "yolo_imgsz": config.YOLO_IMGSZ, "yolo_inference_mode": config.YOLO_INFERENCE_MODE,
+            "person_precision": config.PERSON_PRECISION,
+        },
+        "services": {},
+    }
+
+    print(f"{'service':>8} {'calls':>6} {'frames':>7} {'load s':>7} {'model MB':>9} {'peak MB':>8} "
+          f"{'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fps':>7}")
+    for service in args.services:
+        with tempfile.NamedTemporaryFile(suffix='.json') as out:
+            cmd = [sys.executable, __file__, '--run', service, '--out', out.name,
+                   '--signs-dir', args.signs_dir, '--images-dir', args.images_dir,
+                   '--stride', str(args.stride), '--max-frames', str(args.max_frames),
+                   '--max-videos', str(args.max_videos), '--warmup', str(args.warmup),
+                   '--repeat', str(args.repeat), '--threads', str(args.threads)]
+            proc = subprocess.run(cmd, cwd=str(BACKEND_DIR), env=offline_env(args.threads),
+                                  stderr=subprocess.PIPE, text=True)
+            if proc.returncode != 0:
+                error = (proc.stderr.strip().splitlines() or ['failed'])[-1]
+                report["services"][service] = {"error": error}
+                print(f"{service:>8} failed: {error}")
+                continue
+            with open(out.name) as f:
+                result = report["services"][service] = json.load(f)
+
+        print(f"{service:>8} {result['calls']:>6} {result['frames']:>7} {result['load_s']:>7.1f} "
+              f"{result['model_mb']:>9.1f} {result['peak_rss_mb']:>8.1f} {result['mean_ms']:>8.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['fps']:>7.1f}")
+        for stage, timing in result["stages"].items():
+            print(f"{'':>8}   {stage:<34} {timing['count']:>6} x {timing['mean_ms']:>8.2f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"\nRegressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    main()
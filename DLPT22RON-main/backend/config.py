@@ -0,0 +1,117 @@
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# ── Logging and metrics ──
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')                   # DEBUG also logs every detection (hot path; off by default)
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')                 # text | json (one JSON object per line)
+
+# ── Model loading ──
+PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '')            # yolo,person,object,translation,tts,phrases or all, loaded in the background at startup ('' = on first use)
+PRELOAD_PARALLEL = _env_int('PRELOAD_PARALLEL', 2)                # models loaded at the same time
+MODEL_WARMUP = bool(_env_int('MODEL_WARMUP', 1))                  # one inference on a blank input right after loading
+SHARED_PRELOAD = bool(_env_int('SHARED_PRELOAD', 0))              # load PRELOAD_MODELS before workers fork, shared copy-on-write (set by gunicorn.conf.py)
+
+# ── YOLO micro-batching scheduler ──
+YOLO_BATCH_MAX_SIZE = _env_int('YOLO_BATCH_MAX_SIZE', 8)        # frames per forward pass
+YOLO_BATCH_MAX_WAIT_MS = _env_float('YOLO_BATCH_MAX_WAIT_MS', 15.0)  # how long the first frame may wait
+
+# ── YOLO inference ──
+YOLO_IMGSZ = _env_int('YOLO_IMGSZ', 640)                        # model input size (square)
+YOLO_PARALLEL_MODELS = bool(_env_int('YOLO_PARALLEL_MODELS', 0))  # run general + traffic models concurrently (opt-in)
+YOLO_BACKEND = os.environ.get('YOLO_BACKEND', 'torch')              # torch | onnx | openvino (exported once to src/models/exported)
+
+# ── Tiled (SAHI-style) inference for small objects ──
+YOLO_INFERENCE_MODE = os.environ.get('YOLO_INFERENCE_MODE', 'full')  # default mode: full | tiled | cascade (requests may override)
+YOLO_TILE_SIZE = _env_int('YOLO_TILE_SIZE', 640)                  # tile edge in frame pixels (also the model input size)
+YOLO_TILE_OVERLAP = _env_float('YOLO_TILE_OVERLAP', 0.2)          # fraction of a tile shared with its neighbour
+YOLO_TILE_BATCH = _env_int('YOLO_TILE_BATCH', 16)                 # tiles per forward pass
+YOLO_TILE_MODELS = os.environ.get('YOLO_TILE_MODELS', 'traffic')  # models run on tiles: traffic and/or general
+YOLO_TILE_ROIS = os.environ.get('YOLO_TILE_ROIS', '')             # 'x0,y0,x1,y1;...' frame fractions to tile ('' = whole frame)
+
+# ── Cascade inference: traffic model only on sign candidate crops ──
+CASCADE_PREFILTER = bool(_env_int('CASCADE_PREFILTER', 1))        # also use the HSV colour/shape pre-filter, not just COCO classes
+CASCADE_CROP_IMGSZ = _env_int('CASCADE_CROP_IMGSZ', 320)          # traffic model input size for crops
+CASCADE_CROP_MIN = _env_int('CASCADE_CROP_MIN', 160)              # smallest crop edge in frame pixels
+CASCADE_CROP_PAD = _env_float('CASCADE_CROP_PAD', 0.5)            # context added around a candidate, per side, in box sizes
+CASCADE_BATCH = _env_int('CASCADE_BATCH', 16)                     # crops per forward pass
+
+# ── Model tiers and load governor ──
+# name=weights@imgsz, most accurate first; only the first tier is loaded at startup
+YOLO_TIERS = os.environ.get(
+    'YOLO_TIERS', f'm=yolo11m.pt@{YOLO_IMGSZ},s=yolo11s.pt@{YOLO_IMGSZ},n=yolo11n.pt@{YOLO_IMGSZ},n-416=yolo11n.pt@416'
+)
+YOLO_LATENCY_SLO_MS = _env_float('YOLO_LATENCY_SLO_MS', 0.0)      # per-frame latency target (0 = always use the first tier)
+YOLO_GOVERNOR_COOLDOWN_S = _env_float('YOLO_GOVERNOR_COOLDOWN_S', 5.0)  # minimum time between tier switches
+
+# ── INT8 quantized model variants ──
+YOLO_PRECISION = os.environ.get('YOLO_PRECISION', 'fp32')         # fp32 | int8 (ONNX Runtime static INT8)
+PERSON_PRECISION = os.environ.get('PERSON_PRECISION', 'fp32')     # fp32 | int8 (Faster R-CNN with an INT8 backbone)
+QUANT_CALIBRATION_DIR = os.environ.get('QUANT_CALIBRATION_DIR', '')  # images + 'New folder' videos ('' = repo signs/)
+QUANT_CALIBRATION_FRAMES = _env_int('QUANT_CALIBRATION_FRAMES', 64)
+
+# ── YOLO inference worker processes ──
+YOLO_WORKERS = _env_int('YOLO_WORKERS', 0)                       # 0 = run YOLO in the web process
+YOLO_THREADS_PER_WORKER = _env_int('YOLO_THREADS_PER_WORKER', 0)  # torch threads per worker (0 = CPUs / workers)
+YOLO_SHM_SLOTS = _env_int('YOLO_SHM_SLOTS', 16)                  # shared-memory frame slots per worker
+YOLO_SHM_SLOT_MB = _env_float('YOLO_SHM_SLOT_MB', 6.0)           # bytes per slot; larger frames are sent inline
+
+# ── Content-addressed detection result cache ──
+RESULT_CACHE_MAX_ENTRIES = _env_int('RESULT_CACHE_MAX_ENTRIES', 256)
+RESULT_CACHE_TTL_S = _env_float('RESULT_CACHE_TTL_S', 60.0)
+
+# ── Video pipeline ──
+VIDEO_BATCH_SIZE = _env_int('VIDEO_BATCH_SIZE', 4)                # sampled frames per YOLO forward pass
+VIDEO_WRITER_THREADS = _env_int('VIDEO_WRITER_THREADS', 2)        # annotate + JPEG encode workers
+VIDEO_QUEUE_SIZE = _env_int('VIDEO_QUEUE_SIZE', 8)                # bound of each inter-stage queue
+VIDEO_SEEK_MIN_INTERVAL = _env_int('VIDEO_SEEK_MIN_INTERVAL', 300)  # seek instead of grab() at/above this interval (0 = never)
+
+# ── Translation ──
+TRANSLATION_NUM_BEAMS = _env_int('TRANSLATION_NUM_BEAMS', 0)                 # 0 = model's generation config, 1 = greedy
+TRANSLATION_MAX_LENGTH = _env_int('TRANSLATION_MAX_LENGTH', 128)             # max generated tokens
+TRANSLATION_BATCH_MAX_SIZE = _env_int('TRANSLATION_BATCH_MAX_SIZE', 16)      # strings per generate() call
+TRANSLATION_BATCH_MAX_WAIT_MS = _env_float('TRANSLATION_BATCH_MAX_WAIT_MS', 10.0)  # how long the first string may wait
+TRANSLATION_CACHE_MAX_ENTRIES = _env_int('TRANSLATION_CACHE_MAX_ENTRIES', 4096)
+TRANSLATION_CACHE_TTL_S = _env_float('TRANSLATION_CACHE_TTL_S', 86400.0)
+
+# ── Text-to-speech ──
+TTS_BACKEND = os.environ.get('TTS_BACKEND', 'auto')               # gtts, pyttsx3 (offline) or auto (gTTS, pyttsx3 when it fails)
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', '')               # synthesized audio cache ('' = backend/data/tts_cache)
+TTS_CACHE_MAX_MB = _env_float('TTS_CACHE_MAX_MB', 256.0)          # least recently used phrases are evicted above this
+TTS_HTTP_MAX_AGE_S = _env_int('TTS_HTTP_MAX_AGE_S', 86400)        # Cache-Control max-age for audio responses
+TTS_FALLBACK_TTL_S = _env_float('TTS_FALLBACK_TTL_S', 600.0)      # reuse audio from the pyttsx3 fallback this long, then retry gTTS
+
+# ── Precomputed announcement phrases ──
+PHRASE_BUNDLE_DIR = os.environ.get('PHRASE_BUNDLE_DIR', '')       # per-language fragment bundle ('' = backend/data/phrase_bundle)
+PHRASE_BUNDLE_BUILD = bool(_env_int('PHRASE_BUNDLE_BUILD', 1))    # translate/synthesize missing fragments on load (0 = use the bundle on disk as is)
+PHRASE_BUILD_THREADS = _env_int('PHRASE_BUILD_THREADS', 4)        # concurrent synthesis requests while building
+PHRASE_MAX_DISTANCE_M = _env_int('PHRASE_MAX_DISTANCE_M', 20)     # whole-metre distance fragments up to this, "more than" beyond
+PHRASE_ANNOUNCE_LIMIT = _env_int('PHRASE_ANNOUNCE_LIMIT', 3)      # nearest detections per announcement
+
+# ── Background video jobs ──
+VIDEO_MAX_JOBS = _env_int('VIDEO_MAX_JOBS', 1)                    # jobs processed concurrently, per gunicorn worker
+VIDEO_MAX_PENDING_JOBS = _env_int('VIDEO_MAX_PENDING_JOBS', 16)   # queued + running jobs before 429, per worker
+
+# ── Adaptive (scene-change) video sampling ──
+VIDEO_ADAPTIVE_MIN_INTERVAL = _env_int('VIDEO_ADAPTIVE_MIN_INTERVAL', 5)      # never sample closer than this
+VIDEO_ADAPTIVE_MAX_INTERVAL = _env_int('VIDEO_ADAPTIVE_MAX_INTERVAL', 90)     # always sample at least this often
+VIDEO_ADAPTIVE_THRESHOLD = _env_float('VIDEO_ADAPTIVE_THRESHOLD', 0.08)       # scene-change score (0..1) that triggers a sample
+
+# ── Multi-object tracking ──
+TRACK_DETECT_EVERY = _env_int('TRACK_DETECT_EVERY', 5)            # full YOLO pass every N frames per stream
+TRACK_IOU_THRESHOLD = _env_float('TRACK_IOU_THRESHOLD', 0.3)      # minimum IoU to continue a track
+TRACK_MAX_SHIFT = _env_float('TRACK_MAX_SHIFT', 0.5)              # max extrapolated shift between detections, fraction of box size
+TRACK_SESSION_TTL_S = _env_float('TRACK_SESSION_TTL_S', 60.0)     # idle time before a stream's tracks are dropped
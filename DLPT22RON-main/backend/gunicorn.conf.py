@@ -0,0 +1,27 @@
+"""Gunicorn settings for running several workers that share one copy of the model weights.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is imported once in the master (preload_app), which loads PRELOAD_MODELS
+before forking; workers inherit the weights copy-on-write instead of each loading its
+own. Check the effect with `python benchmarks/memory_report.py --compare`.
+"""
+import os
+
+os.environ.setdefault('SHARED_PRELOAD', '1')
+# Not 'translation' or 'phrases': mBART and the phrase bundle build (network TTS calls)
+# would run in the master before every start; they load on first use in each worker
+os.environ.setdefault('PRELOAD_MODELS', 'yolo,person,object,tts')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'  # flask-sock WebSockets hold a thread per connection
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+preload_app = os.environ['SHARED_PRELOAD'] == '1'  # otherwise each worker imports the app and loads its own models
+timeout = 300
+
+
+def post_fork(server, worker):
+    # The master loaded the models single-threaded; split the CPUs between the workers
+    from services.model_registry import model_registry
+    model_registry.after_fork(max(1, (os.cpu_count() or 1) // workers))
@@ -0,0 +1,165 @@
+import hashlib
+import io
+import logging
+import os
+from pathlib import Path
+from urllib.parse import urlencode
+from flask import Blueprint, request, jsonify, send_file, send_from_directory
+from services.model_registry import model_registry
+from routes.translation_route import language_map as mbart_languages, get_translation_service, translate_text
+from routes.speech import language_map as tts_languages, get_tts_service
+import config
+
+logger = logging.getLogger(__name__)
+
+announce_bp = Blueprint('announce', __name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _bundle_dir():
+    return Path(config.PHRASE_BUNDLE_DIR or BACKEND_DIR / 'data' / 'phrase_bundle')
+
+
+def _traffic_class_names():
+    """Class names of the custom traffic-sign model, if its weights are present."""
+    try:
+        from services.yolo_service import traffic_model_paths
+        for path in traffic_model_paths(BACKEND_DIR):
+            if os.path.exists(path):
+                from ultralytics import YOLO
+                return list(YOLO(path).names.values())
+    except Exception as e:
+        logger.warning(f"Could not read traffic-sign class names: {e}")
+    return []
+
+
+def _load_phrase_bundle():
+    from services.phrase_bundle import PhraseBundle, build_vocabulary
+    with open(BACKEND_DIR / 'src/dataset/coco.names', 'rt') as f:
+        class_names = f.read().rstrip('\n').split('\n')
+    vocabulary = build_vocabulary(class_names, _traffic_class_names(), config.PHRASE_MAX_DISTANCE_M)
+    bundle = PhraseBundle(_bundle_dir(), vocabulary, max_distance_m=config.PHRASE_MAX_DISTANCE_M)
+
+    for language, mbart in mbart_languages.items():
+        if not config.PHRASE_BUNDLE_BUILD:
+            bundle.load(language)
+            continue
+
+        def translate(texts, mbart=mbart):
+            translations = get_translation_service().translate_batch([(text, 'en_XX', mbart) for text in texts])
+            for translation in translations:
+                if isinstance(translation, Exception):
+                    raise translation
+            return translations
+
+        def synthesize(text, tts=tts_languages.get(language, 'en')):
+            return get_tts_service().get_audio(text, tts)[0]
+
+        try:
+            bundle.build(language, translate=None if mbart == 'en_XX' else translate, synthesize=synthesize,
+                         batch_size=config.TRANSLATION_BATCH_MAX_SIZE, threads=config.PHRASE_BUILD_THREADS)
+        except Exception as e:
+            logger.error(f"Error building phrase bundle for '{language}': {e}")
+            bundle.fail(language, e)
+            bundle.load(language)
+    return bundle
+
+
+# Building needs the translation and TTS services; preload 'phrases' to build it at startup.
+# Not loaded in a pre-forking master: the bundle is small and each worker reads it from disk
+# in milliseconds, while building it there would load mBART and call gTTS before the fork
+model_registry.register('phrases', _load_phrase_bundle, fork_safe=False)
+
+
+def get_phrase_bundle():
+    """The announcement phrase bundle, loaded (and completed) on first use."""
+    return model_registry.get('phrases')
+
+
+def _request_detections(data):
+    """Detections from a `detections` list or a /api/yolo/detect-style result."""
+    if isinstance(data.get('detections'), list):
+        return data['detections']
+    return [detection for key in ('traffic_signs', 'persons', 'objects')
+            for detection in (data.get(key) or [])]
+
+
+@announce_bp.route('/announce', methods=['POST'])
+def announce():
+    """Spoken announcement of the nearest detections, assembled from precomputed phrases.
+
+    Body: `language` (frontend code), `detections` (or a detect response with `objects`,
+    `persons`, `traffic_signs`), optional `limit` and `format` ("json" or "audio").
+    Fragments missing from the bundle (e.g. an unknown label) are translated and
+    synthesized on the fly and listed in `fallback`.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        language = data.get('language', 'en')
+        if language not in mbart_languages:
+            return jsonify({"error": f"Unsupported language: {language}"}), 400
+        try:
+            limit = int(data.get('limit', config.PHRASE_ANNOUNCE_LIMIT))
+        except (TypeError, ValueError):
+            limit = 0
+        if limit < 1:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+
+        sentences, clips, urls, fallback = [], [], [], []
+        for parts in get_phrase_bundle().assemble(language, _request_detections(data), limit):
+            texts = []
+            for fragment_id, english, text, audio in parts:
+                if text is None:
+                    fallback.append(fragment_id)
+                    text = english if language == 'en' else \
+                        translate_text(english, 'en_XX', mbart_languages[language])
+                if audio is None:
+                    audio = get_tts_service().get_audio(text, tts_languages.get(language, 'en'))[0]
+                    urls.append('/api/speak?' + urlencode({'text': text, 'language': language}))
+                else:
+                    urls.append(f"/api/phrases/{language}/{audio.name}")
+                texts.append(text)
+                clips.append(audio)
+            sentences.append(", ".join(texts))
+        text = ". ".join(sentences)
+
+        if data.get('format') == 'audio':
+            if not clips:
+                return '', 204
+            from services.tts_service import FORMATS, join_audio
+            try:
+                audio, audio_format = join_audio(clips)
+            except ValueError as e:
+                # Clips from different TTS backends (bundle built with gTTS, a fragment synthesized
+                # offline later) cannot be joined; speak the whole announcement as one clip instead
+                logger.warning(f"Synthesizing announcement as one clip: {e}")
+                path = Path(get_tts_service().get_audio(text, tts_languages.get(language, 'en'))[0])
+                audio, audio_format = path.read_bytes(), path.suffix.lstrip('.')
+            suffix, mimetype = FORMATS[audio_format]
+            return send_file(io.BytesIO(audio), mimetype=mimetype, as_attachment=True,
+                             download_name='announcement' + suffix,
+                             etag=hashlib.blake2b(audio, digest_size=16).hexdigest())
+
+        # Clips to play in order: bundled ones are static files, fallback ones go through /api/speak
+        return jsonify({"language": language, "text": text, "clips": urls, "fallback": fallback})
+
+    except Exception as e:
+        logger.error(f"Error in announce: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@announce_bp.route('/phrases/<language>/<path:filename>', methods=['GET'])
+def phrase_audio(language, filename):
+    """A precomputed phrase clip, served as a static file (ETag / If-None-Match supported)."""
+    if language not in mbart_languages:
+        return jsonify({"error": f"Unsupported language: {language}"}), 404
+    return send_from_directory(_bundle_dir() / language, filename, max_age=config.TTS_HTTP_MAX_AGE_S)
+
+
+@announce_bp.route('/announce/stats', methods=['GET'])
+def announce_stats():
+    """Fragments per language in the phrase bundle and what the last build translated and synthesized"""
+    if not model_registry.is_ready('phrases'):
+        return jsonify({"state": model_registry.status()["models"]["phrases"]["state"]})
+    return jsonify(get_phrase_bundle().stats())
@@ -1,36 +1,158 @@
+import atexit
+import logging
 from flask import Blueprint, request, jsonify
-import cv2
-import numpy as np
-import base64
-from services.yolo_service import YOLOService
+from services.inference_pool import InferencePool
+from services.batch_scheduler import BatchScheduler
+from services.model_registry import model_registry
+from services.result_cache import ResultCache
+from services.tracker import TrackedDetector, TrackingSessions
+from services.yolo_postprocess import position_label
+from utils.frames import BadFrame, read_frame_payload
+import config
+
+logger = logging.getLogger(__name__)
 
 yolo_bp = Blueprint('yolo', __name__)
-yolo_service = YOLOService()
+
+
+def _load_yolo_service():
+    if config.YOLO_WORKERS > 0:
+        # Separate pinned processes load the models; this process only hands frames over
+        service = InferencePool(
+            num_workers=config.YOLO_WORKERS,
+            threads_per_worker=config.YOLO_THREADS_PER_WORKER,
+            slots_per_worker=config.YOLO_SHM_SLOTS,
+            slot_bytes=int(config.YOLO_SHM_SLOT_MB * 1024 * 1024)
+        )
+        atexit.register(service.close)
+    else:
+        from services.yolo_service import YOLOService
+        service = YOLOService()
+    # The load governor downshifts model tiers when the full-mode queue backs up
+    service.set_queue_depth_fn(yolo_scheduler.queue_depth)
+    return service
+
+
+# Worker processes and ONNX Runtime / OpenVINO thread pools do not survive a fork
+model_registry.register('yolo', _load_yolo_service, fork_safe=config.YOLO_WORKERS == 0 and
+                        config.YOLO_BACKEND == 'torch' and config.YOLO_PRECISION == 'fp32')
+
+
+def get_yolo_service():
+    """The shared YOLOService (or InferencePool), loaded on first use."""
+    return model_registry.get('yolo')
+
+
+# Frames from concurrent camera clients are grouped into one forward pass per model;
+# with worker processes, one batch can be in flight per worker
+yolo_scheduler = BatchScheduler(
+    lambda frames: get_yolo_service().detect_batch(frames, mode='full', observe=True),
+    max_batch_size=config.YOLO_BATCH_MAX_SIZE,
+    max_wait_ms=config.YOLO_BATCH_MAX_WAIT_MS,
+    name='yolo',
+    num_workers=max(1, config.YOLO_WORKERS)
+)
+# Tiled (small-object) requests are batched separately: their batches are tiles, not frames
+yolo_tiled_scheduler = BatchScheduler(
+    lambda frames: get_yolo_service().detect_batch(frames, mode='tiled'),
+    max_batch_size=config.YOLO_BATCH_MAX_SIZE,
+    max_wait_ms=config.YOLO_BATCH_MAX_WAIT_MS,
+    name='yolo-tiled',
+    num_workers=max(1, config.YOLO_WORKERS)
+)
+# Cascade requests too: their traffic-model batches are candidate crops, not frames
+yolo_cascade_scheduler = BatchScheduler(
+    lambda frames: get_yolo_service().detect_batch(frames, mode='cascade'),
+    max_batch_size=config.YOLO_BATCH_MAX_SIZE,
+    max_wait_ms=config.YOLO_BATCH_MAX_WAIT_MS,
+    name='yolo-cascade',
+    num_workers=max(1, config.YOLO_WORKERS)
+)
+yolo_schedulers = {'full': yolo_scheduler, 'tiled': yolo_tiled_scheduler, 'cascade': yolo_cascade_scheduler}
+
+# Full two-model results keyed on frame content; every endpoint projects its slice from here
+yolo_result_cache = ResultCache(
+    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.RESULT_CACHE_TTL_S
+)
+
+
+def new_tracked_detector(mode=None):
+    """Tracker for one camera stream: full YOLO every TRACK_DETECT_EVERY frames, propagation in between."""
+    return TrackedDetector(
+        yolo_schedulers[mode or config.YOLO_INFERENCE_MODE].submit,
+        detect_every=config.TRACK_DETECT_EVERY,
+        iou_threshold=config.TRACK_IOU_THRESHOLD,
+        position_fn=position_label,
+        max_shift=config.TRACK_MAX_SHIFT
+    )
+
+
+# Per-stream trackers for /api/yolo/track, keyed by the client's stream id
+tracking_sessions = TrackingSessions(new_tracked_detector, ttl_seconds=config.TRACK_SESSION_TTL_S)
+
+
+class UnknownMode(ValueError):
+    """The request asked for an inference mode that has no scheduler (a client error)."""
+
+
+def _check_mode(mode):
+    if mode not in yolo_schedulers:
+        raise UnknownMode(f"Unknown inference mode: {mode}. Use one of: {', '.join(yolo_schedulers)}")
+
+
+def detect_payload(payload, mode=None):
+    """Run (or reuse) full YOLO detection for a FramePayload.
+
+    `mode` is 'full', 'tiled' or 'cascade' (default YOLO_INFERENCE_MODE).
+    Returns None if the frame cannot be decoded; raises UnknownMode for any other mode.
+    """
+    mode = mode or config.YOLO_INFERENCE_MODE
+    _check_mode(mode)
+    key = ResultCache.key_for(f'{mode}:'.encode(), *payload.key_parts())
+
+    def compute():
+        frame = payload.decode()
+        if frame is None:
+            return None
+        return yolo_schedulers[mode].submit(frame)
+
+    return yolo_result_cache.get_or_compute(key, compute)
+
+
+def _request_mode():
+    """Inference mode from the `mode` query parameter or JSON field, if any."""
+    if request.args.get('mode'):
+        return request.args['mode']
+    data = request.get_json(silent=True) if request.is_json else None
+    return data.get('mode') if isinstance(data, dict) else None
+
+
+def _detect_request_frame():
+    """Run (or reuse) full YOLO detection for the frame in the request body."""
+    # Reject an unknown mode before the frame is read
+    mode = _request_mode() or config.YOLO_INFERENCE_MODE
+    _check_mode(mode)
+    return detect_payload(read_frame_payload(request), mode)
 
 @yolo_bp.route('/api/yolo/detect', methods=['POST', 'OPTIONS'])
 def yolo_detect():
     """YOLO-based detection endpoint that detects all objects, persons, and traffic signs"""
     if request.method == 'OPTIONS':
         return '', 204
-        
+
     try:
-        data = request.json
-        image_data = data['frame'].split(',')[1]
-        image_bytes = base64.b64decode(image_data)
-        
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
+        result = _detect_request_frame()
+        if result is None:
             return jsonify({"error": "Failed to decode image"}), 400
-        
-        result = yolo_service.detect_objects(frame)
+
         return jsonify(result)
-        
+
+    except (BadFrame, UnknownMode) as e:
+        logger.error(f"Error in yolo_detect: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in yolo_detect: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"Error in yolo_detect: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @yolo_bp.route('/api/yolo/detect_objects', methods=['POST', 'OPTIONS'])
@@ -38,28 +160,24 @@ def yolo_detect_objects():
     """YOLO endpoint that returns only objects (excluding persons and traffic signs)"""
     if request.method == 'OPTIONS':
         return '', 204
-        
+
     try:
-        data = request.json
-        image_data = data['frame'].split(',')[1]
-        image_bytes = base64.b64decode(image_data)
-        
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
+        result = _detect_request_frame()
+        if result is None:
             return jsonify({"error": "Failed to decode image"}), 400
-        
-        result = yolo_service.detect_objects(frame)
+
         # Return only objects, not persons or traffic signs
         return jsonify({
             "objects": result["objects"],
             "frame_height": result["frame_height"],
             "frame_width": result["frame_width"]
         })
-        
+
+    except (BadFrame, UnknownMode) as e:
+        logger.error(f"Error in yolo_detect_objects: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in yolo_detect_objects: {str(e)}")
+        logger.error(f"Error in yolo_detect_objects: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @yolo_bp.route('/api/yolo/detect_persons', methods=['POST', 'OPTIONS'])
@@ -67,19 +185,12 @@ def yolo_detect_persons():
     """YOLO endpoint that returns only persons"""
     if request.method == 'OPTIONS':
         return '', 204
-        
+
     try:
-        data = request.json
-        image_data = data['frame'].split(',')[1]
-        image_bytes = base64.b64decode(image_data)
-        
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
+        result = _detect_request_frame()
+        if result is None:
             return jsonify({"error": "Failed to decode image"}), 400
-        
-        result = yolo_service.detect_objects(frame)
+
         # Return only persons
         return jsonify({
             "persons": result["persons"],
@@ -87,9 +198,12 @@ def yolo_detect_persons():
             "frame_height": result["frame_height"],
             "frame_width": result["frame_width"]
         })
-        
+
+    except (BadFrame, UnknownMode) as e:
+        logger.error(f"Error in yolo_detect_persons: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in yolo_detect_persons: {str(e)}")
+        logger.error(f"Error in yolo_detect_persons: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @yolo_bp.route('/api/yolo/detect_traffic_signs', methods=['POST', 'OPTIONS'])
@@ -97,26 +211,83 @@ def yolo_detect_traffic_signs():
     """YOLO endpoint that returns only traffic signs"""
     if request.method == 'OPTIONS':
         return '', 204
-        
+
     try:
-        data = request.json
-        image_data = data['frame'].split(',')[1]
-        image_bytes = base64.b64decode(image_data)
-        
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
+        result = _detect_request_frame()
+        if result is None:
             return jsonify({"error": "Failed to decode image"}), 400
-        
-        result = yolo_service.detect_objects(frame)
+
         # Return only traffic signs
         return jsonify({
             "traffic_signs": result["traffic_signs"],
             "frame_height": result["frame_height"],
             "frame_width": result["frame_width"]
         })
-        
+
+    except (BadFrame, UnknownMode) as e:
+        logger.error(f"Error in yolo_detect_traffic_signs: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in yolo_detect_traffic_signs: {str(e)}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        logger.error(f"Error in yolo_detect_traffic_signs: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@yolo_bp.route('/api/yolo/track', methods=['POST', 'OPTIONS'])
+def yolo_track():
+    """YOLO detection with stable track ids for a camera stream.
+
+    Identify the stream with an `X-Stream-Id` header (or `stream_id` in a JSON body).
+    Full detection only runs every few frames; in between, tracked boxes are propagated
+    without decoding the frame. Each detection carries `track_id` and `predicted`; the
+    result carries `detected` and `frames_since_detection`. A body that is not a frame gets a 400.
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+
+    try:
+        stream_id = request.headers.get('X-Stream-Id')
+        if stream_id is None and request.is_json:
+            stream_id = request.json.get('stream_id')
+        if not stream_id:
+            return jsonify({"error": "No stream id (X-Stream-Id header or stream_id field)"}), 400
+
+        payload = read_frame_payload(request)
+        # Propagated frames are never decoded, so reject garbage before it counts as a frame
+        payload.check()
+        session = tracking_sessions.get(stream_id)
+        result = session.process(payload.decode)
+        if result is None:
+            return jsonify({"error": "Failed to decode image"}), 400
+
+        return jsonify(result)
+
+    except BadFrame as e:
+        logger.error(f"Error in yolo_track: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in yolo_track: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@yolo_bp.route('/api/yolo/batch_stats', methods=['GET'])
+def yolo_batch_stats():
+    """Batch fill rate and queue wait counters of the YOLO scheduler"""
+    stats = yolo_scheduler.stats()
+    stats["tiled"] = yolo_tiled_scheduler.stats()
+    stats["cascade"] = yolo_cascade_scheduler.stats()
+    if model_registry.is_ready('yolo') and isinstance(get_yolo_service(), InferencePool):
+        stats["inference_pool"] = get_yolo_service().stats()
+    return jsonify(stats)
+
+@yolo_bp.route('/api/yolo/tier_stats', methods=['GET'])
+def yolo_tier_stats():
+    """Current model tier, time spent per tier and recent governor switches"""
+    return jsonify(get_yolo_service().tier_stats())
+
+@yolo_bp.route('/api/yolo/cascade_stats', methods=['GET'])
+def yolo_cascade_stats():
+    """Share of cascade frames that skipped the traffic model and the time saved per frame"""
+    return jsonify(get_yolo_service().cascade_stats())
+
+@yolo_bp.route('/api/yolo/cache_stats', methods=['GET'])
+def yolo_cache_stats():
+    """Hit/miss counters of the shared YOLO result cache"""
+    return jsonify(yolo_result_cache.stats())
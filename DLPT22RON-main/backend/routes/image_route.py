@@ -1,8 +1,11 @@
+import logging
 import os
 import tempfile
 from flask import Blueprint, request, jsonify
 from services.image_service import ImageService
 
+logger = logging.getLogger(__name__)
+
 image_bp = Blueprint('image', __name__)
 
 # Lazy initialization — will be set when the app starts
@@ -15,9 +18,9 @@ def _get_image_service():
     """Lazy-init image service, reusing the yolo_service from the detection blueprint."""
     global _image_service
     if _image_service is None:
-        # Import here to reuse the same YOLOService instance from detection.py
-        from routes.detection import yolo_service
-        _image_service = ImageService(yolo_service)
+        # Import here to reuse the YOLOService, batch scheduler and result cache from detection.py
+        from routes.detection import detect_payload, get_yolo_service
+        _image_service = ImageService(get_yolo_service(), detect_payload)
     return _image_service
 
 
@@ -51,7 +54,5 @@ def upload_image():
         return jsonify(result)
 
     except Exception as e:
-        print(f"Error processing image: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error processing image: {e}")
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+from utils.metrics import render
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Request latency, per-stage timings, queue depths and model state in Prometheus text format."""
+    return Response(render(), mimetype='text/plain; version=0.0.4')
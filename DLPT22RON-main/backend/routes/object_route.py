@@ -1,11 +1,32 @@
+import logging
 from flask import Blueprint, request, jsonify
-import cv2
-import numpy as np
-import base64
-from services.object_service import ObjectService
+from services.model_registry import model_registry
+from services.result_cache import ResultCache
+from utils.frames import BadFrame, read_frame_payload
+import config
+
+logger = logging.getLogger(__name__)
 
 object_bp = Blueprint('object', __name__)
-object_service = ObjectService()
+
+
+def _load_object_service():
+    from services.object_service import ObjectService
+    return ObjectService()
+
+
+model_registry.register('object', _load_object_service)
+
+
+def get_object_service():
+    """The SSD MobileNet object service, loaded on first use."""
+    return model_registry.get('object')
+
+
+object_result_cache = ResultCache(
+    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.RESULT_CACHE_TTL_S
+)
 
 @object_bp.route('/detect_frame', methods=['POST', 'OPTIONS'])
 def detect_frame():
@@ -13,16 +34,17 @@ def detect_frame():
         return '', 204
         
     try:
-        data = request.json
-        image_data = data['frame'].split(',')[1]
-        image_bytes = base64.b64decode(image_data)
-        
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        result = object_service.detect_objects(frame)
+        payload = read_frame_payload(request)
+        key = ResultCache.key_for(*payload.key_parts())
+
+        result = object_result_cache.get_or_compute(
+            key, lambda: get_object_service().detect_objects(payload.decode())
+        )
         return jsonify(result)
         
+    except BadFrame as e:
+        logger.error(f"Error in detect_frame: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in detect_frame: {str(e)}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        logger.error(f"Error in detect_frame: {str(e)}")
+        return jsonify({"error": str(e)}), 500
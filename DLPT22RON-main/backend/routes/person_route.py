@@ -1,54 +1,65 @@
-
+import logging
 from flask import Blueprint, request, jsonify
-import cv2
-import numpy as np
-import base64
-from services.person_service import PersonService
+from services.model_registry import model_registry
+from services.result_cache import ResultCache
+from utils.frames import BadFrame, read_frame_payload
+import config
+
+logger = logging.getLogger(__name__)
 
 person_bp = Blueprint('person', __name__)
-person_service = PersonService()
+
+
+def _load_person_service():
+    from services.person_service import PersonService
+    return PersonService()
+
+
+model_registry.register('person', _load_person_service)
+
+
+def get_person_service():
+    """The Faster R-CNN person service, loaded on first use."""
+    return model_registry.get('person')
+
+
+# Shared by /detect_persons and /detect_frame, which run the same model
+person_result_cache = ResultCache(
+    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.RESULT_CACHE_TTL_S
+)
+
+def _detect_request_persons():
+    payload = read_frame_payload(request)
+    key = ResultCache.key_for(*payload.key_parts())
+    return person_result_cache.get_or_compute(
+        key, lambda: get_person_service().detect_persons(payload.decode())
+    )
 
 @person_bp.route('/detect_persons', methods=['POST'])
 def detect_persons():
     try:
-        data = request.json
-        image_data = data['frame'].split(',')[1]
-        image_bytes = base64.b64decode(image_data)
-        
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        result = person_service.detect_persons(frame)
+        result = _detect_request_persons()
         return jsonify(result)
         
+    except BadFrame as e:
+        logger.error(f"Error in detect_persons: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in detect_persons: {str(e)}")
+        logger.error(f"Error in detect_persons: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 # Add a route that can be used by the frontend's detect_frame endpoint
 @person_bp.route('/detect_frame', methods=['POST'])
 def detect_frame():
     try:
-        data = request.json
-        image_data = data['frame'].split(',')[1]
-        image_bytes = base64.b64decode(image_data)
-        
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        result = person_service.detect_persons(frame)
+        result = _detect_request_persons()
         return jsonify(result)
         
+    except BadFrame as e:
+        logger.error(f"Error in detect_frame: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in detect_frame: {str(e)}")
+        logger.error(f"Error in detect_frame: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@person_bp.route('/model_status', methods=['GET'])
-def model_status():
-    try:
-        # Check if models are loaded and ready
-        is_ready = person_service.is_model_ready()
-        return jsonify({"ready": is_ready})
-    except Exception as e:
-        print(f"Error checking model status: {str(e)}")
-        return jsonify({"ready": False, "error": str(e)}), 500
@@ -1,38 +1,87 @@
+import logging
+import os
+from flask import Blueprint, request, jsonify, send_file
+from services.model_registry import model_registry
+import config
 
-from flask import Blueprint, request, jsonify
-from gtts import gTTS
-import io
+logger = logging.getLogger(__name__)
 
-bp = Blueprint('speech', __name__)
+speech_bp = Blueprint('speech', __name__)
 
-@bp.route('/speak', methods=['POST'])
+# Map frontend language codes to gTTS language codes
+language_map = {
+    'en': 'en',
+    'te': 'te',
+    'hi': 'hi',
+    'ja': 'ja',
+    'zh': 'zh-cn',
+    'es': 'es'
+}
+
+
+def _load_tts_service():
+    from services.tts_service import TTSService
+    cache_dir = config.TTS_CACHE_DIR or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'tts_cache')
+    return TTSService(cache_dir, config.TTS_CACHE_MAX_MB * 1024 * 1024, backend=config.TTS_BACKEND,
+                      fallback_ttl_s=config.TTS_FALLBACK_TTL_S)
+
+
+model_registry.register('tts', _load_tts_service)
+
+
+def get_tts_service():
+    """The TTS service with its audio cache index, created on first use."""
+    return model_registry.get('tts')
+
+
+def send_audio(text, language):
+    """Cached audio as a static file: ETag is the content key, so If-None-Match gets a 304.
+
+    Another worker can evict the file between the cache lookup and opening it; the lookup
+    then misses, so the phrase is synthesized again (once).
+    """
+    service = get_tts_service()
+    for attempt in range(2):
+        path, key = service.get_audio(text, language)
+        try:
+            audio = open(path, 'rb')
+            break
+        except FileNotFoundError:
+            if attempt:
+                raise
+    return send_file(
+        audio,
+        mimetype=service.media_type(path),
+        as_attachment=True,
+        download_name='speech' + os.path.splitext(path)[1],
+        etag=key,
+        conditional=True,
+        max_age=config.TTS_HTTP_MAX_AGE_S
+    )
+
+
+@speech_bp.route('/speak', methods=['GET', 'POST'])
 def speak():
+    """Speech audio for `text` in `language`, from JSON (POST) or the query string (GET).
+
+    Repeated phrases are served from the disk cache; GET requests with If-None-Match
+    get a 304 when the client already has the audio.
+    """
     try:
-        data = request.json
+        data = request.args if request.method == 'GET' else (request.get_json(silent=True) or {})
         text = data.get('text', '')
-        language = data.get('language', 'en')
-        
-        # Map frontend language codes to gTTS language codes
-        language_map = {
-            'en': 'en',
-            'te': 'te',
-            'hi': 'hi',
-            'ja': 'ja',
-            'zh': 'zh-cn',
-            'es': 'es'
-        }
-        
-        tts = gTTS(text=text, lang=language_map.get(language, 'en'))
-        
-        audio_io = io.BytesIO()
-        tts.write_to_fp(audio_io)
-        audio_io.seek(0)
-        
-        return audio_io.getvalue(), 200, {
-            'Content-Type': 'audio/mpeg',
-            'Content-Disposition': 'attachment; filename=speech.mp3'
-        }
-        
+        if not isinstance(text, str) or not text.strip():
+            return jsonify({"error": "No text provided"}), 400
+        language = language_map.get(data.get('language', 'en'), 'en')
+
+        return send_audio(text.strip(), language)
+
     except Exception as e:
-        print(f"Error in speak: {str(e)}")
+        logger.error(f"Error in speak: {str(e)}")
         return jsonify({"error": str(e)}), 500
+
+
+@speech_bp.route('/speak/stats', methods=['GET'])
+def speak_stats():
+    """Audio cache size and hit rate, coalesced requests and phrases synthesized per backend"""
+    return jsonify(get_tts_service().stats())
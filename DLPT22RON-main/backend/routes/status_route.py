@@ -0,0 +1,27 @@
+import logging
+from flask import Blueprint, request, jsonify
+from services.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+status_bp = Blueprint('status', __name__)
+
+
+@status_bp.route('/model_status', methods=['GET'])
+def model_status():
+    """Readiness of the preloaded models plus load state, timings and memory of every model.
+
+    `ready` is true once every model in PRELOAD_MODELS is loaded and warmed up (503
+    until then), so it can back a readiness probe; `?model=person` asks about one model.
+    """
+    try:
+        status = model_registry.status()
+        name = request.args.get('model')
+        if name:
+            if name not in status["models"]:
+                return jsonify({"ready": False, "error": f"Unknown model: {name}"}), 404
+            status["ready"] = status["models"][name]["state"] == 'ready'
+        return jsonify(status), 200 if status["ready"] else 503
+    except Exception as e:
+        logger.error(f"Error checking model status: {str(e)}")
+        return jsonify({"ready": False, "error": str(e)}), 500
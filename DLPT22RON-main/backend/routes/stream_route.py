@@ -0,0 +1,125 @@
+import json
+import logging
+import threading
+import time
+from flask import Blueprint, request
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
+from services.frame_stream import LatestFrameSlot
+from utils.frames import FramePayload, decode_data_url
+
+logger = logging.getLogger(__name__)
+
+stream_bp = Blueprint('stream', __name__)
+sock = Sock()  # bound to the app in app.py
+
+
+def _parse_message(message, seq):
+    """Binary messages are encoded images; text messages are JSON `{"frame": data_url, "seq": n}`."""
+    if isinstance(message, (bytes, bytearray)):
+        return seq, FramePayload(bytes(message))
+
+    data = json.loads(message)
+    return data.get('seq', seq), FramePayload(decode_data_url(data['frame']))
+
+
+def _inference_worker(ws, send, slot, track, mode):
+    """Run `_detect_frames`; if it fails outright, report it and close the connection instead of going silent."""
+    try:
+        _detect_frames(send, slot, track, mode)
+    except Exception as e:
+        logger.exception(f"yolo_stream worker failed: {e}")
+        slot.close()
+        try:
+            send({"error": str(e)})
+            ws.close()
+        except ConnectionClosed:
+            pass
+
+
+def _detect_frames(send, slot, track, mode):
+    """Detect the newest pending frame and push its result back, until the connection closes."""
+    # Import here to reuse the same YOLOService, scheduler and cache from detection.py
+    from routes.detection import detect_payload, new_tracked_detector
+
+    tracked = new_tracked_detector(mode) if track else None
+
+    while True:
+        item = slot.take()
+        if item is None:
+            return
+
+        seq, payload, received_at = item
+        try:
+            if tracked:
+                # Propagated frames are never decoded, so check the payload itself
+                payload.check()
+                result = tracked.process(payload.decode)
+            else:
+                result = detect_payload(payload, mode)
+            if result is None:
+                message = {"seq": seq, "error": "Failed to decode image"}
+            else:
+                message = dict(result, seq=seq)
+        except Exception as e:
+            logger.error(f"Error in yolo_stream: {str(e)}")
+            message = {"seq": seq, "error": str(e)}
+
+        message["latency_ms"] = round((time.perf_counter() - received_at) * 1000.0, 1)
+        message["dropped_frames"] = slot.dropped
+
+        try:
+            send(message)
+        except ConnectionClosed:
+            slot.close()
+            return
+
+
+@sock.route('/api/yolo/stream', bp=stream_bp)
+def yolo_stream(ws):
+    """Persistent YOLO detection stream.
+
+    Clients send frames as fast as they like; only the newest frame waiting for the model
+    is kept, and each result is pushed back as soon as it is ready.
+    Connect with `?track=1` to get stable track ids, with full detection every few frames,
+    with `?mode=tiled` for tiled small-object inference and with `?mode=cascade` to run
+    the traffic model only on sign candidates.
+    """
+    from routes.detection import yolo_schedulers
+
+    # The receiver (error replies) and the worker (results) both send; simple-websocket does not serialize them
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            ws.send(json.dumps(message))
+
+    track = request.args.get('track', '').lower() in ('1', 'true', 'yes')
+    mode = request.args.get('mode') or None
+    if mode is not None and mode not in yolo_schedulers:
+        send({"error": f"Unknown inference mode: {mode}. Use one of: {', '.join(yolo_schedulers)}"})
+        ws.close()
+        return
+
+    slot = LatestFrameSlot()
+    worker = threading.Thread(target=_inference_worker, args=(ws, send, slot, track, mode), name='yolo-stream',
+                              daemon=True)
+    worker.start()
+
+    seq = 0
+    try:
+        while not slot.closed:
+            message = ws.receive()
+            if message is None:
+                continue
+            try:
+                seq, payload = _parse_message(message, seq + 1)
+            except Exception as e:
+                send({"error": f"Invalid frame message: {str(e)}"})
+                continue
+            slot.put((seq, payload, time.perf_counter()))
+    except ConnectionClosed:
+        pass
+    finally:
+        slot.close()
+        worker.join(timeout=5)
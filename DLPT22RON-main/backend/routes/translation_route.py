@@ -1,37 +1,90 @@
 
 from flask import Blueprint, request, jsonify
-from services.translation_service import TranslationService
+from services.batch_scheduler import BatchScheduler
+from services.model_registry import model_registry
+from services.result_cache import ResultCache
+import config
 
 translation_bp = Blueprint('translation', __name__)
-translation_service = TranslationService()
+
+# Map frontend language codes to mBART language codes
+language_map = {
+    'en': 'en_XX',  # English
+    'hi': 'hi_IN',  # Hindi
+    'te': 'te_IN',  # Telugu
+    'ja': 'ja_XX',  # Japanese
+    'zh': 'zh_CN',  # Chinese
+    'es': 'es_XX'   # Spanish
+}
+frontend_language = {mbart: code for code, mbart in language_map.items()}
+
+
+def _load_translation_service():
+    from services.translation_service import TranslationService
+    return TranslationService()
+
+
+model_registry.register('translation', _load_translation_service)
+
+
+def get_translation_service():
+    """The mBART translation service, loaded on first use."""
+    return model_registry.get('translation')
+
+
+# Strings from concurrent requests are translated together, one generate() call per language pair
+translation_scheduler = BatchScheduler(
+    lambda items: get_translation_service().translate_batch(items),
+    max_batch_size=config.TRANSLATION_BATCH_MAX_SIZE,
+    max_wait_ms=config.TRANSLATION_BATCH_MAX_WAIT_MS,
+    name='translation'
+)
+
+# Translations keyed on (text, source, target); announcements repeat the same few phrases
+translation_cache = ResultCache(
+    max_entries=config.TRANSLATION_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.TRANSLATION_CACHE_TTL_S
+)
+
+
+def translate_text(text, source_lang, target_lang):
+    """Cached, coalesced and batched translation between mBART language codes.
+
+    Detection vocabulary (labels, positions, distances) comes straight from the phrase
+    bundle once it is loaded; only other text goes through mBART.
+    """
+    if source_lang == 'en_XX' and model_registry.is_ready('phrases'):
+        bundled = model_registry.get('phrases').translation(frontend_language.get(target_lang), text)
+        if bundled is not None:
+            return bundled
+    key = ResultCache.key_for(text.encode(), b'\0', source_lang.encode(), b'\0', target_lang.encode())
+    return translation_cache.get_or_compute(
+        key, lambda: translation_scheduler.submit((text, source_lang, target_lang))
+    )
+
 
 @translation_bp.route('/translate', methods=['POST'])
 def translate():
     try:
         data = request.get_json()
         text = data.get('text')
-        
-        # Map frontend language codes to mBART language codes
-        language_map = {
-            'en': 'en_XX',  # English
-            'hi': 'hi_IN',  # Hindi
-            'te': 'te_IN',  # Telugu
-            'ja': 'ja_XX',  # Japanese
-            'zh': 'zh_CN',  # Chinese
-            'es': 'es_XX'   # Spanish
-        }
-        
+
         target_lang = language_map.get(data.get('target_lang', 'en'), 'en_XX')
         source_lang = language_map.get(data.get('source_lang', 'en'), 'en_XX')
 
         if not text:
             return jsonify({"error": "No text provided"}), 400
+        if not isinstance(text, str):
+            return jsonify({"error": "Invalid input text"}), 400
 
-        result = translation_service.translate(text, source_lang, target_lang)
-        
-        if "error" in result:
-            return jsonify(result), 500
-            
-        return jsonify(result)
+        try:
+            return jsonify({"translation": translate_text(text, source_lang, target_lang)})
+        except Exception as e:
+            return jsonify({"error": f"Translation failed: {str(e)}"}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@translation_bp.route('/translate/stats', methods=['GET'])
+def translate_stats():
+    """Translation cache hit rate and batch fill counters"""
+    return jsonify({"cache": translation_cache.stats(), "batching": translation_scheduler.stats()})
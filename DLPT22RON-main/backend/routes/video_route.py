@@ -1,12 +1,23 @@
+import logging
 import os
+import json
 import tempfile
-from flask import Blueprint, request, jsonify
+import threading
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from services.video_service import VideoService
+from services.video_job_service import VideoJobManager, JobQueueFull
+import config
+
+logger = logging.getLogger(__name__)
 
 video_bp = Blueprint('video', __name__)
 
 # Lazy initialization — will be set when the app starts
 _video_service = None
+_job_manager = None
+_init_lock = threading.Lock()  # request threads racing to create the above
+
+jobs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'video_jobs')
 
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
 
@@ -16,42 +27,195 @@ def _get_video_service():
     global _video_service
     if _video_service is None:
         # Import here to reuse the same YOLOService instance from detection.py
-        from routes.detection import yolo_service
-        _video_service = VideoService(yolo_service)
+        from routes.detection import get_yolo_service
+        with _init_lock:
+            if _video_service is None:
+                _video_service = VideoService(get_yolo_service())
     return _video_service
 
 
+def _get_job_manager():
+    """Lazy-init the video job manager (fails jobs left behind by dead workers on first use)."""
+    global _job_manager
+    if _job_manager is None:
+        video_service = _get_video_service()
+        with _init_lock:
+            if _job_manager is None:
+                _job_manager = VideoJobManager(
+                    video_service,
+                    jobs_dir,
+                    max_workers=config.VIDEO_MAX_JOBS,
+                    max_pending=config.VIDEO_MAX_PENDING_JOBS
+                )
+    return _job_manager
+
+
 def _allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-@video_bp.route('/api/video/upload', methods=['POST', 'OPTIONS'])
-def upload_video():
-    """Upload a video file, process it with YOLO, return annotated screenshots."""
-    if request.method == 'OPTIONS':
-        return '', 204
+def _video_options():
+    """Read the optional frame sampling mode and tracking flag from the form or query string.
+
+    `sampling=adaptive` selects frames by scene change, bounded by `min_interval` /
+    `max_interval`, with `scene_threshold` (0..1) as the trigger score.
+    `track=1` assigns stable track ids across the sampled frames.
+    """
+    values = request.values
+    options = {}
+    if values.get('track', '').lower() in ('1', 'true', 'yes'):
+        options['track'] = True
+    if values.get('sampling'):
+        options['sampling'] = values.get('sampling')
+    for name, cast in (('min_interval', int), ('max_interval', int), ('scene_threshold', float)):
+        if values.get(name) is not None:
+            options[name] = values.get(name, type=cast)
+    return options
+
+
+def _save_upload():
+    """Validate the `video` file in the request and save it to a temp file.
 
+    Returns (path, filename, None) or (None, None, error_response).
+    """
     if 'video' not in request.files:
-        return jsonify({"error": "No video file in request"}), 400
+        return None, None, (jsonify({"error": "No video file in request"}), 400)
 
     file = request.files['video']
     if file.filename == '' or not _allowed_file(file.filename):
-        return jsonify({"error": f"Invalid file. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
+        return None, None, (jsonify({"error": f"Invalid file. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"}), 400)
+
+    ext = file.filename.rsplit('.', 1)[1].lower()
+    tmp = tempfile.NamedTemporaryFile(suffix=f'.{ext}', delete=False)
+    file.save(tmp.name)
+    tmp.close()
+    return tmp.name, file.filename, None
+
+
+@video_bp.route('/api/video/upload', methods=['POST', 'OPTIONS'])
+def upload_video():
+    """Upload a video file, process it with YOLO, return annotated screenshots."""
+    if request.method == 'OPTIONS':
+        return '', 204
 
     try:
         # Save to temp file
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        tmp = tempfile.NamedTemporaryFile(suffix=f'.{ext}', delete=False)
-        file.save(tmp.name)
-        tmp.close()
+        path, _, error = _save_upload()
+        if error:
+            return error
 
         # Process the video
         svc = _get_video_service()
-        result = svc.process_video(tmp.name, frame_interval=30)
+        result = svc.process_video(path, frame_interval=30, **_video_options())
         return jsonify(result)
 
     except Exception as e:
-        print(f"Error processing video: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error processing video: {e}")
         return jsonify({"error": str(e)}), 500
+
+
+def _format_event(event, data, fmt):
+    """Serialize one video event as an NDJSON line or a server-sent event."""
+    payload = json.dumps(dict(data, type=event))
+    if fmt == 'sse':
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+@video_bp.route('/api/video/upload_stream', methods=['POST', 'OPTIONS'])
+def upload_video_stream():
+    """Upload a video and stream each annotated screenshot record as soon as it is written.
+
+    Responds with NDJSON by default, or server-sent events with `?format=sse`.
+    The first record is `start`, then one `screenshot` per frame, and `summary` last.
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+
+    fmt = 'sse' if request.args.get('format') == 'sse' else 'ndjson'
+    frame_interval = request.args.get('frame_interval', 30, type=int)
+    video_options = _video_options()
+
+    try:
+        path, _, error = _save_upload()
+        if error:
+            return error
+        svc = _get_video_service()
+    except Exception as e:
+        logger.error(f"Error processing video: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        try:
+            for event, data in svc.iter_video(path, frame_interval=frame_interval, **video_options):
+                yield _format_event(event, data, fmt)
+        except Exception as e:
+            logger.error(f"Error processing video: {e}")
+            yield _format_event("error", {"error": str(e)}, fmt)
+
+    mimetype = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@video_bp.route('/api/video/jobs', methods=['POST', 'OPTIONS'])
+def create_video_job():
+    """Upload a video and queue it for background processing; returns a job id immediately."""
+    if request.method == 'OPTIONS':
+        return '', 204
+
+    try:
+        path, filename, error = _save_upload()
+        if error:
+            return error
+
+        frame_interval = int(request.form.get('frame_interval', 30))
+        try:
+            job = _get_job_manager().submit(path, frame_interval=frame_interval, filename=filename,
+                                            options=_video_options())
+        except JobQueueFull as e:
+            os.remove(path)
+            return jsonify({"error": str(e)}), 429
+
+        return jsonify({"job_id": job.id, "status": job.status}), 202
+
+    except Exception as e:
+        logger.exception(f"Error creating video job: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@video_bp.route('/api/video/jobs', methods=['GET'])
+def list_video_jobs():
+    """List all known jobs with their status and progress (without screenshots)."""
+    jobs = []
+    for job in _get_job_manager().list_jobs():
+        info = job.to_dict()
+        info.pop("screenshots")
+        jobs.append(info)
+    return jsonify({"jobs": jobs})
+
+
+@video_bp.route('/api/video/jobs/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    """Job status, progress (frames done / total, ETA) and screenshots produced so far.
+
+    Pass `?since=N` to receive only screenshots after the first N.
+    """
+    job = _get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    since = max(0, request.args.get('since', 0, type=int))
+    return jsonify(job.to_dict(since=since))
+
+
+@video_bp.route('/api/video/jobs/<job_id>/cancel', methods=['POST', 'OPTIONS'])
+def cancel_video_job(job_id):
+    """Cancel a queued or running job; screenshots already written are kept."""
+    if request.method == 'OPTIONS':
+        return '', 204
+
+    job = _get_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job_id": job.id, "status": job.status, "cancel_requested": True})
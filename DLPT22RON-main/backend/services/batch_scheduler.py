@@ -0,0 +1,149 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from utils.metrics import QUEUE_DEPTH, observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """Collects items submitted from many request threads and runs them through `batch_fn` together.
+
+    A batch is closed as soon as it holds `max_batch_size` items or the oldest item
+    in it has waited `max_wait_ms`, so queueing delay is bounded by the wait window.
+    `batch_fn` receives a list of items and must return a list of results in the same order;
+    an exception instance in that list fails only its own item's Future.
+
+    Worker threads start on the first submit in each process, so a scheduler created at
+    import time in a pre-forking server's master still works in the forked workers.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=15.0, name='batch', num_workers=1):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._recent_waits = deque(maxlen=1024)
+
+        self.num_workers = max(1, int(num_workers))
+        self._workers = []
+        self._workers_pid = None
+        self._start_lock = threading.Lock()
+        QUEUE_DEPTH.set_function(self.queue_depth, scheduler=name)
+
+    def _ensure_workers(self):
+        if self._workers_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._workers_pid == os.getpid():
+                return
+            self._workers = []
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._run, name=f'{self.name}-scheduler-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            self._workers_pid = os.getpid()
+
+    def submit_async(self, item):
+        """Queue an item and return a Future that resolves to its result."""
+        self._ensure_workers()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def submit(self, item, timeout=None):
+        """Queue an item and block until its batch has been processed."""
+        return self.submit_async(item).result(timeout=timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            items = [item for item, _, _ in batch]
+
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                logger.error(f"Error in {self.name} batch: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                self._record(waits, time.perf_counter() - started, failed=True)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self._record(waits, time.perf_counter() - started)
+
+    def _record(self, waits, run_time, failed=False):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(waits)
+            self._errors += int(failed)
+            self._run_total += run_time
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+            self._recent_waits.extend(waits)
+        for wait in waits:
+            observe_stage('queue_wait', wait, model=self.name)
+
+    def stats(self):
+        """Counters for batch fill rate and queue wait, suitable for a status endpoint."""
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+            recent = sorted(self._recent_waits)
+            stats = {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self.queue_depth(),
+                "batches": batches,
+                "items": items,
+                "errors": self._errors,
+                "avg_batch_size": items / batches if batches else 0.0,
+                "fill_rate": items / (batches * self.max_batch_size) if batches else 0.0,
+                "avg_batch_ms": self._run_total / batches * 1000.0 if batches else 0.0,
+                "avg_queue_wait_ms": self._wait_total / items * 1000.0 if items else 0.0,
+                "max_queue_wait_ms": self._wait_max * 1000.0,
+            }
+        if recent:
+            stats["p50_queue_wait_ms"] = recent[len(recent) // 2] * 1000.0
+            stats["p99_queue_wait_ms"] = recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000.0
+        return stats
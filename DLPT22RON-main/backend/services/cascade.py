@@ -0,0 +1,135 @@
+import threading
+import cv2
+import numpy as np
+
+# Saturated sign colours in OpenCV HSV (H is 0..179): red wraps around 0
+SIGN_COLOURS = {
+    "red": [((0, 100, 70), (10, 255, 255)), ((170, 100, 70), (179, 255, 255))],
+    "blue": [((100, 120, 60), (130, 255, 255))],
+    "yellow": [((18, 120, 100), (35, 255, 255))],
+}
+
+
+def colour_candidates(frame, work_width=320, min_area=30, max_fraction=0.9, max_candidates=6):
+    """Cheap sign pre-filter: compact blobs of saturated red/blue/yellow, as frame-pixel xyxy boxes.
+
+    Runs on a `work_width`-wide thumbnail. A blob counts when it is roughly as wide as it
+    is tall and fills a fair part of its bounding box (discs, triangles, octagons,
+    rectangles), which rejects most sky, foliage and road-marking false positives. Only
+    blobs covering nearly the whole frame (a colour cast) are dropped for size: a close-up
+    sign can fill most of it.
+    """
+    height, width = frame.shape[:2]
+    scale = work_width / float(width)
+    small = cv2.resize(frame, (work_width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+
+    mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+    for ranges in SIGN_COLOURS.values():
+        for low, high in ranges:
+            mask |= cv2.inRange(hsv, np.array(low, dtype=np.uint8), np.array(high, dtype=np.uint8))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), dtype=np.uint8))
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    max_area = max_fraction * mask.shape[0] * mask.shape[1]
+    boxes = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < min_area or area > max_area:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        if not 0.4 <= w / float(h) <= 2.5 or area / float(w * h) < 0.35:
+            continue
+        boxes.append((area, [x / scale, y / scale, (x + w) / scale, (y + h) / scale]))
+
+    boxes.sort(key=lambda item: -item[0])
+    return [box for _, box in boxes[:max_candidates]]
+
+
+def crop_windows(regions, frame_width, frame_height, pad=0.5, min_size=160):
+    """Square-ish crop windows around candidate regions, padded for context; overlapping ones are merged."""
+    windows = []
+    for x1, y1, x2, y2 in regions:
+        w, h = x2 - x1, y2 - y1
+        size = max(min_size, w * (1 + 2 * pad), h * (1 + 2 * pad))
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        windows.append([max(0, cx - size / 2), max(0, cy - size / 2),
+                        min(frame_width, cx + size / 2), min(frame_height, cy + size / 2)])
+
+    # Merge until no two windows overlap, so no area is run through the model twice
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(windows)):
+            for j in range(i + 1, len(windows)):
+                a, b = windows[i], windows[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    windows[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del windows[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [tuple(int(round(v)) for v in window) for window in windows]
+
+
+class CascadeStats:
+    """Skip ratio and traffic-stage latency of cascade mode against running it on every full frame."""
+
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.full_frame_ms = None  # EWMA of the traffic model's per-frame cost on full frames
+        self.frames = 0
+        self.skipped = 0
+        self.crops = 0
+        self.triggers = {"coco": 0, "colour": 0}
+        self.stage_ms = 0.0
+        self.saved_ms = 0.0
+        self.saved_frames = 0  # frames that had a full-frame baseline to compare with
+
+    def record_full(self, elapsed_ms, frames):
+        """Traffic model time for `frames` whole frames (from the non-cascade modes)."""
+        per_frame = elapsed_ms / max(1, frames)
+        with self._lock:
+            self.full_frame_ms = per_frame if self.full_frame_ms is None else \
+                (1 - self.alpha) * self.full_frame_ms + self.alpha * per_frame
+
+    def record_frame(self, stage_ms, crops, coco, colour):
+        """Record one cascade frame; returns its per-frame report for the response."""
+        baseline = self.full_frame_ms
+        report = {
+            "traffic_model_run": crops > 0,
+            "crops": crops,
+            "candidates": {"coco": coco, "colour": colour},
+            "traffic_stage_ms": round(stage_ms, 2),
+            "saved_ms": round(baseline - stage_ms, 2) if baseline is not None else None,
+        }
+        self.add(report)
+        return report
+
+    def add(self, report):
+        """Count a per-frame report (also used to aggregate reports from worker processes)."""
+        with self._lock:
+            self.frames += 1
+            self.skipped += int(not report["traffic_model_run"])
+            self.crops += report["crops"]
+            self.triggers["coco"] += int(report["candidates"]["coco"] > 0)
+            self.triggers["colour"] += int(report["candidates"]["colour"] > 0)
+            self.stage_ms += report["traffic_stage_ms"]
+            if report["saved_ms"] is not None:
+                self.saved_ms += report["saved_ms"]
+                self.saved_frames += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "frames_skipped": self.skipped,
+                "skip_ratio": round(self.skipped / self.frames, 4) if self.frames else 0.0,
+                "crops": self.crops,
+                "frames_triggered_by": dict(self.triggers),
+                "avg_traffic_stage_ms": round(self.stage_ms / self.frames, 2) if self.frames else 0.0,
+                "full_frame_traffic_ms": round(self.full_frame_ms, 2) if self.full_frame_ms is not None else None,
+                "avg_saved_ms": round(self.saved_ms / self.saved_frames, 2) if self.saved_frames else None,
+            }
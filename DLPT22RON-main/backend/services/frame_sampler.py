@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+from collections import Counter
+
+
+class FixedIntervalSampler:
+    """Selects one frame every `interval` frames."""
+
+    mode = 'fixed'
+
+    def __init__(self, interval=30):
+        self.interval = max(1, int(interval))
+        self.selected = Counter()
+        self.skipped = Counter()
+
+    def wants(self, frame_idx):
+        """Whether the frame has to be decoded; frames that do not are skipped with grab() only."""
+        if frame_idx % self.interval == 0:
+            return True
+        self.skipped['interval'] += 1
+        return False
+
+    def select(self, frame_idx, frame):
+        """Return why a decoded frame is sent to YOLO, or None to skip it."""
+        self.selected['interval'] += 1
+        return 'interval'
+
+    def skip(self, count, reason='interval'):
+        """Record frames passed over without being looked at (e.g. by seeking)."""
+        self.skipped[reason] += count
+
+    def expected_selections(self, total_frames):
+        return -(-total_frames // self.interval)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "frame_interval": self.interval,
+            "frames_selected": sum(self.selected.values()),
+            "frames_skipped": sum(self.skipped.values()),
+            "selected": dict(self.selected),
+            "skipped": dict(self.skipped),
+        }
+
+
+class SceneChangeSampler(FixedIntervalSampler):
+    """Selects frames by a cheap scene-change score, bounded by a min and max interval.
+
+    Frames closer than `min_interval` to the last selected frame are skipped without
+    decoding. After that every frame is decoded, shrunk to a small grayscale thumbnail,
+    and selected once its mean absolute difference from the last selected thumbnail
+    reaches `threshold` (0..1), or unconditionally at `max_interval`.
+    """
+
+    mode = 'adaptive'
+
+    def __init__(self, min_interval=5, max_interval=90, threshold=0.08, thumb_size=(64, 36)):
+        super().__init__(min_interval)
+        self.min_interval = max(1, int(min_interval))
+        self.max_interval = max(self.min_interval, int(max_interval))
+        self.threshold = float(threshold)
+        self.thumb_size = thumb_size
+        self._last_idx = None
+        self._last_thumb = None
+        self._scores = []
+
+    def wants(self, frame_idx):
+        if self._last_idx is None or frame_idx - self._last_idx >= self.min_interval:
+            return True
+        self.skipped['min_interval'] += 1
+        return False
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def select(self, frame_idx, frame):
+        thumb = self._thumbnail(frame)
+
+        if self._last_thumb is None:
+            reason = 'first_frame'
+        else:
+            score = float(np.abs(thumb - self._last_thumb).mean()) / 255.0
+            self._scores.append(score)
+            if score >= self.threshold:
+                reason = 'scene_change'
+            elif frame_idx - self._last_idx >= self.max_interval:
+                reason = 'max_interval'
+            else:
+                self.skipped['static_scene'] += 1
+                return None
+
+        self._last_idx = frame_idx
+        self._last_thumb = thumb
+        self.selected[reason] += 1
+        return reason
+
+    def expected_selections(self, total_frames):
+        # Depends on the footage; only the bounds are known up front
+        return None
+
+    def stats(self):
+        stats = super().stats()
+        del stats["frame_interval"]
+        stats.update({
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "threshold": self.threshold,
+            "mean_scene_score": round(float(np.mean(self._scores)), 4) if self._scores else 0.0,
+        })
+        return stats
+
+
+def make_sampler(mode='fixed', frame_interval=30, min_interval=5, max_interval=90, threshold=0.08):
+    """Build the sampler for a `sampling` mode name ('fixed' or 'adaptive')."""
+    if mode == 'adaptive':
+        return SceneChangeSampler(min_interval, max_interval, threshold)
+    if mode == 'fixed':
+        return FixedIntervalSampler(frame_interval)
+    raise ValueError(f"Unknown sampling mode: {mode}")
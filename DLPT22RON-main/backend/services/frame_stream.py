@@ -0,0 +1,42 @@
+import threading
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox between a stream's receiver and its inference worker.
+
+    Putting a new frame replaces any frame that has not been picked up yet (latest wins),
+    so a slow model never builds a backlog of stale frames.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            self.received += 1
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def take(self, timeout=None):
+        """Block until a frame is available and return it; None once the slot is closed."""
+        with self._cond:
+            while self._item is None and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
@@ -2,8 +2,13 @@ import cv2
 import numpy as np
 import os
 import time
+from typing import TYPE_CHECKING
 from pathlib import Path
-from services.yolo_service import YOLOService
+from utils.frames import FramePayload
+from utils.metrics import stage
+
+if TYPE_CHECKING:
+    from services.yolo_service import YOLOService
 
 
 class ImageService:
@@ -14,8 +19,10 @@ class ImageService:
     COLOR_PERSON = (200, 0, 200)      # Purple
     COLOR_TRAFFIC = (255, 140, 0)     # Blue-ish
 
-    def __init__(self, yolo_service: YOLOService):
+    def __init__(self, yolo_service: 'YOLOService', detect_payload=None):
         self.yolo_service = yolo_service
+        # routes.detection.detect_payload: batch scheduler plus the result cache shared with /api/yolo/detect
+        self.detect_payload = detect_payload
         self.static_dir = Path(__file__).parent.parent / 'static' / 'image_results'
         self.static_dir.mkdir(parents=True, exist_ok=True)
 
@@ -29,21 +36,30 @@ class ImageService:
         Returns:
             dict with detection summary and url to annotated image.
         """
-        img = cv2.imread(image_path)
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+
+        payload = FramePayload(image_bytes)
+        img = payload.decode()
         if img is None:
             raise ValueError("Could not open image file")
 
-        # Run detection
-        result = self.yolo_service.detect_objects(img)
+        # Run detection (the same image sent to /api/yolo/detect or re-uploaded reuses the cached result)
+        if self.detect_payload is not None:
+            result = self.detect_payload(payload)
+        else:
+            result = self.yolo_service.detect_objects(img)
 
         # Draw bounding boxes
-        annotated = self._draw_detections(img.copy(), result)
+        with stage('annotate'):
+            annotated = self._draw_detections(img.copy(), result)
 
         # Save annotated image
         timestamp = int(time.time())
         filename = f"detected_{timestamp}.jpg"
         filepath = self.static_dir / filename
-        cv2.imwrite(str(filepath), annotated, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        with stage('jpeg_encode'):
+            cv2.imwrite(str(filepath), annotated, [cv2.IMWRITE_JPEG_QUALITY, 90])
 
         # Counts
         n_obj = len(result["objects"])
@@ -0,0 +1,488 @@
+import argparse
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+import numpy as np
+from services.cascade import CascadeStats
+from services.yolo_postprocess import position_label
+from utils.metrics import stage
+import config
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).parent.parent
+AUTHKEY_ENV = 'INFERENCE_POOL_AUTHKEY'
+
+
+class WorkerDied(RuntimeError):
+    """Raised for batches that were in flight on a worker process that exited."""
+
+
+class _Worker:
+    """Parent-side handle of one inference process and its shared-memory frame ring."""
+
+    def __init__(self, index, cpus, slots, slot_bytes):
+        self.index = index
+        self.cpus = cpus
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free_slots = deque(range(slots))
+        self.slot_generation = 0  # bumped when the ring is reset for a restarted process
+        self.slot_cond = threading.Condition()
+        self.send_lock = threading.Lock()
+        self.pending = {}  # job id -> (Future, slot lease, send time)
+        self.in_flight = 0
+        self.process = None
+        self.conn = None
+        self.connected = threading.Event()
+        self.pid = None
+        self.alive = False
+        self.batches = 0
+        self.frames = 0
+        self.inline_frames = 0
+
+    def acquire_slots(self, count):
+        """Reserve `count` slots; returns a (generation, slots) lease for release_slots."""
+        with self.slot_cond:
+            while len(self.free_slots) < count:
+                self.slot_cond.wait()
+            return self.slot_generation, [self.free_slots.popleft() for _ in range(count)]
+
+    def release_slots(self, lease):
+        """Return a lease's slots, unless the ring has been reset since it was taken."""
+        if lease is None:
+            return
+        generation, slots = lease
+        with self.slot_cond:
+            if generation != self.slot_generation:
+                return
+            self.free_slots.extend(slots)
+            self.slot_cond.notify_all()
+
+    def reset_slots(self):
+        """Free every slot for a fresh process; leases taken before this are ignored on release."""
+        with self.slot_cond:
+            self.slot_generation += 1
+            self.free_slots = deque(range(self.slots))
+            self.slot_cond.notify_all()
+
+    def slot_view(self, slot, shape, dtype):
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+
+class InferencePool:
+    """YOLO inference spread over worker processes, with the same interface as YOLOService.
+
+    Each worker is a separate Python process that loads YOLOService once, is pinned to
+    its own CPU subset and sets its own torch thread count, so concurrent batches no
+    longer contend for one GIL or one intra-op thread pool. Frames are copied into a
+    per-worker `multiprocessing.shared_memory` ring of fixed-size slots and only slot
+    indices/shapes travel over the control connection; results (small dicts) come back
+    pickled. Frames bigger than a slot fall back to being sent inline.
+
+    Workers are started lazily on the first batch and restarted if they die; batches
+    that were running on a dead worker fail with WorkerDied.
+    """
+
+    def __init__(self, num_workers=2, threads_per_worker=0, slots_per_worker=16,
+                 slot_bytes=1920 * 1080 * 3, start_timeout=300.0):
+        self.num_workers = max(1, int(num_workers))
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+        self.threads_per_worker = int(threads_per_worker) or max(1, len(available) // self.num_workers)
+        self.slots_per_worker = max(1, int(slots_per_worker))
+        self.slot_bytes = int(slot_bytes)
+        self.start_timeout = start_timeout
+
+        # Contiguous core blocks when the machine has enough of them, otherwise leave scheduling to the OS
+        if self.num_workers * self.threads_per_worker <= len(available):
+            self.cpu_sets = [available[i * self.threads_per_worker:(i + 1) * self.threads_per_worker]
+                             for i in range(self.num_workers)]
+        else:
+            logger.warning(f"InferencePool: {self.num_workers} x {self.threads_per_worker} threads exceeds "
+                           f"{len(available)} CPUs, workers will not be pinned")
+            self.cpu_sets = [None] * self.num_workers
+
+        self._workers = []
+        self._lock = threading.Lock()            # dispatch bookkeeping and counters
+        self._lifecycle_lock = threading.Lock()  # starting, restarting and closing workers
+        self._started = False
+        self._closed = False
+        self._next_job = 0
+        self._listener = None
+        self._authkey = secrets.token_bytes(32)
+        self._queue_depth_fn = None
+        self._tier_time_ms = {}
+        self._tier_frames = {}
+        self._last_tier = None
+        self._cascade = CascadeStats()
+
+    # ── YOLOService interface ──
+
+    @staticmethod
+    def get_position(frame_width, center_x):
+        return position_label(frame_width, center_x)
+
+    def detect_objects(self, frame):
+        return self.detect_batch([frame])[0]
+
+    def set_queue_depth_fn(self, queue_depth_fn):
+        """Queue depth is forwarded with every batch so each worker's load governor can use it."""
+        self._queue_depth_fn = queue_depth_fn
+
+    def tier_stats(self):
+        """Time spent per model tier across all workers (each worker runs its own governor)."""
+        with self._lock:
+            return {
+                "current_tier": self._last_tier,
+                "tiers": {
+                    tier: {
+                        "frames": self._tier_frames[tier],
+                        "time_ms": round(self._tier_time_ms[tier], 1),
+                        "avg_frame_ms": round(self._tier_time_ms[tier] / self._tier_frames[tier], 2),
+                    } for tier in self._tier_frames
+                },
+            }
+
+    def warmup(self):
+        """Start the workers now; each warms its models up before reporting ready."""
+        self.start()
+
+    def cascade_stats(self):
+        """Cascade skip ratio and savings aggregated from the per-frame reports of all workers."""
+        return self._cascade.stats()
+
+    def detect_batch(self, frames, mode=None, observe=False):
+        """Run frames on the least busy worker; returns one result dict per frame, in order."""
+        frames = list(frames)
+        if not frames:
+            return []
+        self.start()
+
+        # A batch larger than the slot ring is split so it can never wait on itself
+        futures = [self._submit(frames[i:i + self.slots_per_worker], mode, observe)
+                   for i in range(0, len(frames), self.slots_per_worker)]
+        results = []
+        with stage('pool_inference', model='yolo'):
+            for future in futures:
+                results.extend(future.result())
+        return results
+
+    # ── Lifecycle ──
+
+    def start(self):
+        """Spawn all workers and wait until each has loaded its models."""
+        if self._started:
+            return
+        with self._lifecycle_lock:
+            if self._started:
+                return
+            if self._closed:
+                raise RuntimeError("InferencePool is closed")
+
+            self._listener = Listener(('127.0.0.1', 0), authkey=self._authkey)
+            self._workers = [_Worker(i, self.cpu_sets[i], self.slots_per_worker, self.slot_bytes)
+                             for i in range(self.num_workers)]
+            threading.Thread(target=self._accept, args=(self._listener,),
+                             name='inference-accept', daemon=True).start()
+            for worker in self._workers:
+                self._spawn(worker)
+            deadline = time.monotonic() + self.start_timeout
+            for worker in self._workers:
+                self._wait_ready(worker, deadline)
+            self._started = True
+            logger.info(f"InferencePool: {self.num_workers} workers x {self.threads_per_worker} threads ready")
+
+    def close(self):
+        with self._lifecycle_lock:
+            self._closed = True
+            for worker in self._workers:
+                self._stop(worker)
+                worker.shm.close()
+                worker.shm.unlink()
+            if self._listener is not None:
+                self._listener.close()
+            self._workers = []
+            self._started = False
+
+    def _spawn(self, worker):
+        cmd = [
+            sys.executable, '-m', 'services.inference_pool',
+            '--address', '%s:%d' % self._listener.address,
+            '--index', str(worker.index),
+            '--threads', str(self.threads_per_worker),
+            '--shm', worker.shm.name,
+            '--slot-bytes', str(worker.slot_bytes),
+        ]
+        if worker.cpus:
+            cmd += ['--cpus', ','.join(map(str, worker.cpus))]
+
+        env = dict(os.environ)
+        env[AUTHKEY_ENV] = self._authkey.hex()
+        # Must be set before torch is imported in the worker to bound its OpenMP pool
+        env['OMP_NUM_THREADS'] = str(self.threads_per_worker)
+        env['MKL_NUM_THREADS'] = str(self.threads_per_worker)
+        worker.process = subprocess.Popen(cmd, cwd=str(BACKEND_DIR), env=env)
+
+    def _wait_ready(self, worker, deadline):
+        """Accept the worker's connection and block until it reports its models are loaded."""
+        while True:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Inference worker {worker.index} did not start in {self.start_timeout}s")
+            if worker.process.poll() is not None:
+                raise RuntimeError(f"Inference worker {worker.index} exited with code {worker.process.returncode}")
+            if not worker.connected.wait(0.5):
+                continue
+            if worker.conn.poll(0.5):
+                status, detail = worker.conn.recv()
+                if status != 'ready':
+                    raise RuntimeError(f"Inference worker {worker.index} failed to start: {detail}")
+                worker.pid = detail
+                worker.alive = True
+                threading.Thread(target=self._collect, args=(worker,),
+                                 name=f'inference-collect-{worker.index}', daemon=True).start()
+                return
+
+    def _accept(self, listener):
+        """Hand each incoming worker connection to the worker it names (they connect in any order)."""
+        while True:
+            try:
+                conn = listener.accept()
+                index = conn.recv()
+            except (OSError, EOFError):
+                if self._closed:
+                    return
+                continue
+            worker = self._workers[index]
+            worker.conn = conn
+            worker.connected.set()
+
+    def _restart(self, worker):
+        with self._lifecycle_lock:
+            if worker.alive or self._closed:
+                return
+            self._stop(worker)
+            worker.reset_slots()
+            try:
+                self._spawn(worker)
+                self._wait_ready(worker, time.monotonic() + self.start_timeout)
+            except Exception as e:
+                logger.warning(f"InferencePool: could not restart worker {worker.index}: {e}")
+                raise
+
+    def _stop(self, worker):
+        if worker.conn is not None:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except (OSError, EOFError):
+                pass
+            worker.conn.close()
+            worker.conn = None
+            worker.connected.clear()
+        if worker.process is not None:
+            try:
+                worker.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+        worker.alive = False
+
+    # ── Dispatch ──
+
+    def _pick_worker(self):
+        with self._lock:
+            alive = [w for w in self._workers if w.alive]
+            worker = min(alive or self._workers, key=lambda w: w.in_flight)
+            worker.in_flight += 1
+            self._next_job += 1
+            return worker, self._next_job
+
+    def _submit(self, frames, mode=None, observe=False):
+        worker, job_id = self._pick_worker()
+        future = Future()
+        lease, registered = None, False
+        try:
+            if not worker.alive:
+                # Every worker is down; wait for this one to come back
+                self._restart(worker)
+
+            fits = [frame.nbytes <= worker.slot_bytes for frame in frames]
+            lease = worker.acquire_slots(sum(fits))
+            slot_iter = iter(lease[1])
+            messages = []
+            for frame, fit in zip(frames, fits):
+                if fit:
+                    slot = next(slot_iter)
+                    np.copyto(worker.slot_view(slot, frame.shape, frame.dtype), frame)
+                    messages.append(('shm', slot, frame.shape, frame.dtype.str))
+                else:
+                    messages.append(('inline', np.ascontiguousarray(frame)))
+                    worker.inline_frames += 1
+
+            worker.pending[job_id] = (future, lease, time.perf_counter())
+            registered = True
+            depth = self._queue_depth_fn() if self._queue_depth_fn else 0
+            with worker.send_lock:
+                worker.conn.send((job_id, messages, depth, mode, observe))
+        except Exception as e:
+            # Once registered, a dying worker's collector may already have failed the job
+            # and returned its slots; otherwise they are ours to give back
+            if registered and worker.pending.pop(job_id, None) is None:
+                return future
+            worker.release_slots(lease)
+            with self._lock:
+                worker.in_flight -= 1
+            future.set_exception(e)
+        return future
+
+    def _collect(self, worker):
+        """Resolve futures from one worker's replies until its connection closes."""
+        conn = worker.conn
+        while True:
+            try:
+                job_id, ok, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            future, lease, sent = worker.pending.pop(job_id)
+            worker.release_slots(lease)
+            with self._lock:
+                worker.in_flight -= 1
+                worker.batches += 1
+                if ok and payload:
+                    worker.frames += len(payload)
+                    tier = payload[0].get("tier")
+                    self._last_tier = tier
+                    self._tier_frames[tier] = self._tier_frames.get(tier, 0) + len(payload)
+                    self._tier_time_ms[tier] = self._tier_time_ms.get(tier, 0.0) + (time.perf_counter() - sent) * 1000.0
+                    for result in payload:
+                        if "cascade" in result:
+                            self._cascade.add(result["cascade"])
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+        if worker.conn is conn:
+            worker.alive = False
+        for job_id in list(worker.pending):
+            future, lease, _ = worker.pending.pop(job_id)
+            worker.release_slots(lease)
+            with self._lock:
+                worker.in_flight -= 1
+            future.set_exception(WorkerDied(f"Inference worker {worker.index} exited"))
+        if not self._closed and worker.conn is conn:
+            logger.warning(f"InferencePool: worker {worker.index} exited, restarting it")
+            threading.Thread(target=self._restart, args=(worker,),
+                             name=f'inference-restart-{worker.index}', daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            workers = [{
+                "index": w.index,
+                "pid": w.pid,
+                "alive": w.alive,
+                "cpus": w.cpus,
+                "in_flight": w.in_flight,
+                "batches": w.batches,
+                "frames": w.frames,
+                "inline_frames": w.inline_frames,
+                "free_slots": len(w.free_slots),
+            } for w in self._workers]
+        return {
+            "num_workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "slots_per_worker": self.slots_per_worker,
+            "slot_bytes": self.slot_bytes,
+            "started": self._started,
+            "workers": workers,
+        }
+
+
+# ── Worker process ──
+
+def _attach_shm(name):
+    """Attach to the parent's segment without letting this process's resource tracker unlink it."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
+
+
+def _worker_main(argv=None):
+    parser = argparse.ArgumentParser(description="YOLO inference worker (started by InferencePool)")
+    parser.add_argument('--address', required=True)
+    parser.add_argument('--index', type=int, required=True)
+    parser.add_argument('--threads', type=int, required=True)
+    parser.add_argument('--shm', required=True)
+    parser.add_argument('--slot-bytes', type=int, required=True)
+    parser.add_argument('--cpus', default='')
+    args = parser.parse_args(argv)
+
+    host, port = args.address.rsplit(':', 1)
+    conn = Client((host, int(port)), authkey=bytes.fromhex(os.environ[AUTHKEY_ENV]))
+    conn.send(args.index)
+
+    try:
+        if args.cpus and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, [int(cpu) for cpu in args.cpus.split(',')])
+
+        import torch
+        torch.set_num_threads(args.threads)
+        torch.set_num_interop_threads(1)
+
+        import cv2
+        cv2.setNumThreads(1)
+
+        from services.yolo_service import YOLOService
+        service = YOLOService()
+        if config.MODEL_WARMUP:
+            service.warmup()
+        shm = _attach_shm(args.shm)
+        queue_depth = [0]
+        service.set_queue_depth_fn(lambda: queue_depth[0])
+    except Exception as e:
+        conn.send(('error', str(e)))
+        return 1
+
+    conn.send(('ready', os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        job_id, items, queue_depth[0], mode, observe = message
+        frames = []
+        for item in items:
+            if item[0] == 'shm':
+                _, slot, shape, dtype = item
+                # View straight into the parent's slot; it stays reserved until we reply
+                frames.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=slot * args.slot_bytes))
+            else:
+                frames.append(item[1])
+        try:
+            conn.send((job_id, True, service.detect_batch(frames, mode=mode, observe=observe)))
+        except Exception as e:
+            conn.send((job_id, False, str(e)))
+        del frames
+
+    shm.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_worker_main())
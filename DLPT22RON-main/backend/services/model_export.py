@@ -0,0 +1,205 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from ultralytics import YOLO
+
+logger = logging.getLogger(__name__)
+
+# Backend name -> ultralytics export format and the suffix of what it produces
+EXPORT_FORMATS = {
+    'onnx': ('onnx', '.onnx'),
+    'openvino': ('openvino', '_openvino_model'),
+}
+BACKENDS = ('torch',) + tuple(EXPORT_FORMATS)
+
+
+def exported_model_path(weights_path, backend, imgsz, export_dir):
+    """Cache location of `weights_path` exported for `backend` at input size `imgsz`."""
+    _, suffix = EXPORT_FORMATS[backend]
+    return Path(export_dir) / f"{Path(weights_path).stem}_{imgsz}{suffix}"
+
+
+def _is_fresh(exported, weights_path):
+    """An export is reused until the .pt it came from changes."""
+    if not exported.exists():
+        return False
+    if not os.path.exists(weights_path):
+        return True
+    return exported.stat().st_mtime >= os.path.getmtime(weights_path)
+
+
+@contextmanager
+def _export_lock(target, timeout=900):
+    """Cross-process lock so several inference workers starting together export only once."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    lock_path = target.with_name(target.name + '.lock')
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                # Left behind by a process that died mid-export
+                os.remove(lock_path)
+                deadline = time.monotonic() + timeout
+            time.sleep(0.5)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+def _fix_input_size(exported, backend, imgsz):
+    """Pin the height and width of an export's input to `imgsz`, leaving the batch axis dynamic.
+
+    ultralytics' `dynamic=True` makes every input axis dynamic and `dynamic=False` fixes
+    the batch too, so the export is made dynamic and its spatial axes fixed afterwards.
+    """
+    if backend == 'onnx':
+        import onnx
+        model = onnx.load(str(exported))
+        dims = model.graph.input[0].type.tensor_type.shape.dim
+        dims[2].dim_value = imgsz
+        dims[3].dim_value = imgsz
+        onnx.save(model, str(exported))
+    elif backend == 'openvino':
+        import openvino as ov
+        xml = next(exported.glob('*.xml'))
+        model = ov.Core().read_model(str(xml))
+        model.reshape({model.inputs[0]: ov.PartialShape([-1, 3, imgsz, imgsz])})
+        tmp = xml.with_name('fixed_' + xml.name)
+        ov.save_model(model, str(tmp), compress_to_fp16=False)
+        del model
+        os.replace(tmp, xml)
+        os.replace(tmp.with_suffix('.bin'), xml.with_suffix('.bin'))
+
+
+def export_model(model, weights_path, backend, imgsz, export_dir):
+    """Export a PyTorch YOLO model once and return the cached export's path.
+
+    The input size is fixed at `imgsz` (frames are letterboxed to it); only the batch
+    axis is dynamic so micro-batches of any size can be run. `model` may be None to
+    load it from `weights_path` only when an export has to be made.
+    """
+    target = exported_model_path(weights_path, backend, imgsz, export_dir)
+    if _is_fresh(target, weights_path):
+        return target
+
+    with _export_lock(target):
+        if _is_fresh(target, weights_path):
+            return target
+
+        export_format, _ = EXPORT_FORMATS[backend]
+        logger.info(f"Exporting {Path(weights_path).name} to {backend} (imgsz={imgsz}), this only happens once...")
+        model = model or YOLO(weights_path)
+        # Newer ultralytics rejects `simplify` for formats other than ONNX, even when False
+        options = {'simplify': True} if backend == 'onnx' else {}
+        exported = Path(model.export(format=export_format, imgsz=imgsz, dynamic=True, verbose=False, **options))
+        _fix_input_size(exported, backend, imgsz)
+
+        if target.exists():
+            shutil.rmtree(target) if target.is_dir() else target.unlink()
+        shutil.move(str(exported), str(target))
+        return target
+
+
+def quantized_model_path(weights_path, imgsz, export_dir):
+    return Path(export_dir) / f"{Path(weights_path).stem}_{imgsz}_int8.onnx"
+
+
+def quantize_model(model, weights_path, imgsz, export_dir, calibration_dir, calibration_frames=64):
+    """Export to ONNX (if needed) and calibrate a static INT8 copy once; returns its path."""
+    from services.quantization import quantize_yolo_onnx
+
+    fp32 = export_model(model, weights_path, 'onnx', imgsz, export_dir)
+    target = quantized_model_path(weights_path, imgsz, export_dir)
+    if _is_fresh(target, fp32):
+        return target
+
+    with _export_lock(target):
+        if _is_fresh(target, fp32):
+            return target
+        logger.info(f"Quantizing {Path(weights_path).name} to INT8 with {calibration_frames} calibration frames...")
+        return quantize_yolo_onnx(fp32, target, calibration_dir, imgsz, calibration_frames)
+
+
+class SizedModel:
+    """An exported YOLO model with one artifact per input size, called like a YOLO model.
+
+    Exports only accept the `imgsz` they were made for, so a call at another size (a
+    cheaper tier, tiles, cascade crops) exports the weights for that size on first use
+    and keeps both; `build(imgsz)` returns the artifact's path. A size whose export fails
+    runs on the default-size artifact instead.
+    """
+
+    def __init__(self, build, imgsz):
+        self.imgsz = imgsz
+        self._build = build
+        self._models = {imgsz: (YOLO(str(build(imgsz)), task='detect'), imgsz)}
+        self._lock = threading.Lock()
+
+    def for_size(self, imgsz):
+        """(model, input size it takes) for calls at `imgsz`."""
+        entry = self._models.get(imgsz)
+        if entry is None:
+            with self._lock:
+                entry = self._models.get(imgsz)
+                if entry is None:
+                    try:
+                        entry = (YOLO(str(self._build(imgsz)), task='detect'), imgsz)
+                    except Exception as e:
+                        logger.error(f"Error exporting for imgsz={imgsz}, using the {self.imgsz} export: {e}")
+                        entry = self._models[self.imgsz]
+                    self._models[imgsz] = entry
+        return entry
+
+    def __call__(self, source, imgsz=None, **kwargs):
+        model, imgsz = self.for_size(imgsz or self.imgsz)
+        # The batch axis is dynamic, so ultralytics would otherwise letterbox to a minimal rectangle
+        kwargs.setdefault('rect', False)
+        return model(source, imgsz=imgsz, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._models[self.imgsz][0], name)
+
+
+def load_yolo(weights_path, backend='torch', imgsz=640, export_dir=None, precision='fp32',
+              calibration_dir=None, calibration_frames=64):
+    """Load a YOLO model on the requested runtime, falling back to PyTorch if export fails.
+
+    `precision='int8'` always runs through ONNX Runtime (static INT8 needs the ONNX graph),
+    whatever `backend` says.
+
+    Returns (model, backend actually used), e.g. 'onnx-int8'.
+    """
+    export_dir = export_dir or Path(weights_path).parent / 'exported'
+
+    # Exports load the PyTorch weights only when they have to be (re)made
+    if precision == 'int8':
+        try:
+            quantized = SizedModel(lambda size: quantize_model(
+                None, weights_path, size, export_dir, calibration_dir, calibration_frames), imgsz)
+            return quantized, 'onnx-int8'
+        except Exception as e:
+            logger.error(f"Error quantizing {Path(weights_path).name}, falling back to {backend} FP32: {e}")
+
+    if backend == 'torch':
+        return YOLO(weights_path), 'torch'
+    if backend not in EXPORT_FORMATS:
+        logger.warning(f"Unknown YOLO backend '{backend}', using torch")
+        return YOLO(weights_path), 'torch'
+
+    try:
+        exported = SizedModel(lambda size: export_model(None, weights_path, backend, size, export_dir), imgsz)
+        return exported, backend
+    except Exception as e:
+        logger.error(f"Error exporting {Path(weights_path).name} to {backend}, falling back to torch: {e}")
+        return YOLO(weights_path), 'torch'
@@ -0,0 +1,177 @@
+import gc
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.memory import current_rss_mb
+from utils.metrics import MODEL_MEMORY_MB, MODEL_STATE
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, name, factory, fork_safe):
+        self.name = name
+        self.factory = factory
+        self.fork_safe = fork_safe
+        self.instance = None
+        self.state = 'not_loaded'  # -> loading -> ready | failed
+        self.error = None
+        self.load_s = None
+        self.warmup_s = None
+        self.rss_delta_mb = None
+        self.lock = threading.Lock()  # one load at a time per model
+
+
+class ModelRegistry:
+    """Model-backed services created on first use, or preloaded in parallel in the background.
+
+    Each service is registered with a factory. A new instance's `warmup()` method, if it
+    has one, runs one inference right away so the first real request does not pay for
+    lazy initialization inside the framework (kernel selection, allocator growth). Load and
+    warm-up times, the RSS growth while loading and any error are kept per model for
+    /api/model_status. RSS growth is approximate when several models load at once.
+    """
+
+    def __init__(self, warmup=True):
+        self.warmup = warmup
+        self._entries = {}
+        self.required = []  # models preloaded at startup; the app is ready once they all are
+
+    def register(self, name, factory, fork_safe=True):
+        """`fork_safe=False` marks services that own threads or child processes at load time."""
+        self._entries[name] = _Entry(name, factory, fork_safe)
+
+    def names(self):
+        return list(self._entries)
+
+    def is_ready(self, name):
+        entry = self._entries.get(name)
+        return entry is not None and entry.state == 'ready'
+
+    def get(self, name):
+        """The service instance, loading it now if it is not loaded yet (or failed before)."""
+        entry = self._entries[name]
+        if entry.state == 'ready':
+            return entry.instance
+        with entry.lock:
+            if entry.state != 'ready':
+                self._load(entry)
+            if entry.state == 'failed':
+                raise RuntimeError(f"Model '{name}' failed to load: {entry.error}")
+            return entry.instance
+
+    def _load(self, entry):
+        entry.state, entry.error = 'loading', None
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        try:
+            instance = entry.factory()
+            entry.load_s = time.perf_counter() - started
+            if self.warmup and hasattr(instance, 'warmup'):
+                started = time.perf_counter()
+                instance.warmup()
+                entry.warmup_s = time.perf_counter() - started
+            entry.instance = instance
+            entry.state = 'ready'
+            logger.info(f"Model '{entry.name}' ready in {entry.load_s:.1f}s"
+                        + (f" (+{entry.warmup_s:.1f}s warm-up)" if entry.warmup_s is not None else ""))
+        except Exception as e:
+            entry.state, entry.error = 'failed', str(e)
+            logger.error(f"Error loading model '{entry.name}': {e}")
+        finally:
+            entry.rss_delta_mb = current_rss_mb() - rss_before
+
+    def preload(self, names, max_parallel=2):
+        """Load the given models ('all' = every registered one) in background threads; returns immediately."""
+        if names == 'all':
+            names = self.names()
+        for name in names:
+            if name not in self._entries:
+                logger.warning(f"Unknown model '{name}' in preload list, skipping")
+        names = [name for name in names if name in self._entries]
+        self.required = names
+        if not names:
+            return
+
+        def load(name):
+            try:
+                self.get(name)
+            except Exception:
+                pass  # already recorded in the entry's status
+
+        def run():
+            with ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix='model-preload') as pool:
+                list(pool.map(load, names))
+
+        threading.Thread(target=run, name='model-preload', daemon=True).start()
+
+    def load_shared(self, names):
+        """Load models in a pre-forking server's master so forked workers share their weights.
+
+        Loading and warm-up run on one thread (no OpenMP/OpenCV thread pools exist at fork
+        time, which would deadlock the children); warm-up here also builds the fused/lazy
+        state each runtime creates on its first inference, which would otherwise be a
+        private copy per worker. The loaded objects are then moved out of the garbage
+        collector's reach with gc.freeze(), so collections in the workers do not write to
+        their pages and break copy-on-write sharing. Services marked not fork-safe load
+        lazily in each worker instead.
+        """
+        if names == 'all':
+            names = self.names()
+        names = [name for name in names if name in self._entries]
+        self.required = names
+
+        import cv2
+        cv2.setNumThreads(0)
+        try:
+            import torch
+            torch.set_num_threads(1)
+        except ImportError:
+            pass
+
+        for name in names:
+            if not self._entries[name].fork_safe:
+                logger.warning(f"Model '{name}' is not fork-safe with the current settings, each worker loads its own")
+                continue
+            try:
+                self.get(name)
+            except Exception:
+                pass  # already recorded in the entry's status
+
+        gc.collect()
+        gc.freeze()
+
+    def after_fork(self, threads):
+        """Per-worker setup after the fork: give the runtimes their threads back."""
+        if 'torch' in sys.modules:
+            sys.modules['torch'].set_num_threads(max(1, threads))
+        if 'cv2' in sys.modules:
+            sys.modules['cv2'].setNumThreads(max(1, threads))
+
+    def ready(self):
+        return all(self.is_ready(name) for name in self.required)
+
+    def status(self):
+        models = {
+            entry.name: {
+                "state": entry.state,
+                "load_s": round(entry.load_s, 2) if entry.load_s is not None else None,
+                "warmup_s": round(entry.warmup_s, 2) if entry.warmup_s is not None else None,
+                "rss_delta_mb": round(entry.rss_delta_mb, 1) if entry.rss_delta_mb is not None else None,
+                "error": entry.error,
+            } for entry in self._entries.values()
+        }
+        return {"ready": self.ready(), "models": models, "rss_mb": round(current_rss_mb(), 1)}
+
+
+# Shared by every blueprint; app.py starts the preloading
+model_registry = ModelRegistry(warmup=config.MODEL_WARMUP)
+
+MODEL_STATE.set_function(lambda: {(name,): int(model_registry.is_ready(name)) for name in model_registry.names()})
+MODEL_MEMORY_MB.set_function(lambda: {
+    (name,): model["rss_delta_mb"] for name, model in model_registry.status()["models"].items()
+    if model["rss_delta_mb"] is not None
+})
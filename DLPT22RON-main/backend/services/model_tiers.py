@@ -0,0 +1,225 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Tier:
+    """One speed/accuracy level of the general model: weights file plus input size."""
+
+    def __init__(self, name, weights, imgsz):
+        self.name = name
+        self.weights = weights
+        self.imgsz = int(imgsz)
+
+    def __repr__(self):
+        return f"{self.name}={self.weights}@{self.imgsz}"
+
+
+def parse_tiers(spec, default_imgsz=640):
+    """'m=yolo11m.pt@640,s=yolo11s.pt,n=yolo11n.pt@416' -> [Tier, ...], most accurate first."""
+    tiers = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, rest = part.partition('=')
+        weights, _, imgsz = rest.partition('@')
+        tiers.append(Tier(name.strip(), weights.strip(), imgsz.strip() or default_imgsz))
+    if not tiers:
+        raise ValueError(f"No model tiers in '{spec}'")
+    return tiers
+
+
+class TierRegistry:
+    """Loads each tier's model on first use; loads requested ahead of time run in the background.
+
+    A tier whose load fails (missing weights, no network to download them) is not tried
+    again for `retry_s`, doubling after every further failure up to `max_retry_s`.
+    """
+
+    def __init__(self, tiers, loader, retry_s=60.0, max_retry_s=3600.0):
+        self.tiers = list(tiers)
+        self.loader = loader  # weights path -> model
+        self.retry_s = retry_s
+        self.max_retry_s = max_retry_s
+        self._models = {}
+        self._loading = set()
+        self._failures = {}  # name -> (failed attempts, monotonic time of the next attempt)
+        self._lock = threading.Lock()       # guards _loading
+        self._load_lock = threading.Lock()  # serializes model loads
+
+    def names(self):
+        return [tier.name for tier in self.tiers]
+
+    def tier(self, name):
+        return next(tier for tier in self.tiers if tier.name == name)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def available(self, name):
+        """False while a tier whose load failed waits for its next attempt."""
+        failure = self._failures.get(name)
+        return failure is None or time.monotonic() >= failure[1]
+
+    def failures(self, name):
+        return self._failures.get(name, (0, 0.0))[0]
+
+    def get(self, name):
+        """Model for a tier, loading it synchronously if needed."""
+        model = self._models.get(name)
+        if model is None:
+            with self._load_lock:
+                model = self._models.get(name)
+                if model is None:
+                    try:
+                        model = self.loader(self.tier(name).weights)
+                    except Exception:
+                        self._record_failure(name)
+                        raise
+                    self._models[name] = model
+                    self._failures.pop(name, None)
+        return model
+
+    def _record_failure(self, name):
+        attempts = self.failures(name) + 1
+        delay = min(self.max_retry_s, self.retry_s * 2 ** (attempts - 1))
+        self._failures[name] = (attempts, time.monotonic() + delay)
+        logger.warning(f"Model tier {name} failed to load ({attempts}x), not retrying for {delay:.0f}s")
+
+    def prefetch(self, name):
+        """Start loading a tier in the background so switching to it never stalls a request."""
+        with self._lock:
+            if name in self._models or name in self._loading or not self.available(name):
+                return
+            self._loading.add(name)
+
+        def load():
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Error loading model tier {name}: {e}")
+            finally:
+                with self._lock:
+                    self._loading.discard(name)
+
+        threading.Thread(target=load, name=f'tier-load-{name}', daemon=True).start()
+
+
+class LoadGovernor:
+    """Picks the tier for each batch so per-frame latency stays under `slo_ms`.
+
+    The projected latency of a new frame is the tier's smoothed per-frame inference time
+    times the frames it has to wait for (the queue depth plus itself). When it exceeds
+    `down_ratio * slo_ms` the governor steps to the next cheaper tier; when the projection
+    for the next more accurate tier (from its last known per-frame time) falls under
+    `up_ratio * slo_ms` it steps back. Each switch is followed by `cooldown_s` without
+    another switch, and a tier is only switched to once its model is loaded. Tiers that
+    failed to load are skipped while the registry backs off from them.
+    """
+
+    def __init__(self, registry, slo_ms=250.0, queue_depth_fn=None,
+                 down_ratio=0.9, up_ratio=0.6, cooldown_s=5.0, alpha=0.2):
+        self.registry = registry
+        self.names = registry.names()
+        self.slo_ms = float(slo_ms)
+        self.queue_depth_fn = queue_depth_fn  # set by whoever owns the request queue
+        self.down_ratio = down_ratio
+        self.up_ratio = up_ratio
+        self.cooldown = cooldown_s
+        self.alpha = alpha
+
+        self.level = 0
+        self._lock = threading.Lock()
+        self._last_switch = 0.0
+        self._ewma_ms = {}
+        self._time_ms = dict.fromkeys(self.names, 0.0)
+        self._frames = dict.fromkeys(self.names, 0)
+        self._batches = dict.fromkeys(self.names, 0)
+        self._switches = deque(maxlen=50)
+
+    @property
+    def enabled(self):
+        return self.slo_ms > 0 and len(self.names) > 1
+
+    def current(self):
+        return self.names[self.level]
+
+    def observe(self, tier, batch_ms, frames):
+        """Record a finished batch and re-evaluate the tier for the next one."""
+        with self._lock:
+            frame_ms = batch_ms / max(1, frames)
+            previous = self._ewma_ms.get(tier)
+            self._ewma_ms[tier] = frame_ms if previous is None else (1 - self.alpha) * previous + self.alpha * frame_ms
+            self._time_ms[tier] += batch_ms
+            self._frames[tier] += frames
+            self._batches[tier] += 1
+            if self.enabled:
+                self._evaluate()
+
+    def _projected_ms(self, tier):
+        depth = self.queue_depth_fn() if self.queue_depth_fn else 0
+        return self._ewma_ms.get(tier, 0.0) * (depth + 1)
+
+    def _evaluate(self):
+        now = time.monotonic()
+        if now - self._last_switch < self.cooldown:
+            return
+
+        current = self.names[self.level]
+        cheaper = self._usable(self.level + 1, 1)
+        better = self._usable(self.level - 1, -1)
+        # Warm the next cheaper tier while there is still headroom
+        if self._projected_ms(current) > self.up_ratio * self.slo_ms and cheaper is not None:
+            self.registry.prefetch(self.names[cheaper])
+
+        if self._projected_ms(current) > self.down_ratio * self.slo_ms and cheaper is not None:
+            target = cheaper
+        elif better is not None and self._projected_ms(self.names[better]) < self.up_ratio * self.slo_ms:
+            target = better
+        else:
+            return
+
+        name = self.names[target]
+        if not self.registry.is_loaded(name):
+            self.registry.prefetch(name)
+            return
+        self._switches.append({"at": time.time(), "from": current, "to": name,
+                               "projected_ms": round(self._projected_ms(current), 1)})
+        logger.info(f"Load governor: switching model tier {current} -> {name}")
+        self.level = target
+        self._last_switch = now
+
+    def _usable(self, index, step):
+        """First tier from `index` in direction `step` that is loaded or may be loaded now."""
+        while 0 <= index < len(self.names):
+            name = self.names[index]
+            if self.registry.is_loaded(name) or self.registry.available(name):
+                return index
+            index += step
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "slo_ms": self.slo_ms,
+                "current_tier": self.current(),
+                "tiers": {
+                    name: {
+                        "weights": self.registry.tier(name).weights,
+                        "imgsz": self.registry.tier(name).imgsz,
+                        "loaded": self.registry.is_loaded(name),
+                        "load_failures": self.registry.failures(name),
+                        "batches": self._batches[name],
+                        "frames": self._frames[name],
+                        "time_ms": round(self._time_ms[name], 1),
+                        "avg_frame_ms": round(self._time_ms[name] / self._frames[name], 2) if self._frames[name] else 0.0,
+                        "ewma_frame_ms": round(self._ewma_ms.get(name, 0.0), 2),
+                    } for name in self.names
+                },
+                "recent_switches": list(self._switches),
+            }
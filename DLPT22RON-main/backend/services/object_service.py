@@ -1,7 +1,12 @@
 import cv2
+import logging
 import numpy as np
 import os
+import time
 from pathlib import Path
+from utils.metrics import observe_stage, stage
+
+logger = logging.getLogger(__name__)
 
 class ObjectService:
     def __init__(self):
@@ -35,6 +40,9 @@ class ObjectService:
         self.nms_threshold = 0.2
         self.focal_length = 615
 
+    def warmup(self):
+        self.detect_objects(np.zeros((480, 640, 3), dtype=np.uint8))
+
     def calculate_distance(self, object_width, real_width):
         return (real_width * self.focal_length) / (object_width + 1e-6)
 
@@ -50,8 +58,11 @@ class ObjectService:
     def detect_objects(self, frame):
         frame_height, frame_width = frame.shape[:2]
         
-        classIds, confs, bbox = self.net.detect(frame, confThreshold=self.thres)
+        with stage('general_model', model='ssd_mobilenet'):
+            classIds, confs, bbox = self.net.detect(frame, confThreshold=self.thres)
         
+        started = time.perf_counter()
+        debug = logger.isEnabledFor(logging.DEBUG)  # per-detection logging costs nothing when off
         objects = []
         if len(classIds) > 0:
             bbox = list(bbox)
@@ -68,14 +79,14 @@ class ObjectService:
                 label = self.classNames[class_id - 1].lower()
                 confidence = float(confs[i])
                 
-                # Debug: print all detections
-                print(f"Detected: {label} with confidence {confidence:.2f}")
+                if debug:
+                    logger.debug("Detected: %s with confidence %.2f", label, confidence)
                 
                 distance = None
                 if label in self.average_sizes:
                     distance = self.calculate_distance(w, self.average_sizes[label])
-                else:
-                    print(f"Warning: {label} not found in average_sizes, distance will be None")
+                elif debug:
+                    logger.debug("%s not found in average_sizes, distance will be None", label)
                 
                 position = self.get_position(frame_width, (x, y, w, h))
                 
@@ -87,7 +98,9 @@ class ObjectService:
                     "box": [x, y, x + w, y + h]
                 })
         
-        print(f"Total objects detected: {len(objects)}")  # Debug
+        if debug:
+            logger.debug("Total objects detected: %d", len(objects))
+        observe_stage('postprocess', time.perf_counter() - started, model='ssd_mobilenet')
         return {
             "objects": objects,
             "frame_height": frame_height,
@@ -1,30 +1,60 @@
 
 import cv2
+import logging
+import numpy as np
+import time
 import torch
 from torchvision import transforms
 from torchvision.models.detection import fasterrcnn_resnet50_fpn
+from pathlib import Path
 from utils.distance import calculate_distance
+from utils.metrics import observe_stage, stage
+from utils.sample_frames import DEFAULT_SIGNS_DIR
+from services.quantization import load_person_backbone, quantize_person_backbone
+import config
+
+logger = logging.getLogger(__name__)
 
 class PersonService:
-    def __init__(self):
+    def __init__(self, precision=None):
         self.model = fasterrcnn_resnet50_fpn(pretrained=True)
         self.model.eval()
+        self.precision = precision or config.PERSON_PRECISION
+        if self.precision == 'int8':
+            self._load_int8_backbone()
         self.PERSON_CLASS_ID = 1  # Class ID for 'person' in COCO dataset
-        self.model_ready = True  # Set to True once model is loaded
-        
-    def is_model_ready(self):
-        """Check if the model is loaded and ready for inference"""
-        return self.model_ready
-        
+
+    def _load_int8_backbone(self):
+        """Swap the ResNet-50 body for its static INT8 version, calibrating it on first use."""
+        int8_path = Path(__file__).parent.parent / 'src/models/exported/fasterrcnn_resnet50_fpn_body_int8.pt'
+        try:
+            if int8_path.exists():
+                load_person_backbone(self.model, int8_path)
+            else:
+                logger.info("Quantizing Faster R-CNN backbone to INT8, this only happens once...")
+                quantize_person_backbone(self.model, int8_path,
+                                         config.QUANT_CALIBRATION_DIR or DEFAULT_SIGNS_DIR,
+                                         config.QUANT_CALIBRATION_FRAMES // 2)
+        except Exception as e:
+            logger.error(f"Error loading INT8 person model, using FP32: {e}")
+            self.model = fasterrcnn_resnet50_fpn(pretrained=True)
+            self.model.eval()
+            self.precision = 'fp32'
+
+    def warmup(self):
+        """One inference on a blank frame so the first request runs at full speed"""
+        self.detect_persons(np.zeros((480, 640, 3), dtype=np.uint8))
+
     def detect_persons(self, frame):
         # Convert the frame to tensor
         transform = transforms.ToTensor()
         frame_tensor = transform(frame).unsqueeze(0)
         
         # Perform detection
-        with torch.no_grad():
+        with stage('person_model', model='faster_rcnn'), torch.no_grad():
             predictions = self.model(frame_tensor)[0]
         
+        started = time.perf_counter()
         # Extract bounding boxes, labels, and scores
         boxes = predictions['boxes'].numpy()
         labels = predictions['labels'].numpy()
@@ -62,6 +92,7 @@ class PersonService:
                     "box": box.tolist()
                 })
         
+        observe_stage('postprocess', time.perf_counter() - started, model='faster_rcnn')
         return {
             "persons": persons,
             "person_count": person_count,
@@ -0,0 +1,213 @@
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# English fragments announcements are assembled from; every language gets a translation of each
+POSITION_PHRASES = {
+    "left": "on your left",
+    "center": "ahead",
+    "right": "on your right",
+}
+NEAR_PHRASE = "very close"
+
+
+def distance_id(distance):
+    """Fragment id for a detection's distance string ("2.3m"), rounded to whole metres; None if unknown."""
+    if not distance:
+        return None
+    try:
+        metres = float(str(distance).rstrip('m'))
+    except ValueError:
+        return None
+    return f"distance:{int(round(metres))}"
+
+
+def build_vocabulary(class_names, traffic_names=(), max_distance_m=20):
+    """fragment id -> English text for every label, position and distance an announcement can use.
+
+    Distances above `max_distance_m` share one "more than ..." fragment.
+    """
+    vocabulary = {}
+    for name in list(class_names) + list(traffic_names):
+        label = name.strip().lower()
+        if label and label != 'n/a':
+            vocabulary[f"label:{label}"] = label.replace('_', ' ')
+    for position, phrase in POSITION_PHRASES.items():
+        vocabulary[f"position:{position}"] = phrase
+    vocabulary["distance:0"] = NEAR_PHRASE
+    vocabulary["distance:1"] = "1 meter away"
+    for metres in range(2, max_distance_m + 1):
+        vocabulary[f"distance:{metres}"] = f"{metres} meters away"
+    vocabulary["distance:far"] = f"more than {max_distance_m} meters away"
+    return vocabulary
+
+
+class PhraseBundle:
+    """Pre-translated, pre-synthesized announcement fragments per language, stored on disk.
+
+    Each language has a directory with the fragment audio and an `index.json` mapping
+    fragment id -> source text, translation and audio file. Building is incremental:
+    fragments whose source text, target language and audio file are unchanged are kept.
+    Once loaded, assembling an announcement is a handful of dict lookups.
+    """
+
+    def __init__(self, root, vocabulary, max_distance_m=20):
+        self.root = Path(root)
+        self.vocabulary = dict(vocabulary)
+        self.max_distance_m = max_distance_m
+        self._languages = {}  # language -> {"fragments": {id: (text, audio path)}, "by_source": {...}}
+        self._report = {}
+        self._lock = threading.Lock()
+
+    def languages(self):
+        return list(self._languages)
+
+    def _index_path(self, language):
+        return self.root / language / 'index.json'
+
+    def _read_index(self, language):
+        try:
+            with open(self._index_path(language), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"fragments": {}}
+
+    def _write_index(self, language, index):
+        directory = self.root / language
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self._index_path(language))
+
+    def load(self, language):
+        """Load a language's index from disk (no translation or synthesis)."""
+        index = self._read_index(language)
+        directory = self.root / language
+        fragments, by_source = {}, {}
+        for fragment_id, entry in index.get("fragments", {}).items():
+            audio = directory / entry["audio"] if entry.get("audio") else None
+            fragments[fragment_id] = (entry["text"], audio if audio is not None and audio.exists() else None)
+            by_source[entry["source"]] = entry["text"]
+        with self._lock:
+            self._languages[language] = {"fragments": fragments, "by_source": by_source}
+        return len(fragments)
+
+    def build(self, language, translate=None, synthesize=None, batch_size=16, threads=4):
+        """Translate and synthesize the fragments of one language that are not in its bundle yet.
+
+        translate:  list of English texts -> list of translations (None keeps English)
+        synthesize: text -> path of an audio file (None skips audio)
+        """
+        started = time.perf_counter()
+        directory = self.root / language
+        directory.mkdir(parents=True, exist_ok=True)
+        fragments = self._read_index(language).get("fragments", {})
+
+        stale = [fid for fid, source in self.vocabulary.items()
+                 if fid not in fragments or fragments[fid].get("source") != source]
+        translated = 0
+        if stale:
+            sources = [self.vocabulary[fid] for fid in stale]
+            texts = []
+            for start in range(0, len(sources), max(1, batch_size)):
+                chunk = sources[start:start + batch_size]
+                texts.extend(translate(chunk) if translate else chunk)
+            for fid, source, text in zip(stale, sources, texts):
+                fragments[fid] = {"source": source, "text": text, "audio": None}
+            translated = len(stale) if translate else 0
+
+        synthesized = 0
+        missing_audio = [fid for fid in self.vocabulary
+                         if not fragments[fid].get("audio") or not (directory / fragments[fid]["audio"]).exists()]
+        if synthesize and missing_audio:
+            def synth(fid):
+                try:
+                    path = Path(synthesize(fragments[fid]["text"]))
+                    shutil.copyfile(path, directory / path.name)
+                    return fid, path.name
+                except Exception as e:
+                    logger.warning(f"Could not synthesize phrase '{fid}' ({language}): {e}")
+                    return fid, None
+
+            with ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix='phrase-tts') as pool:
+                for fid, audio in pool.map(synth, missing_audio):
+                    fragments[fid]["audio"] = audio
+                    synthesized += audio is not None
+
+        # Drop fragments no longer in the vocabulary (their audio files stay until rebuilt from scratch)
+        fragments = {fid: fragments[fid] for fid in self.vocabulary}
+        self._write_index(language, {"language": language, "fragments": fragments})
+        self.load(language)
+        with self._lock:
+            self._report[language] = {
+                "translated": translated,
+                "synthesized": synthesized,
+                "without_audio": sum(1 for entry in fragments.values() if not entry.get("audio")),
+                "build_s": round(time.perf_counter() - started, 2),
+            }
+
+    def fail(self, language, error):
+        """Record that a language could not be built; it is served from whatever is on disk."""
+        with self._lock:
+            self._report[language] = {"error": str(error)}
+
+    def translation(self, language, source_text):
+        """Bundled translation of an exact vocabulary string, or None."""
+        bundle = self._languages.get(language)
+        return bundle["by_source"].get(source_text) if bundle else None
+
+    def detection_fragments(self, detection):
+        """Fragment ids of one detection: label, position and (if known) distance."""
+        label = str(detection.get("label", "")).lower()
+        if label.startswith("person "):
+            label = "person"  # "Person 2" -> person
+        ids = [f"label:{label}"]
+        if detection.get("position") in POSITION_PHRASES:
+            ids.append(f"position:{detection['position']}")
+        fid = distance_id(detection.get("distance"))
+        if fid is not None:
+            metres = int(fid.split(':')[1])
+            ids.append("distance:far" if metres > self.max_distance_m else fid)
+        return ids
+
+    def assemble(self, language, detections, limit=3):
+        """Announcement parts for the nearest `limit` detections.
+
+        Returns one list per detection of (fragment id, English text, translated text or
+        None, audio path or None); None marks a fragment missing from the bundle.
+        """
+        def sort_key(detection):
+            fid = distance_id(detection.get("distance"))
+            return int(fid.split(':')[1]) if fid else math.inf
+
+        bundle = self._languages.get(language, {"fragments": {}})["fragments"]
+        sentences = []
+        for detection in sorted(detections, key=sort_key)[:limit]:
+            parts = []
+            for fid in self.detection_fragments(detection):
+                text, audio = bundle.get(fid, (None, None))
+                english = self.vocabulary.get(fid, fid.split(':', 1)[1])
+                parts.append((fid, english, text, audio))
+            sentences.append(parts)
+        return sentences
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fragments": len(self.vocabulary),
+                "languages": {
+                    language: dict(
+                        loaded=len(self._languages.get(language, {}).get("fragments", {})),
+                        **self._report.get(language, {})
+                    ) for language in sorted(set(self._languages) | set(self._report))
+                },
+            }
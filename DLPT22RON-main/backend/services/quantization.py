@@ -0,0 +1,159 @@
+import re
+from pathlib import Path
+import numpy as np
+from utils.preprocess import letterbox
+from utils.sample_frames import load_sample_frames
+
+PRECISIONS = ('fp32', 'int8')
+
+
+def calibration_frames(calibration_dir, count):
+    """BGR frames for calibration: the calibration folder's images, then sampled video frames."""
+    frames = [frame for _, frame in load_sample_frames(calibration_dir, stride=15, max_frames=count)]
+    if not frames:
+        raise RuntimeError(f"No calibration images or videos found in {calibration_dir}")
+    return frames
+
+
+# ── YOLO: ONNX Runtime static INT8 ──
+
+def yolo_input(frame, imgsz):
+    """Letterboxed, RGB, 0..1 NCHW float tensor exactly as ultralytics feeds the exported model."""
+    image, _ = letterbox(frame, imgsz)
+    image = image[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(image, dtype=np.float32)[None] / 255.0
+
+
+class _YOLOCalibrationReader:
+    """onnxruntime CalibrationDataReader over local frames."""
+
+    def __init__(self, input_name, frames, imgsz):
+        self.input_name = input_name
+        self._inputs = iter([yolo_input(frame, imgsz) for frame in frames])
+
+    def get_next(self):
+        tensor = next(self._inputs, None)
+        return None if tensor is None else {self.input_name: tensor}
+
+
+def _detect_head_nodes(model):
+    """Nodes of the last `/model.N/` module (the Detect head), kept in FP32.
+
+    Box regression and class scores share one output tensor whose value ranges differ
+    by orders of magnitude, so quantizing the head costs far more accuracy than speed.
+    """
+    indices = {}
+    for node in model.graph.node:
+        match = re.search(r'/model\.(\d+)/', node.name)
+        if match:
+            indices.setdefault(int(match.group(1)), []).append(node.name)
+    return indices[max(indices)] if indices else []
+
+
+def quantize_yolo_onnx(fp32_path, int8_path, calibration_dir, imgsz=640, count=64):
+    """Post-training static INT8 (QDQ, per-channel weights) of an exported YOLO ONNX model.
+
+    The class names/stride metadata written by ultralytics is copied over so the result
+    loads with YOLO(int8_path) like the FP32 export.
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    fp32_path, int8_path = Path(fp32_path), Path(int8_path)
+    prepared = int8_path.with_name(int8_path.stem + '_prep.onnx')
+    quant_pre_process(str(fp32_path), str(prepared))
+
+    model = onnx.load(str(prepared))
+    reader = _YOLOCalibrationReader(model.graph.input[0].name, calibration_frames(calibration_dir, count), imgsz)
+    quantize_static(
+        str(prepared), str(int8_path), reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=_detect_head_nodes(model),
+    )
+    prepared.unlink()
+
+    source = onnx.load(str(fp32_path))
+    quantized = onnx.load(str(int8_path))
+    del quantized.metadata_props[:]
+    for prop in source.metadata_props:
+        quantized.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(quantized, str(int8_path))
+    return int8_path
+
+
+# ── Faster R-CNN: static INT8 ResNet-50 backbone ──
+
+def _fold_frozen_bn(conv, bn):
+    """Fold a torchvision FrozenBatchNorm2d into the preceding bias-free Conv2d."""
+    import torch
+
+    scale = bn.weight * (bn.running_var + bn.eps).rsqrt()
+    folded = torch.nn.Conv2d(conv.in_channels, conv.out_channels, conv.kernel_size, conv.stride,
+                             conv.padding, conv.dilation, conv.groups, bias=True)
+    folded.weight.data = conv.weight.data * scale[:, None, None, None]
+    folded.bias.data = bn.bias - bn.running_mean * scale
+    return folded
+
+
+def _fold_backbone_bn(body):
+    """Fold every conv/FrozenBatchNorm pair of the ResNet body so convs can fuse with their ReLUs."""
+    import torch
+
+    body.conv1 = _fold_frozen_bn(body.conv1, body.bn1)
+    body.bn1 = torch.nn.Identity()
+    for name, layer in body.named_children():
+        if not name.startswith('layer'):
+            continue
+        for block in layer:
+            for i in (1, 2, 3):
+                setattr(block, f'conv{i}', _fold_frozen_bn(getattr(block, f'conv{i}'), getattr(block, f'bn{i}')))
+                setattr(block, f'bn{i}', torch.nn.Identity())
+            if block.downsample is not None:
+                block.downsample = torch.nn.Sequential(_fold_frozen_bn(block.downsample[0], block.downsample[1]))
+    return body
+
+
+def quantize_person_backbone(model, int8_path, calibration_dir, count=32):
+    """Static INT8 (FX graph mode, x86 backend) of the Faster R-CNN ResNet-50 body.
+
+    The backbone is most of the model's CPU time; the FPN, RPN and ROI heads stay FP32.
+    Activation ranges are calibrated by running the whole detector on local frames, and
+    the converted body is saved as TorchScript so later starts skip calibration.
+    """
+    import torch
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+    from torchvision import transforms
+
+    torch.backends.quantized.engine = 'x86' if 'x86' in torch.backends.quantized.supported_engines else 'fbgemm'
+    body = _fold_backbone_bn(model.backbone.body).eval()
+    example = torch.rand(1, 3, 800, 800)
+    prepared = prepare_fx(body, get_default_qconfig_mapping(torch.backends.quantized.engine), (example,))
+    model.backbone.body = prepared
+
+    to_tensor = transforms.ToTensor()
+    with torch.no_grad():
+        for frame in calibration_frames(calibration_dir, count):
+            model([to_tensor(frame)])
+
+    quantized = convert_fx(prepared)
+    with torch.no_grad():
+        scripted = torch.jit.trace(quantized, example, strict=False)
+    Path(int8_path).parent.mkdir(parents=True, exist_ok=True)
+    torch.jit.save(scripted, str(int8_path))
+    model.backbone.body = scripted
+    return model
+
+
+def load_person_backbone(model, int8_path):
+    """Swap in a previously quantized TorchScript body."""
+    import torch
+
+    torch.backends.quantized.engine = 'x86' if 'x86' in torch.backends.quantized.supported_engines else 'fbgemm'
+    model.backbone.body = torch.jit.load(str(int8_path))
+    return model
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class ResultCache:
+    """Bounded LRU cache with a time-to-live, keyed on the content hash of an encoded frame.
+
+    Cached results are shared between requests, so callers must treat them as read-only.
+    Concurrent misses on the same key are coalesced: one caller computes, the others wait
+    for its result.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=60.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    @staticmethod
+    def key_for(*parts):
+        """Content address of a frame's encoded bytes (plus any bytes describing their layout)."""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for `key`, or compute, store and return it."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = Future()
+                owner = True
+            else:
+                self._coalesced += 1
+                owner = False
+        if not owner:
+            return pending.result()
+
+        try:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+            pending.set_result(value)
+            return value
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
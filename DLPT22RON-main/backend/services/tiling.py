@@ -0,0 +1,86 @@
+import numpy as np
+
+MODES = ('full', 'tiled', 'cascade')
+
+
+def parse_rois(spec):
+    """'x0,y0,x1,y1;...' in 0..1 frame fractions -> list of tuples ('' = whole frame)."""
+    rois = []
+    for part in spec.split(';'):
+        part = part.strip()
+        if part:
+            x0, y0, x1, y1 = (float(v) for v in part.split(','))
+            rois.append((x0, y0, x1, y1))
+    return rois
+
+
+def _starts(length, tile, stride):
+    """Tile start offsets along one axis; the last tile is pulled back to end at the edge."""
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def tile_grid(frame_width, frame_height, tile_size=640, overlap=0.2, rois=None):
+    """Overlapping tile windows (x0, y0, x1, y1) in pixels covering the ROIs (or the whole frame)."""
+    stride = max(1, int(tile_size * (1 - overlap)))
+    regions = [(0, 0, frame_width, frame_height)] if not rois else [
+        (int(x0 * frame_width), int(y0 * frame_height), int(x1 * frame_width), int(y1 * frame_height))
+        for x0, y0, x1, y1 in rois
+    ]
+
+    tiles = []
+    for rx0, ry0, rx1, ry1 in regions:
+        width, height = rx1 - rx0, ry1 - ry0
+        if width <= 0 or height <= 0:
+            continue
+        for y in _starts(height, tile_size, stride):
+            for x in _starts(width, tile_size, stride):
+                tiles.append((rx0 + x, ry0 + y, rx0 + min(x + tile_size, width), ry0 + min(y + tile_size, height)))
+    return list(dict.fromkeys(tiles))
+
+
+def crop_tiles(frame, tiles):
+    """Views (no copy) of the frame for each tile window."""
+    return [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles]
+
+
+def merge_nms(xyxy, cls, conf, iou_threshold=0.5, ios_threshold=0.8):
+    """Class-aware greedy NMS across tiles; returns the indices to keep, best first.
+
+    Besides IoU, a box is also dropped when most of it (intersection over the smaller
+    box >= `ios_threshold`) lies inside a higher-scoring box of the same class: that is
+    the signature of an object cut in half by a tile border.
+    """
+    xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+    cls = np.asarray(cls).reshape(-1)
+    conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+    if not len(conf):
+        return np.zeros(0, dtype=np.int64)
+
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    order = np.argsort(-conf)
+    keep = []
+    while len(order):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        x1 = np.maximum(xyxy[best, 0], xyxy[rest, 0])
+        y1 = np.maximum(xyxy[best, 1], xyxy[rest, 1])
+        x2 = np.minimum(xyxy[best, 2], xyxy[rest, 2])
+        y2 = np.minimum(xyxy[best, 3], xyxy[rest, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = inter / (areas[best] + areas[rest] - inter + 1e-6)
+        ios = inter / (np.minimum(areas[best], areas[rest]) + 1e-6)
+        duplicate = (cls[rest] == cls[best]) & ((iou >= iou_threshold) | (ios >= ios_threshold))
+        order = rest[~duplicate]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def concat_boxes(parts):
+    """Concatenate (xyxy, cls, conf) array triples, tolerating an empty list."""
+    if not parts:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    xyxy, cls, conf = zip(*parts)
+    return np.concatenate(xyxy).reshape(-1, 4), np.concatenate(cls), np.concatenate(conf)
@@ -0,0 +1,307 @@
+import threading
+import time
+from collections import Counter
+import numpy as np
+
+CATEGORIES = ("objects", "persons", "traffic_signs")
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy arrays."""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def visible_fraction(box, frame_width, frame_height):
+    """Share of an xyxy box's area that lies inside the frame."""
+    x1, y1, x2, y2 = box
+    area = (x2 - x1) * (y2 - y1)
+    if area <= 0:
+        return 0.0
+    inside = max(0.0, min(x2, frame_width) - max(x1, 0.0)) * max(0.0, min(y2, frame_height) - max(y1, 0.0))
+    return float(inside / area)
+
+
+def _parse_distance(distance):
+    """'12.3m' -> 12.3 (None stays None)."""
+    return float(distance[:-1]) if distance else None
+
+
+class Track:
+    """One tracked box with a constant-velocity motion model."""
+
+    def __init__(self, track_id, number, category, detection, frame_idx):
+        self.id = track_id
+        self.number = number  # 1-based index within the category, e.g. "Person 3"
+        self.category = category
+        self.base_label = "person" if category == "persons" else detection["label"]
+        self.box = np.asarray(detection["box"], dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.detection = detection
+        self.distance = _parse_distance(detection.get("distance"))
+        self.detected_width = max(1.0, float(self.box[2] - self.box[0]))
+        self.last_frame = frame_idx
+        self.hits = 1
+        self.missed = 0
+
+    def predict(self, frame_idx, max_shift=None):
+        """Box extrapolated to `frame_idx` from the last detection.
+
+        `max_shift` caps how far each edge may move, as a fraction of the box's size,
+        so an unconfirmed box cannot run away on a bad velocity estimate.
+        """
+        shift = self.velocity * (frame_idx - self.last_frame)
+        if max_shift is not None:
+            limit = max_shift * np.tile(self.box[2:] - self.box[:2], 2)
+            shift = shift.clip(-limit, limit)
+        return self.box + shift
+
+    def update(self, detection, frame_idx):
+        box = np.asarray(detection["box"], dtype=np.float32)
+        elapsed = max(1, frame_idx - self.last_frame)
+        # Smooth velocity so one jittery detection does not throw the box off
+        self.velocity = 0.5 * self.velocity + 0.5 * (box - self.box) / elapsed
+        self.box = box
+        self.detection = detection
+        self.distance = _parse_distance(detection.get("distance"))
+        self.detected_width = max(1.0, float(box[2] - box[0]))
+        self.last_frame = frame_idx
+        self.hits += 1
+        self.missed = 0
+
+
+class IoUTracker:
+    """Greedy IoU tracker (ByteTrack-style association without the appearance model).
+
+    Detections are matched per category, and per label for objects/signs, to the
+    predicted positions of existing tracks. Unmatched detections start new tracks and
+    tracks that go unmatched for `max_missed` detection rounds are dropped.
+
+    Between detections boxes are extrapolated at constant velocity with no check against
+    the image, so they are reported with `predicted: true`, move at most `max_shift` of
+    their size, and are left out once less than `min_visible` of the box is in the frame.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=3, position_fn=None, max_shift=0.5, min_visible=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.position_fn = position_fn
+        self.max_shift = max_shift
+        self.min_visible = min_visible
+        self.tracks = []
+        self.match_ratio = 1.0
+        self._next_id = 1
+        self._numbers = Counter()
+
+    def update(self, result, frame_idx):
+        """Associate a full detection result with the tracks; return it annotated with track ids."""
+        matched_tracks = set()
+        existing = len(self.tracks)
+        out = dict(result)
+
+        for category in CATEGORIES:
+            detections = result.get(category, [])
+            candidates = [t for t in self.tracks if t.category == category]
+            assigned = self._associate(candidates, detections, frame_idx, category)
+
+            annotated = []
+            for det_idx, detection in enumerate(detections):
+                track = assigned.get(det_idx)
+                if track is None:
+                    self._numbers[category] += 1
+                    track = Track(self._next_id, self._numbers[category], category, detection, frame_idx)
+                    self._next_id += 1
+                    self.tracks.append(track)
+                else:
+                    track.update(detection, frame_idx)
+                    matched_tracks.add(track.id)
+                annotated.append(self._render(track, detection, predicted=False))
+            out[category] = annotated
+
+        for track in self.tracks:
+            if track.last_frame != frame_idx:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        self.match_ratio = len(matched_tracks) / existing if existing else 1.0
+
+        out["person_count"] = len(out["persons"])
+        return out
+
+    def predict(self, frame_idx, frame_width, frame_height):
+        """Result built from the tracks' extrapolated boxes, without running a detector."""
+        out = {category: [] for category in CATEGORIES}
+        for track in self.tracks:
+            if track.missed:
+                continue
+            box = track.predict(frame_idx, self.max_shift)
+            if visible_fraction(box, frame_width, frame_height) < self.min_visible:
+                continue  # leaving the frame; the next detection confirms or drops it
+            box[[0, 2]] = box[[0, 2]].clip(0, frame_width)
+            box[[1, 3]] = box[[1, 3]].clip(0, frame_height)
+            rendered = self._render(track, track.detection, predicted=True, box=box, frame_width=frame_width)
+            rendered["frames_since_detection"] = frame_idx - track.last_frame
+            out[track.category].append(rendered)
+
+        out["person_count"] = len(out["persons"])
+        out["frame_height"] = frame_height
+        out["frame_width"] = frame_width
+        return out
+
+    def degraded(self, frame_idx, frame_width, frame_height):
+        """Whether propagated boxes can no longer be trusted and a fresh detection is due."""
+        if self.match_ratio < 0.5:
+            return True
+        for track in self.tracks:
+            if track.missed:
+                continue
+            # Track drifting out of the frame
+            if visible_fraction(track.predict(frame_idx, self.max_shift), frame_width, frame_height) < self.min_visible:
+                return True
+        return False
+
+    def _associate(self, tracks, detections, frame_idx, category):
+        """Greedy highest-IoU-first matching; returns {detection index: track}."""
+        if not tracks or not detections:
+            return {}
+
+        predicted = [t.predict(frame_idx, self.max_shift) for t in tracks]
+        ious = iou_matrix(predicted, [d["box"] for d in detections])
+
+        # Objects and signs only continue a track of the same label
+        if category != "persons":
+            for ti, track in enumerate(tracks):
+                for di, detection in enumerate(detections):
+                    if detection["label"] != track.base_label:
+                        ious[ti, di] = 0.0
+
+        assigned = {}
+        used_tracks = set()
+        for flat in np.argsort(-ious, axis=None):
+            ti, di = np.unravel_index(flat, ious.shape)
+            if ious[ti, di] < self.iou_threshold:
+                break
+            if ti in used_tracks or di in assigned:
+                continue
+            used_tracks.add(ti)
+            assigned[di] = tracks[ti]
+        return assigned
+
+    def _render(self, track, detection, predicted, box=None, frame_width=None):
+        rendered = dict(detection)
+        rendered["track_id"] = track.id
+        rendered["predicted"] = predicted
+        if track.category == "persons":
+            rendered["label"] = f"Person {track.number}"
+
+        if box is not None:
+            rendered["box"] = [int(v) for v in box]
+            width = max(1.0, float(box[2] - box[0]))
+            # Apparent width is inversely proportional to distance
+            if track.distance is not None:
+                rendered["distance"] = f"{track.distance * track.detected_width / width:.1f}m"
+            if self.position_fn is not None:
+                rendered["position"] = self.position_fn(frame_width, (box[0] + box[2]) / 2)
+        return rendered
+
+
+class TrackedDetector:
+    """Runs the full detector every `detect_every` frames (or when tracks degrade)
+    and propagates tracked boxes cheaply on the frames in between."""
+
+    def __init__(self, detect_fn, detect_every=5, iou_threshold=0.3, max_missed=3, position_fn=None,
+                 max_shift=0.5):
+        self.detect_fn = detect_fn
+        self.detect_every = max(1, int(detect_every))
+        self.tracker = IoUTracker(iou_threshold, max_missed, position_fn, max_shift=max_shift)
+        self.lock = threading.Lock()
+        self.frame_idx = 0
+        self.frame_shape = None
+        self.last_detection = None
+        self.last_used = time.monotonic()
+        self.detections = 0
+        self.propagations = 0
+
+    def process(self, load_frame):
+        """Tracked result for the next frame of the stream.
+
+        `load_frame` is a zero-argument callable returning the decoded frame (or None);
+        it is only called when a full detection is due, so propagated frames are never decoded
+        (callers check the payload itself, e.g. with FramePayload.check). The result carries
+        `frames_since_detection`: 0 on a detection frame, else frames since the last one.
+        """
+        with self.lock:
+            self.last_used = time.monotonic()
+            frame_idx = self.frame_idx
+            self.frame_idx += 1
+
+            due = (self.last_detection is None
+                   or frame_idx - self.last_detection >= self.detect_every
+                   or self.tracker.degraded(frame_idx, *self.frame_shape[::-1]))
+            if not due:
+                self.propagations += 1
+                out = self.tracker.predict(frame_idx, *self.frame_shape[::-1])
+                out["detected"] = False
+                out["frames_since_detection"] = frame_idx - self.last_detection
+                return out
+
+            frame = load_frame()
+            if frame is None:
+                return None
+            self.frame_shape = frame.shape[:2]
+
+            result = self.detect_fn(frame)
+            self.last_detection = frame_idx
+            self.detections += 1
+            out = self.tracker.update(result, frame_idx)
+            out["detected"] = True
+            out["frames_since_detection"] = 0
+            return out
+
+    def stats(self):
+        frames = self.detections + self.propagations
+        return {
+            "frames": frames,
+            "detections": self.detections,
+            "propagated_frames": self.propagations,
+            "detection_ratio": self.detections / frames if frames else 0.0,
+            "active_tracks": sum(1 for t in self.tracker.tracks if not t.missed),
+        }
+
+
+class TrackingSessions:
+    """Per-stream TrackedDetectors for stateless HTTP clients, expired after `ttl_seconds` idle."""
+
+    def __init__(self, factory, ttl_seconds=60.0, max_sessions=256):
+        self.factory = factory
+        self.ttl = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, stream_id):
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, s in self._sessions.items() if now - s.last_used > self.ttl]:
+                del self._sessions[key]
+            session = self._sessions.get(stream_id)
+            if session is None:
+                if len(self._sessions) >= self.max_sessions:
+                    oldest = min(self._sessions, key=lambda k: self._sessions[k].last_used)
+                    del self._sessions[oldest]
+                session = self.factory()
+                self._sessions[stream_id] = session
+            return session
+
+    def __len__(self):
+        return len(self._sessions)
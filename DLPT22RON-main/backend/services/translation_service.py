@@ -1,12 +1,23 @@
 
+import logging
 from transformers import MBartForConditionalGeneration, MBart50TokenizerFast
 import os
+import threading
+import torch
+import config
+from utils.metrics import stage
+
+logger = logging.getLogger(__name__)
 
 class TranslationService:
-    def __init__(self):
+    def __init__(self, num_beams=None, max_length=None):
         self.model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'mbart_model')
         self.model = None
         self.tokenizer = None
+        # Unset (0) keeps the model's generation config (5-beam search for mBART-50)
+        self.num_beams = num_beams or config.TRANSLATION_NUM_BEAMS
+        self.max_length = max_length or config.TRANSLATION_MAX_LENGTH
+        self._tokenizer_lock = threading.Lock()  # tokenizer.src_lang is shared state
         self.load_model()
 
     def load_model(self):
@@ -21,25 +32,66 @@ class TranslationService:
                 self.model = MBartForConditionalGeneration.from_pretrained(self.model_dir)
                 self.tokenizer = MBart50TokenizerFast.from_pretrained(self.model_dir)
         except Exception as e:
-            print(f"Error loading model: {str(e)}")
+            logger.error(f"Error loading model: {str(e)}")
             raise
 
+    def warmup(self):
+        self.translate("Hello", "en_XX", "hi_IN")
+
     def translate(self, text, src_lang="en_XX", tgt_lang="te_IN"):
         if not text or not isinstance(text, str):
             return {"error": "Invalid input text"}
             
         try:
-            encoded_text = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True)
+            return {"translation": self._generate([text], src_lang, tgt_lang)[0]}
+        except Exception as e:
+            return {"error": f"Translation failed: {str(e)}"}
+
+    def translate_batch(self, items):
+        """Translate a list of (text, src_lang, tgt_lang) items; returns the translations in order.
+
+        mBART takes one source language per tokenizer call and one target language per
+        `generate` call, so items are grouped by language pair and each group is a
+        single padded batch. When a group fails its items are retried one at a time, and
+        an item that still fails gets its exception in place of a translation, so one
+        bad string does not fail the strings batched with it.
+        """
+        translations = [None] * len(items)
+        groups = {}
+        for index, (_, src_lang, tgt_lang) in enumerate(items):
+            groups.setdefault((src_lang, tgt_lang), []).append(index)
+        for (src_lang, tgt_lang), indices in groups.items():
+            texts = [items[index][0] for index in indices]
+            try:
+                generated = self._generate(texts, src_lang, tgt_lang)
+            except Exception as e:
+                if len(texts) == 1:
+                    translations[indices[0]] = e
+                    continue
+                logger.warning(f"Translation batch {src_lang}->{tgt_lang} failed, retrying one by one: {e}")
+                generated = []
+                for text in texts:
+                    try:
+                        generated.extend(self._generate([text], src_lang, tgt_lang))
+                    except Exception as item_error:
+                        generated.append(item_error)
+            for index, translation in zip(indices, generated):
+                translations[index] = translation
+        return translations
+
+    def _generate(self, texts, src_lang, tgt_lang):
+        with self._tokenizer_lock:
+            # The source language must be set before tokenizing: it picks the language token
             self.tokenizer.src_lang = src_lang
-            forced_bos_token_id = self.tokenizer.lang_code_to_id[tgt_lang]
-            
+            encoded_text = self.tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+        forced_bos_token_id = self.tokenizer.convert_tokens_to_ids(tgt_lang)
+        options = {'num_beams': self.num_beams} if self.num_beams else {}
+
+        with stage('translation_model', model='mbart'), torch.inference_mode():
             generated_tokens = self.model.generate(
-                **encoded_text, 
+                **encoded_text,
                 forced_bos_token_id=forced_bos_token_id,
-                max_length=128
+                max_length=self.max_length,
+                **options
             )
-            
-            translation = self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
-            return {"translation": translation[0]}
-        except Exception as e:
-            return {"error": f"Translation failed: {str(e)}"}
+        return self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
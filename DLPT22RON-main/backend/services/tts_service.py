@@ -0,0 +1,326 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from utils.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Audio format -> (file suffix, media type)
+FORMATS = {
+    'mp3': ('.mp3', 'audio/mpeg'),
+    'wav': ('.wav', 'audio/wav'),
+}
+
+# Temporary files older than this were left by a write that never finished (a killed worker)
+STALE_TMP_S = 600
+
+
+class GTTSBackend:
+    """Google Translate TTS: natural voices, needs the network, returns MP3."""
+
+    name = 'gtts'
+    format = 'mp3'
+
+    def synthesize(self, text, language):
+        from gtts import gTTS
+
+        audio_io = io.BytesIO()
+        gTTS(text=text, lang=language).write_to_fp(audio_io)
+        return audio_io.getvalue()
+
+
+class Pyttsx3Backend:
+    """Offline synthesis with the system speech engine (eSpeak, SAPI5, NSSpeechSynthesizer); returns WAV."""
+
+    name = 'pyttsx3'
+    format = 'wav'
+
+    def __init__(self):
+        import pyttsx3
+
+        self._engine = pyttsx3.init()
+        self._voices = self._engine.getProperty('voices') or []
+        self._lock = threading.Lock()  # one engine, one utterance at a time
+
+    def _voice_for(self, language):
+        """First installed voice whose id, name or languages mention the language code."""
+        code = language.split('-')[0].lower()
+        for voice in self._voices:
+            languages = [lang.decode(errors='ignore') if isinstance(lang, bytes) else str(lang)
+                         for lang in (getattr(voice, 'languages', None) or [])]
+            names = [voice.id, getattr(voice, 'name', '') or ''] + languages
+            if any(code == part.lower().lstrip('\x05').split('-')[0].split('_')[0] or
+                   f'/{code}' in part.lower() for part in names):
+                return voice.id
+        return None
+
+    def synthesize(self, text, language):
+        with self._lock:
+            voice = self._voice_for(language)
+            if voice is not None:
+                self._engine.setProperty('voice', voice)
+            fd, path = tempfile.mkstemp(suffix='.wav')
+            os.close(fd)
+            try:
+                self._engine.save_to_file(text, path)
+                self._engine.runAndWait()
+                with open(path, 'rb') as f:
+                    audio = f.read()
+            finally:
+                os.remove(path)
+        if not audio:
+            raise RuntimeError("pyttsx3 produced no audio")
+        return audio
+
+
+BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    Pyttsx3Backend.name: Pyttsx3Backend,
+}
+
+
+def _strip_id3(data):
+    """MP3 frames without a leading ID3v2 or trailing ID3v1 tag, so clips can be concatenated."""
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        data = data[10 + size + (10 if data[5] & 0x10 else 0):]
+    if data[-128:-125] == b'TAG':
+        data = data[:-128]
+    return data
+
+
+def join_audio(paths):
+    """Clips played back to back as one file; returns (bytes, format).
+
+    MP3 frames are self-contained, so MP3 clips are joined by concatenating their frames.
+    WAV clips must share channels, sample width and rate. Mixed formats raise ValueError.
+    """
+    suffixes = {Path(path).suffix for path in paths}
+    if suffixes == {FORMATS['mp3'][0]}:
+        return b''.join(_strip_id3(Path(path).read_bytes()) for path in paths), 'mp3'
+    if suffixes == {FORMATS['wav'][0]}:
+        params, frames = None, []
+        for path in paths:
+            with wave.open(str(path), 'rb') as clip:
+                clip_params = clip.getparams()[:3]
+                if params is not None and clip_params != params:
+                    raise ValueError("WAV clips have different sample formats")
+                params = clip_params
+                frames.append(clip.readframes(clip.getnframes()))
+        out = io.BytesIO()
+        with wave.open(out, 'wb') as joined:
+            joined.setnchannels(params[0])
+            joined.setsampwidth(params[1])
+            joined.setframerate(params[2])
+            joined.writeframes(b''.join(frames))
+        return out.getvalue(), 'wav'
+    raise ValueError(f"Cannot join audio clips of formats {sorted(suffixes)}")
+
+
+class AudioCache:
+    """On-disk, content-addressed audio cache with a total size bound (least recently used evicted).
+
+    Files are written to a temporary name and renamed into place, so several worker
+    processes can share the directory; a file evicted by another process is just a miss.
+    A file's access time records its recency and its modification time when it was written.
+    Temporary files left behind by interrupted writes are removed when the index is built.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._sweep_tmp()
+
+        # key -> (path, size, written at), least recently used first
+        self._entries = OrderedDict()
+        files = [(p, p.stat()) for p in self.cache_dir.iterdir() if p.suffix in {s for s, _ in FORMATS.values()}]
+        for path, st in sorted(files, key=lambda item: item[1].st_atime):
+            self._entries[path.stem] = (path, st.st_size, st.st_mtime)
+        self._size = sum(size for _, size, _ in self._entries.values())
+
+    def _sweep_tmp(self):
+        # Other workers may be writing right now, so only old temporary files are removed
+        cutoff = time.time() - STALE_TMP_S
+        for path in self.cache_dir.glob('*.tmp'):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def get(self, key, max_age=None):
+        """Path of the cached audio for `key`, or None (also when written more than `max_age` s ago)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (max_age is not None and time.time() - entry[2] > max_age):
+                self._misses += 1
+                return None
+            path, _, written = entry
+            try:
+                os.utime(path, (time.time(), written))  # recency survives restarts
+            except FileNotFoundError:
+                # Evicted by another worker
+                self._drop(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return path
+
+    def put(self, key, audio, audio_format):
+        suffix, _ = FORMATS[audio_format]
+        path = self.cache_dir / f"{key}{suffix}"
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (path, len(audio), time.time())
+            self._size += len(audio)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                old_path = self._entries[oldest][0]
+                self._drop(oldest)
+                self._evictions += 1
+                try:
+                    old_path.unlink()
+                except OSError:
+                    pass
+        return path
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self._size / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+class TTSService:
+    """Text-to-speech with a disk cache, coalescing of identical concurrent requests and backend fallback.
+
+    `backend` is 'gtts', 'pyttsx3' or 'auto' (gTTS, falling back to the offline pyttsx3
+    engine when gTTS fails, e.g. without network). Audio is cached per backend; audio
+    from a fallback backend is only reused for `fallback_ttl_s`, after which the preferred
+    backend is tried again.
+    """
+
+    def __init__(self, cache_dir, max_bytes, backend='auto', fallback_ttl_s=600.0):
+        self.cache = AudioCache(cache_dir, max_bytes)
+        self.fallback_ttl_s = fallback_ttl_s
+        self.backend_names = ['gtts', 'pyttsx3'] if backend == 'auto' else [backend]
+        for name in self.backend_names:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown TTS backend: {name}")
+        self._backends = {}
+        self._backend_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._coalesced = 0
+        self._synthesized = {name: 0 for name in self.backend_names}
+
+    @staticmethod
+    def key_for(text, language, backend):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(text.encode())
+        digest.update(b'\0')
+        digest.update(language.encode())
+        digest.update(b'\0')
+        digest.update(backend.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def media_type(path):
+        return next(media for suffix, media in FORMATS.values() if suffix == Path(path).suffix)
+
+    def get_audio(self, text, language):
+        """(path, key) of the audio for a phrase, synthesizing it once if it is not cached."""
+        for i, name in enumerate(self.backend_names):
+            key = self.key_for(text, language, name)
+            path = self.cache.get(key, max_age=self.fallback_ttl_s if i else None)
+            if path is not None:
+                return path, key
+
+        # Identical concurrent requests wait for one synthesis, whichever backend produces it
+        phrase = (text, language)
+        with self._pending_lock:
+            pending = self._pending.get(phrase)
+            owner = pending is None
+            if owner:
+                pending = self._pending[phrase] = Future()
+            else:
+                self._coalesced += 1
+        if not owner:
+            return pending.result()
+
+        try:
+            audio, audio_format, name = self._synthesize(text, language)
+            key = self.key_for(text, language, name)
+            path = self.cache.put(key, audio, audio_format)
+            pending.set_result((path, key))
+            return path, key
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._pending_lock:
+                del self._pending[phrase]
+
+    def _backend(self, name):
+        with self._backend_lock:
+            if name not in self._backends:
+                self._backends[name] = BACKENDS[name]()
+            return self._backends[name]
+
+    def _synthesize(self, text, language):
+        errors = []
+        for name in self.backend_names:
+            try:
+                backend = self._backend(name)
+                with stage('tts_synthesis', model=name):
+                    audio = backend.synthesize(text, language)
+                self._synthesized[name] += 1
+                return audio, backend.format, name
+            except Exception as e:
+                logger.warning(f"TTS backend {name} failed: {e}")
+                errors.append(f"{name}: {e}")
+        raise RuntimeError("Speech synthesis failed (" + "; ".join(errors) + ")")
+
+    def stats(self):
+        return {
+            "backends": self.backend_names,
+            "synthesized": dict(self._synthesized),
+            "coalesced": self._coalesced,
+            "cache": self.cache.stats(),
+        }
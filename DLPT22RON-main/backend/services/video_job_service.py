@@ -0,0 +1,364 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+
+class JobQueueFull(Exception):
+    """Raised when the pending-job limit has been reached."""
+
+
+def _process_start_time(pid):
+    """Start time of a process in clock ticks since boot (Linux), so a reused pid is not mistaken for it."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # The command name may contain spaces; fields after it are space-separated
+            return int(f.read().rsplit(')', 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _process_alive(pid, start_time=None):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return start_time is None or _process_start_time(pid) in (None, start_time)
+
+
+class VideoJob:
+    """State of one asynchronous video analysis job."""
+
+    def __init__(self, job_id, video_path, frame_interval, filename=None, options=None):
+        self.id = job_id
+        self.video_path = video_path
+        self.frame_interval = frame_interval
+        self.filename = filename
+        self.options = options or {}
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.total_video_frames = 0
+        self.expected_screenshots = 0
+        self.video_position = 0
+        self.fps = None
+        self.summary = None
+        self.sampling = None
+        self.screenshots = []
+        self.saved_screenshots = 0  # screenshots already appended to the job's NDJSON file
+        self.cancel_event = threading.Event()
+        self.lock = threading.RLock()  # status changes and saves of this job
+        # Process running the job; other gunicorn workers only read its JSON file
+        self.owner_pid = os.getpid()
+        self.owner_started = _process_start_time(self.owner_pid)
+
+    def progress(self):
+        total = self.total_video_frames
+        done = total if self.status == COMPLETED else min(self.video_position, total)
+        eta = None
+        if self.status == RUNNING and self.started_at and done:
+            elapsed = time.time() - self.started_at
+            eta = round(elapsed / done * max(0, total - done), 1)
+        return {
+            "frames_done": done,
+            "total_frames": total,
+            "screenshots_done": len(self.screenshots),
+            "screenshots_expected": self.expected_screenshots,
+            "percent": round(100.0 * done / total, 1) if total else 0.0,
+            "eta_seconds": eta,
+        }
+
+    def to_dict(self, since=0):
+        """Public view of the job; `since` skips screenshots the client already has."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "filename": self.filename,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "fps": self.fps,
+            "progress": self.progress(),
+            "summary": self.summary,
+            "sampling": self.sampling,
+            "screenshots": self.screenshots[since:],
+        }
+
+    def to_record(self):
+        """Everything needed to restore the job after a restart, except the screenshots.
+
+        Screenshots live in the job's NDJSON file; the record counts how many of its
+        lines had been written when the record was.
+        """
+        record = self.to_dict()
+        del record["screenshots"]
+        record.update({
+            "screenshot_count": self.saved_screenshots,
+            "video_path": self.video_path,
+            "frame_interval": self.frame_interval,
+            "options": self.options,
+            "total_video_frames": self.total_video_frames,
+            "expected_screenshots": self.expected_screenshots,
+            "video_position": self.video_position,
+            "owner_pid": self.owner_pid,
+            "owner_started": self.owner_started,
+        })
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        job = cls(record["job_id"], record.get("video_path"), record.get("frame_interval", 30),
+                  record.get("filename"), record.get("options"))
+        job.status = record.get("status", FAILED)
+        job.error = record.get("error")
+        job.created_at = record.get("created_at", job.created_at)
+        job.started_at = record.get("started_at")
+        job.finished_at = record.get("finished_at")
+        job.fps = record.get("fps")
+        job.total_video_frames = record.get("total_video_frames", 0)
+        job.expected_screenshots = record.get("expected_screenshots", 0)
+        job.video_position = record.get("video_position", 0)
+        job.summary = record.get("summary")
+        job.sampling = record.get("sampling")
+        # Records written before screenshots moved to the NDJSON file carry them inline
+        job.screenshots = record.get("screenshots", [])
+        job.saved_screenshots = record.get("screenshot_count", len(job.screenshots))
+        # Records written before jobs had owners count as orphaned
+        job.owner_pid = record.get("owner_pid")
+        job.owner_started = record.get("owner_started")
+        return job
+
+    def owner_alive(self):
+        return _process_alive(self.owner_pid, self.owner_started)
+
+
+class VideoJobManager:
+    """Runs video analysis jobs on a bounded worker pool and persists their state as JSON files.
+
+    Each job is run by the process that accepted it (its owner). Under several gunicorn
+    workers, the others answer lookups from the job's JSON file and its screenshot NDJSON
+    file (at most `save_interval` behind) and pass cancellation on through a `<id>.cancel`
+    marker file. A job whose owner process has died is marked failed and its upload
+    removed; jobs of live workers are never touched. Both `max_workers` and the pending-job limit are per process.
+    """
+
+    def __init__(self, video_service, jobs_dir, max_workers=1, max_pending=16, save_interval=2.0):
+        self.video_service = video_service
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_pending = max_pending
+        self.save_interval = save_interval
+
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix='video-job')
+        self._recover_orphans()
+
+    def submit(self, video_path, frame_interval=30, filename=None, options=None):
+        """Queue a job for an already-saved upload and return it immediately."""
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.status in (QUEUED, RUNNING))
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"Too many video jobs in progress ({pending})")
+            job = VideoJob(uuid.uuid4().hex[:12], video_path, frame_interval, filename, options)
+            self._jobs[job.id] = job
+
+        self._save(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """This process's job, else the latest saved state of another worker's job (None if unknown)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        if not all(c.isalnum() for c in job_id):
+            return None
+        return self._read_job(self._job_file(job_id))
+
+    def list_jobs(self):
+        with self._lock:
+            jobs = dict(self._jobs)
+        for path in self.jobs_dir.glob('*.json'):
+            if path.stem not in jobs:
+                job = self._read_job(path)
+                if job is not None:
+                    jobs[job.id] = job
+        return sorted(jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs never start, running jobs stop after the current batch."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            # Another worker's job: leave a marker for its owner to pick up
+            job = self.get(job_id)
+            if job is not None and job.status not in FINISHED_STATES:
+                self._cancel_file(job_id).touch()
+            return job
+
+        with job.lock:
+            if job.status not in FINISHED_STATES:
+                job.cancel_event.set()
+                if job.status == QUEUED:
+                    self._finish(job, CANCELLED)
+        return job
+
+    def _cancel_requested(self, job):
+        if not job.cancel_event.is_set() and self._cancel_file(job.id).exists():
+            job.cancel_event.set()
+        return job.cancel_event.is_set()
+
+    def _run(self, job):
+        with job.lock:
+            if self._cancel_requested(job):
+                if job.status not in FINISHED_STATES:
+                    self._finish(job, CANCELLED)
+                self._cleanup_upload(job)
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._save(job)
+        last_save = time.monotonic()
+
+        try:
+            for event, data in self.video_service.iter_video(job.video_path, job.frame_interval,
+                                                             run_id=job.id, stop_event=job.cancel_event,
+                                                             **job.options):
+                if event == "start":
+                    job.fps = data["fps"]
+                    job.total_video_frames = data["total_video_frames"]
+                    job.expected_screenshots = data["expected_screenshots"]
+                elif event == "screenshot":
+                    job.screenshots.append(data)
+                    job.video_position = data["frame_number"] + 1
+                elif event == "summary":
+                    job.summary = data["summary"]
+                    job.sampling = data["sampling"]
+
+                if time.monotonic() - last_save >= self.save_interval:
+                    self._cancel_requested(job)
+                    self._save(job)
+                    last_save = time.monotonic()
+
+            self._finish(job, CANCELLED if job.cancel_event.is_set() else COMPLETED)
+        except Exception as e:
+            logger.error(f"Error in video job {job.id}: {e}")
+            job.error = str(e)
+            self._finish(job, FAILED)
+
+    def _finish(self, job, status):
+        with job.lock:
+            job.status = status
+            job.finished_at = time.time()
+            self._save(job)
+        try:
+            self._cancel_file(job.id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _cleanup_upload(self, job):
+        try:
+            os.remove(job.video_path)
+        except Exception:
+            pass
+
+    # ── Persistence ──
+
+    def _job_file(self, job_id):
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _cancel_file(self, job_id):
+        return self.jobs_dir / f"{job_id}.cancel"
+
+    def _screenshots_file(self, job_id):
+        return self.jobs_dir / f"{job_id}.screenshots.ndjson"
+
+    def _save(self, job):
+        """Append new screenshots, then write the small job record atomically.
+
+        Screenshots go to an append-only NDJSON file, so a save costs the screenshots since
+        the last one rather than the whole list. The record is written last with the line
+        count, so readers never see a screenshot line the record does not cover. Each record
+        write has its own temp file and writes of one job are serialized, so the job thread
+        and a cancelling request thread cannot publish each other's partial output.
+        """
+        with job.lock:
+            try:
+                count = len(job.screenshots)
+                if count > job.saved_screenshots:
+                    with open(self._screenshots_file(job.id), 'a') as f:
+                        for screenshot in job.screenshots[job.saved_screenshots:count]:
+                            f.write(json.dumps(screenshot) + '\n')
+                    job.saved_screenshots = count
+
+                fd, tmp_path = tempfile.mkstemp(dir=self.jobs_dir, prefix=f'.{job.id}.', suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(job.to_record(), f)
+                    os.replace(tmp_path, self._job_file(job.id))
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            except Exception as e:
+                logger.error(f"Error saving video job {job.id}: {e}")
+
+    def _read_screenshots(self, job_id, count):
+        """The first `count` screenshot lines; anything after them was appended after the record."""
+        if not count:
+            return []
+        screenshots = []
+        with open(self._screenshots_file(job_id), 'r') as f:
+            for line in f:
+                screenshots.append(json.loads(line))
+                if len(screenshots) == count:
+                    break
+        return screenshots
+
+    def _read_job(self, path):
+        """A job as saved by whichever process owns it; one whose owner died is failed here."""
+        try:
+            with open(path, 'r') as f:
+                job = VideoJob.from_record(json.load(f))
+            if len(job.screenshots) < job.saved_screenshots:
+                job.screenshots = self._read_screenshots(job.id, job.saved_screenshots)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Skipping unreadable video job file {path.name}: {e}")
+            return None
+
+        # Jobs cut off by a dead worker cannot be resumed: their upload belonged to that process
+        if job.status not in FINISHED_STATES and not job.owner_alive():
+            job.status = FAILED
+            job.error = "Interrupted by server restart"
+            job.finished_at = time.time()
+            self._cleanup_upload(job)
+            self._save(job)
+        return job
+
+    def _recover_orphans(self):
+        for path in self.jobs_dir.glob('*.json'):
+            self._read_job(path)
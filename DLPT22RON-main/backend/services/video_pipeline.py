@@ -0,0 +1,197 @@
+import cv2
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import stage
+
+_END = object()
+
+
+class VideoPipeline:
+    """Staged video analysis engine: decode -> batched inference -> annotate/encode writers.
+
+    Stages run in their own threads and are connected by bounded queues, so decoding the
+    next frames and writing JPEGs overlap with inference instead of adding to it.
+    Frames that are not sampled are skipped with `grab()` (no BGR conversion/copy), or by
+    seeking when the sampling interval is long enough for a keyframe seek to pay off.
+    """
+
+    def __init__(self, yolo_service, annotate_fn, batch_size=4, writer_threads=2,
+                 queue_size=8, seek_min_interval=300, jpeg_quality=90):
+        self.yolo_service = yolo_service
+        self.annotate_fn = annotate_fn
+        self.batch_size = max(1, int(batch_size))
+        self.writer_threads = max(1, int(writer_threads))
+        self.queue_size = max(1, int(queue_size))
+        self.seek_min_interval = int(seek_min_interval)
+        self.jpeg_quality = jpeg_quality
+
+    def run(self, cap, sampler, output_dir, url_prefix, fps, stop_event=None, tracker=None):
+        """Yield one screenshot record per frame selected by `sampler`, in frame order.
+
+        When a `tracker` is given, every result is passed through it in frame order so
+        detections keep the same track id from screenshot to screenshot.
+
+        Closing the generator stops all stages at once; setting `stop_event` stops decoding,
+        and frames already decoded are still finished and yielded.
+        """
+        stop = threading.Event()
+        decoded = queue.Queue(maxsize=self.queue_size)
+        written = queue.Queue(maxsize=self.queue_size)
+        writers = ThreadPoolExecutor(max_workers=self.writer_threads, thread_name_prefix='video-writer')
+
+        reader = threading.Thread(
+            target=self._guard, args=(self._read_frames, decoded, stop, cap, sampler, stop_event),
+            name='video-decode', daemon=True
+        )
+        inference = threading.Thread(
+            target=self._guard,
+            args=(self._infer_frames, written, stop, decoded, writers, output_dir, url_prefix, fps, tracker),
+            name='video-inference', daemon=True
+        )
+        reader.start()
+        inference.start()
+
+        try:
+            while True:
+                item = self._get(written, stop)
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item.result()
+        finally:
+            stop.set()
+            reader.join()
+            inference.join()
+            writers.shutdown(wait=True)
+
+    # ── Stages ──
+
+    def _guard(self, stage, out_queue, stop, *args):
+        """Run a stage; forward its failure downstream and always signal end of stream."""
+        try:
+            stage(out_queue, stop, *args)
+        except Exception as e:
+            self._put(out_queue, e, stop)
+        finally:
+            self._put(out_queue, _END, stop)
+
+    def _read_frames(self, out_queue, stop, cap, sampler, stop_event=None):
+        """Decode only the frames the sampler wants and queue (frame_idx, frame, reason)."""
+        seek = (sampler.mode == 'fixed' and self.seek_min_interval > 0
+                and sampler.interval >= self.seek_min_interval)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_idx = 0
+
+        while not stop.is_set() and not (stop_event is not None and stop_event.is_set()):
+            if seek:
+                if total_frames and frame_idx >= total_frames:
+                    break
+                if frame_idx:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self._put(out_queue, (frame_idx, frame, sampler.select(frame_idx, frame)), stop)
+                sampler.skip(min(sampler.interval, max(total_frames - frame_idx, 1)) - 1)
+                frame_idx += sampler.interval
+                continue
+
+            if not cap.grab():
+                break
+            if sampler.wants(frame_idx):
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                reason = sampler.select(frame_idx, frame)
+                if reason:
+                    self._put(out_queue, (frame_idx, frame, reason), stop)
+            frame_idx += 1
+
+    def _infer_frames(self, out_queue, stop, in_queue, writers, output_dir, url_prefix, fps, tracker=None):
+        """Run decoded frames through YOLO in batches and hand each result to the writer pool."""
+        processed = 0
+        finished = False
+
+        while not finished and not stop.is_set():
+            batch = []
+            while len(batch) < self.batch_size:
+                # Block for the first frame only; afterwards take whatever is already decoded
+                item = self._get(in_queue, stop) if not batch else self._get_nowait(in_queue)
+                if item is None:
+                    break
+                if item is _END:
+                    finished = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                batch.append(item)
+
+            if not batch:
+                continue
+
+            results = self.yolo_service.detect_batch([frame for _, frame, _ in batch])
+            for (frame_idx, frame, reason), result in zip(batch, results):
+                if tracker is not None:
+                    result = tracker.update(result, frame_idx)
+                future = writers.submit(
+                    self._write_screenshot, frame, result, frame_idx, reason, processed, output_dir, url_prefix, fps
+                )
+                self._put(out_queue, future, stop)
+                processed += 1
+
+    def _write_screenshot(self, frame, result, frame_idx, reason, index, output_dir, url_prefix, fps):
+        """Annotate and JPEG-encode one frame, returning its screenshot record."""
+        with stage('annotate'):
+            annotated = self.annotate_fn(frame, result)
+
+        timestamp_sec = round(frame_idx / fps, 1)
+        filename = f"frame_{index:04d}_t{timestamp_sec}s.jpg"
+        with stage('jpeg_encode'):
+            cv2.imwrite(str(output_dir / filename), annotated, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+
+        return {
+            "filename": filename,
+            "url": f"{url_prefix}/{filename}",
+            "frame_number": frame_idx,
+            "timestamp": f"{timestamp_sec}s",
+            "sample_reason": reason,
+            "tier": result.get("tier"),
+            "objects_count": len(result["objects"]),
+            "persons_count": result["person_count"],
+            "traffic_signs_count": len(result["traffic_signs"]),
+            "detections": {
+                "objects": result["objects"],
+                "persons": result["persons"],
+                "traffic_signs": result["traffic_signs"],
+            }
+        }
+
+    # ── Queue helpers that give up once the pipeline is stopped ──
+
+    @staticmethod
+    def _put(q, item, stop):
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if stop.is_set():
+                    return False
+
+    @staticmethod
+    def _get(q, stop):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return _END
+
+    @staticmethod
+    def _get_nowait(q):
+        try:
+            return q.get_nowait()
+        except queue.Empty:
+            return None
@@ -2,8 +2,15 @@ import cv2
 import numpy as np
 import os
 import time
+from typing import TYPE_CHECKING
 from pathlib import Path
-from services.yolo_service import YOLOService
+from services.video_pipeline import VideoPipeline
+from services.frame_sampler import make_sampler
+from services.tracker import IoUTracker
+import config
+
+if TYPE_CHECKING:
+    from services.yolo_service import YOLOService
 
 
 class VideoService:
@@ -14,104 +21,127 @@ class VideoService:
     COLOR_PERSON = (200, 0, 200)      # Purple
     COLOR_TRAFFIC = (255, 140, 0)     # Blue-ish
 
-    def __init__(self, yolo_service: YOLOService):
+    def __init__(self, yolo_service: 'YOLOService'):
         self.yolo_service = yolo_service
         self.static_dir = Path(__file__).parent.parent / 'static' / 'video_results'
         self.static_dir.mkdir(parents=True, exist_ok=True)
-
-    def process_video(self, video_path: str, frame_interval: int = 30):
+        self.pipeline = VideoPipeline(
+            yolo_service,
+            self._draw_detections,
+            batch_size=config.VIDEO_BATCH_SIZE,
+            writer_threads=config.VIDEO_WRITER_THREADS,
+            queue_size=config.VIDEO_QUEUE_SIZE,
+            seek_min_interval=config.VIDEO_SEEK_MIN_INTERVAL
+        )
+
+    def process_video(self, video_path: str, frame_interval: int = 30, **options):
         """
         Process a video file: extract frames, run detection, save annotated screenshots.
 
         Args:
-            video_path:      Path to uploaded video file.
-            frame_interval:  Extract one frame every N frames (default 30 ≈ 1 per second at 30fps).
+            video_path:        Path to uploaded video file.
+            frame_interval:    Extract one frame every N frames (default 30 ≈ 1 per second at 30fps).
+            options:           `sampling='adaptive'` plus optional `min_interval`, `max_interval`
+                               and `scene_threshold` select frames by scene change instead;
+                               `track=True` assigns stable track ids across screenshots.
 
         Returns:
-            dict with summary counts and list of screenshot info.
+            dict with summary counts, sampling statistics and list of screenshot info.
         """
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError("Could not open video file")
+        screenshots = []
+        for event, data in self.iter_video(video_path, frame_interval, **options):
+            if event == "screenshot":
+                screenshots.append(data)
+            elif event == "summary":
+                summary = data
 
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return dict(summary, screenshots=screenshots)
 
-        # Create output folder for this run
-        run_id = str(int(time.time()))
-        output_dir = self.static_dir / run_id
-        output_dir.mkdir(parents=True, exist_ok=True)
+    def iter_video(self, video_path: str, frame_interval: int = 30, run_id: str = None, stop_event=None,
+                   sampling: str = 'fixed', min_interval: int = None, max_interval: int = None,
+                   scene_threshold: float = None, track: bool = False):
+        """
+        Process a video file incrementally.
 
-        screenshots = []
-        total_objects = 0
-        total_persons = 0
-        total_traffic_signs = 0
-        frame_idx = 0
-        processed = 0
-
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if frame_idx % frame_interval == 0:
-                # Run detection
-                result = self.yolo_service.detect_objects(frame)
-
-                # Count totals
-                n_obj = len(result["objects"])
-                n_per = result["person_count"]
-                n_sign = len(result["traffic_signs"])
-                total_objects += n_obj
-                total_persons += n_per
-                total_traffic_signs += n_sign
-
-                # Draw bounding boxes on the frame
-                annotated = self._draw_detections(frame.copy(), result)
-
-                # Save screenshot
-                timestamp_sec = round(frame_idx / fps, 1)
-                filename = f"frame_{processed:04d}_t{timestamp_sec}s.jpg"
-                filepath = output_dir / filename
-                cv2.imwrite(str(filepath), annotated, [cv2.IMWRITE_JPEG_QUALITY, 90])
-
-                screenshots.append({
-                    "filename": filename,
-                    "url": f"/static/video_results/{run_id}/{filename}",
-                    "frame_number": frame_idx,
-                    "timestamp": f"{timestamp_sec}s",
-                    "objects_count": n_obj,
-                    "persons_count": n_per,
-                    "traffic_signs_count": n_sign,
-                    "detections": {
-                        "objects": result["objects"],
-                        "persons": result["persons"],
-                        "traffic_signs": result["traffic_signs"],
-                    }
-                })
-                processed += 1
-
-            frame_idx += 1
-
-        cap.release()
-
-        # Clean up uploaded video
+        Yields `(event, data)` pairs: one `("start", info)`, then a `("screenshot", record)`
+        per annotated frame as soon as it is written, and finally `("summary", totals)`.
+        Setting `stop_event` ends processing early; the summary then has `"cancelled": True`.
+        The uploaded video is deleted once processing ends.
+
+        With `sampling='adaptive'`, frames are chosen by a scene-change score bounded by
+        `min_interval`/`max_interval` instead of every `frame_interval` frames.
+        With `track=True` detections carry a `track_id` that is stable across screenshots.
+        """
         try:
-            os.remove(video_path)
-        except Exception:
-            pass
-
-        return {
-            "total_frames_processed": processed,
-            "total_video_frames": total_frames,
-            "fps": fps,
-            "summary": {
-                "total_objects": total_objects,
-                "total_persons": total_persons,
-                "total_traffic_signs": total_traffic_signs,
-            },
-            "screenshots": screenshots,
-        }
+            sampler = make_sampler(
+                sampling,
+                frame_interval,
+                min_interval or config.VIDEO_ADAPTIVE_MIN_INTERVAL,
+                max_interval or config.VIDEO_ADAPTIVE_MAX_INTERVAL,
+                config.VIDEO_ADAPTIVE_THRESHOLD if scene_threshold is None else scene_threshold
+            )
+
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                raise ValueError("Could not open video file")
+
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+            # Create output folder for this run
+            run_id = run_id or str(int(time.time()))
+            output_dir = self.static_dir / run_id
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            yield "start", {
+                "run_id": run_id,
+                "total_video_frames": total_frames,
+                "fps": fps,
+                "sampling": sampler.mode,
+                "frame_interval": frame_interval if sampler.mode == 'fixed' else None,
+                "expected_screenshots": sampler.expected_selections(total_frames),
+            }
+
+            tracker = IoUTracker(position_fn=self.yolo_service.get_position) if track else None
+            processed = 0
+            total_objects = 0
+            total_persons = 0
+            total_traffic_signs = 0
+
+            try:
+                # Decode, inference and JPEG writing run as overlapping pipeline stages
+                for screenshot in self.pipeline.run(cap, sampler, output_dir,
+                                                    f"/static/video_results/{run_id}", fps, stop_event,
+                                                    tracker):
+                    processed += 1
+                    total_objects += screenshot["objects_count"]
+                    total_persons += screenshot["persons_count"]
+                    total_traffic_signs += screenshot["traffic_signs_count"]
+                    yield "screenshot", screenshot
+            finally:
+                cap.release()
+
+            summary = {
+                "total_frames_processed": processed,
+                "total_video_frames": total_frames,
+                "fps": fps,
+                "summary": {
+                    "total_objects": total_objects,
+                    "total_persons": total_persons,
+                    "total_traffic_signs": total_traffic_signs,
+                },
+                "sampling": sampler.stats(),
+            }
+            if stop_event is not None and stop_event.is_set():
+                summary["cancelled"] = True
+            yield "summary", summary
+
+        finally:
+            # Clean up uploaded video
+            try:
+                os.remove(video_path)
+            except Exception:
+                pass
 
     def _draw_detections(self, frame, result):
         """Draw bounding boxes, labels, and distances on the frame."""
@@ -0,0 +1,119 @@
+import numpy as np
+
+POSITIONS = ("left", "center", "right")
+TRAFFIC_SIGN_REAL_WIDTH = 0.6  # metres, used for every custom traffic-model class
+
+
+def build_real_width_table(class_names, average_sizes):
+    """class id -> real object width in metres (NaN where the size is unknown)."""
+    return np.array(
+        [average_sizes.get(name.lower(), np.nan) for name in class_names],
+        dtype=np.float64
+    )
+
+
+def position_label(frame_width, center_x):
+    """Position of a box centre in the frame ("left", "center" or "right")."""
+    third = frame_width // 3
+    if center_x < third:
+        return POSITIONS[0]
+    elif center_x < 2 * third:
+        return POSITIONS[1]
+    return POSITIONS[2]
+
+
+def _geometry(xyxy, conf, frame_width, real_widths, focal_length):
+    """Integer boxes, position index and distance for every box at once.
+
+    Returns plain Python lists (box, confidence, position index, distance, has distance)
+    ready for serialization.
+    """
+    boxes = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4).astype(np.int64)
+    widths = boxes[:, 2] - boxes[:, 0]
+    centers = (boxes[:, 0] + boxes[:, 2]) / 2
+
+    third = frame_width // 3
+    positions = np.where(centers < third, 0, np.where(centers < 2 * third, 1, 2))
+
+    distances = real_widths * focal_length / (widths + 1e-6)
+    # Same rule as before: unknown size or a zero distance means no distance
+    has_distance = ~np.isnan(distances) & (distances != 0)
+    return boxes.tolist(), conf.tolist(), positions.tolist(), distances.tolist(), has_distance.tolist()
+
+
+def _detections(indices, labels, columns, extra=None):
+    """Serialize the selected boxes into the API's detection dicts."""
+    box_list, conf_list, pos_list, dist_list, has_list = columns
+
+    detections = []
+    for i, label in zip(indices, labels):
+        detection = {
+            "label": label,
+            "confidence": conf_list[i],
+            "position": POSITIONS[pos_list[i]],
+            "distance": f"{dist_list[i]:.1f}m" if has_list[i] else None,
+            "box": box_list[i]
+        }
+        if extra:
+            detection.update(extra)
+        detections.append(detection)
+    return detections
+
+
+def postprocess_general(xyxy, cls, conf, frame_width, class_names, real_widths, focal_length, traffic_ids):
+    """Split general-model boxes into objects / persons / traffic signs with array masks.
+
+    Args:
+        xyxy, cls, conf: (N, 4), (N,), (N,) arrays for one frame, in original-frame pixels.
+        class_names:     COCO names; boxes with a class id outside it are dropped.
+        real_widths:     table from `build_real_width_table`.
+
+    Returns:
+        dict with "objects", "persons", "traffic_signs" lists and "person_count".
+    """
+    cls = np.asarray(cls).astype(np.int64).reshape(-1)
+    conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+    xyxy = np.asarray(xyxy).reshape(-1, 4)
+
+    valid = cls < len(class_names)
+    cls, conf, xyxy = cls[valid], conf[valid], xyxy[valid]
+
+    columns = _geometry(xyxy, conf, frame_width, real_widths[cls], focal_length)
+
+    is_person = cls == 0
+    is_traffic = np.zeros(len(class_names), dtype=bool)
+    is_traffic[[i for i in traffic_ids if i < len(class_names)]] = True
+    is_traffic = is_traffic[cls] & ~is_person
+    is_object = ~is_person & ~is_traffic
+
+    person_idx = np.flatnonzero(is_person).tolist()
+    traffic_idx = np.flatnonzero(is_traffic).tolist()
+    object_idx = np.flatnonzero(is_object).tolist()
+    cls_list = cls.tolist()
+
+    return {
+        "objects": _detections(
+            object_idx, [class_names[cls_list[i]].lower() for i in object_idx], columns
+        ),
+        "persons": _detections(
+            person_idx, [f"Person {n}" for n in range(1, len(person_idx) + 1)], columns
+        ),
+        "traffic_signs": _detections(
+            traffic_idx, [class_names[cls_list[i]].lower() for i in traffic_idx], columns,
+            extra={"type": "traffic_sign"}
+        ),
+        "person_count": len(person_idx),
+    }
+
+
+def postprocess_traffic(xyxy, cls, conf, frame_width, names, focal_length):
+    """Serialize traffic-model boxes; `names` is the model's {class id: name} mapping."""
+    cls = np.asarray(cls).astype(np.int64).reshape(-1)
+    conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+    real_widths = np.full(len(cls), TRAFFIC_SIGN_REAL_WIDTH)
+
+    columns = _geometry(xyxy, conf, frame_width, real_widths, focal_length)
+
+    names = names or {}
+    labels = [names[c].lower() if c in names else f"traffic_sign_{c}" for c in cls.tolist()]
+    return _detections(range(len(labels)), labels, columns, extra={"type": "traffic_sign"})
@@ -1,14 +1,38 @@
 import cv2
+import logging
 import numpy as np
 from pathlib import Path
-from ultralytics import YOLO
+from concurrent.futures import ThreadPoolExecutor
 import os
+import time
+import config
+from utils.metrics import stage
+from utils.preprocess import letterbox_batch, unletterbox_boxes
+from services.model_export import load_yolo
+from services.model_tiers import LoadGovernor, TierRegistry, parse_tiers
+from services.cascade import CascadeStats, colour_candidates, crop_windows
+from services.tiling import MODES, concat_boxes, crop_tiles, merge_nms, parse_rois, tile_grid
+from utils.sample_frames import DEFAULT_SIGNS_DIR
+from services.yolo_postprocess import build_real_width_table, position_label, postprocess_general, postprocess_traffic
+
+logger = logging.getLogger(__name__)
+
+
+def traffic_model_paths(root):
+    """Candidate locations of the custom traffic-sign weights, first existing one wins."""
+    return [
+        str(root / 'src/models/traffic_sign_detection.pt'),
+        str(root / 'models/traffic_sign_detection.pt'),
+        str(root / 'traffic_sign_detection.pt'),
+        'traffic_sign_detection.pt'
+    ]
+
 
 class YOLOService:
     # COCO class IDs that are traffic-related
     TRAFFIC_COCO_IDS = {9, 11, 12, 13}  # traffic light, stop sign, parking meter, fire hydrant
 
-    def __init__(self):
+    def __init__(self, backend=None, precision=None):
         # Get the current file's directory
         current_dir = Path(__file__).parent.parent
         
@@ -27,53 +51,82 @@ class YOLOService:
                 obj, size = line.strip().split(',')
                 self.average_sizes[obj.strip()] = float(size.strip())
 
-        # ── Load YOLO model ── upgraded to yolo11m for much better accuracy ──
-
-        model_name = 'yolo11m.pt'
-        general_paths = [
-            str(current_dir / f'src/models/{model_name}'),
-            str(current_dir / f'models/{model_name}'),
-            model_name
-        ]
+        # class id -> real width, so distances are computed for all boxes at once
+        self.real_widths = build_real_width_table(self.classNames, self.average_sizes)
 
-        self.general_model = None
-        for model_path in general_paths:
-            if os.path.exists(model_path):
-                try:
-                    self.general_model = YOLO(model_path)
-                    break
-                except Exception as e:
-                    pass
+        self.current_dir = current_dir
+        self.backend = backend or config.YOLO_BACKEND
+        self.precision = precision or config.YOLO_PRECISION
+        self.imgsz = config.YOLO_IMGSZ
+        self.export_dir = current_dir / 'src/models/exported'
+        self.backends = {}
 
-        if self.general_model is None:
-            self.general_model = YOLO(model_name)
+        # ── Load YOLO model ── tiers from most accurate (yolo11m) to cheapest ──
+        # Only the first tier is loaded up front; the governor loads cheaper ones when load requires it
+        self.tiers = TierRegistry(parse_tiers(config.YOLO_TIERS, self.imgsz), self._load_general)
+        self.governor = LoadGovernor(
+            self.tiers,
+            slo_ms=config.YOLO_LATENCY_SLO_MS,
+            cooldown_s=config.YOLO_GOVERNOR_COOLDOWN_S
+        )
+        self.general_model = self.tiers.get(self.tiers.names()[0])
 
         # Load traffic sign detection model (optional fallback)
+        self.traffic_model = self._load_model('traffic', traffic_model_paths(current_dir))
 
-        traffic_paths = [
-            str(current_dir / 'src/models/traffic_sign_detection.pt'),
-            str(current_dir / 'models/traffic_sign_detection.pt'),
-            str(current_dir / 'traffic_sign_detection.pt'),
-            'traffic_sign_detection.pt'
-        ]
-
-        self.traffic_model = None
-        for model_path in traffic_paths:
-            if os.path.exists(model_path):
-                try:
-                    self.traffic_model = YOLO(model_path)
-                    break
-                except Exception as e:
-                    pass
-        
-
-        
         # Confidence thresholds
         self.general_conf_threshold = 0.35  # Lowered from 0.4 for better recall
         self.traffic_conf_threshold = 0.25
         self.focal_length = 615
-        
 
+        # Tiled inference for small objects (mode='tiled')
+        self.tile_size = config.YOLO_TILE_SIZE
+        self.tile_overlap = config.YOLO_TILE_OVERLAP
+        self.tile_batch = max(1, config.YOLO_TILE_BATCH)
+        self.tile_rois = parse_rois(config.YOLO_TILE_ROIS)
+        self.tile_models = [m.strip() for m in config.YOLO_TILE_MODELS.split(',') if m.strip()]
+
+        # Cascade: traffic model only on crops around sign candidates (mode='cascade')
+        self.cascade_prefilter = config.CASCADE_PREFILTER
+        self.cascade_imgsz = config.CASCADE_CROP_IMGSZ
+        self.cascade_min_crop = config.CASCADE_CROP_MIN
+        self.cascade_pad = config.CASCADE_CROP_PAD
+        self.cascade_batch = max(1, config.CASCADE_BATCH)
+        self.cascade = CascadeStats()
+
+        # Both models read the same frame and are independent, so they can run side by side
+        self.parallel_models = config.YOLO_PARALLEL_MODELS and self.traffic_model is not None
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='yolo-model') if self.parallel_models else None
+
+
+    def _load_model(self, role, paths):
+        """Load the first existing weights file on the configured backend (None if none load)."""
+        for model_path in paths:
+            if not os.path.exists(model_path):
+                continue
+            try:
+                model, used = self._load_yolo(model_path)
+                self.backends[role] = used
+                return model
+            except Exception as e:
+                logger.error(f"Error loading {role} YOLO model from {model_path}: {e}")
+        return None
+
+    def _load_general(self, model_name):
+        """General model weights from src/models or models, else by name (ultralytics downloads it)."""
+        general_paths = [
+            str(self.current_dir / f'src/models/{model_name}'),
+            str(self.current_dir / f'models/{model_name}'),
+            model_name
+        ]
+        model = self._load_model(f'general:{model_name}', general_paths)
+        if model is None:
+            model, self.backends[f'general:{model_name}'] = self._load_yolo(model_name)
+        return model
+
+    def _load_yolo(self, model_path):
+        return load_yolo(model_path, self.backend, self.imgsz, self.export_dir, self.precision,
+                         config.QUANT_CALIBRATION_DIR or DEFAULT_SIGNS_DIR, config.QUANT_CALIBRATION_FRAMES)
 
     def calculate_distance(self, object_width, real_width):
         """Calculate distance using focal length and object width"""
@@ -81,116 +134,298 @@ class YOLOService:
 
     def get_position(self, frame_width, center_x):
         """Determine position in frame (left, center, right)"""
-        if center_x < frame_width // 3:
-            return "left"
-        elif center_x < 2 * (frame_width // 3):
-            return "center"
-        else:
-            return "right"
+        return position_label(frame_width, center_x)
 
     def detect_objects(self, frame):
         """Detect all objects in frame using YOLO models"""
-        frame_height, frame_width = frame.shape[:2]
-        
-        objects = []
-        persons = []
-        traffic_signs = []
-        person_count = 0
-        
-        # 1. Run general object detection with yolo11m
+        return self.detect_batch([frame])[0]
+
+    def warmup(self):
+        """One pass of each loaded model on a blank frame, kept out of the load governor's timings."""
+        blank = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        tier = self.tiers.tier(self.governor.current())
+        self._run_general([blank], tier)
+        if self.traffic_model:
+            self._run_traffic([blank], tier.imgsz)
+
+    def detect_batch(self, frames, tier=None, mode=None, observe=False):
+        """Detect all objects in a list of frames with one forward pass per model.
+
+        `tier` forces a model tier; by default the load governor picks it. `mode` is
+        'full' (whole frame resized to the model input), 'tiled' (see
+        `_detect_batch_tiled`) or 'cascade' (see `_detect_batch_cascade`), defaulting
+        to YOLO_INFERENCE_MODE. `observe` feeds the batch's latency to the load governor;
+        only full-mode batches from the request scheduler do, since tiled and cascade
+        batches cost a different amount per frame. Returns one result
+        dict per frame, in the same order as `frames`, each tagged with its tier.
+        """
+        frames = list(frames)
+        if not frames:
+            return []
+        mode = mode or config.YOLO_INFERENCE_MODE
+        if mode not in MODES:
+            raise ValueError(f"Unknown inference mode: {mode}")
+
+        tier = self.tiers.tier(tier or self.governor.current())
+        started = time.perf_counter()
+        results = [self._empty_result(frame, tier.name) for frame in frames]
+
+        if mode == 'tiled':
+            self._detect_batch_tiled(frames, results, tier)
+        elif mode == 'cascade':
+            self._detect_batch_cascade(frames, results, tier)
+        elif self.parallel_models:
+            self._detect_batch_parallel(frames, results, tier)
+        else:
+            self._detect_batch_sequential(frames, results, tier)
+
+        if observe and mode == 'full':
+            self.governor.observe(tier.name, (time.perf_counter() - started) * 1000.0, len(frames))
+        return results
+
+    def _detect_batch_sequential(self, frames, results, tier):
+        # 1. Run general object detection with the tier's model
         try:
-            general_results = self.general_model(frame, conf=self.general_conf_threshold, verbose=False)
-            
-            for result in general_results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                    w = x2 - x1
-                    h = y2 - y1
-                    center_x = (x1 + x2) / 2
-                    
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    
-                    if class_id < len(self.classNames):
-                        label = self.classNames[class_id].lower()
-                    else:
-                        continue
-                    
-                    # Calculate distance
-                    distance = None
-                    if label in self.average_sizes:
-                        real_width = self.average_sizes[label]
-                        distance = self.calculate_distance(w, real_width)
-                    
-                    position = self.get_position(frame_width, center_x)
-                    
-                    detection = {
-                        "label": label,
-                        "confidence": confidence,
-                        "position": position,
-                        "distance": f"{distance:.1f}m" if distance else None,
-                        "box": [x1, y1, x2, y2]
-                    }
-                    
-                    # Classify: person / traffic sign / general object
-                    if class_id == 0:  # Person class
-                        person_count += 1
-                        detection["label"] = f"Person {person_count}"
-                        persons.append(detection)
-                    elif class_id in self.TRAFFIC_COCO_IDS:
-                        # Traffic-related from COCO (traffic light, stop sign, etc.)
-                        detection["type"] = "traffic_sign"
-                        traffic_signs.append(detection)
-                    else:
-                        objects.append(detection)
-                        
+            general_results = self._run_general(frames, tier)
+            for result, general_result in zip(results, general_results):
+                self._parse_general(general_result, result)
         except Exception as e:
-            print(f"Error in general detection: {e}")
-        
+            logger.error(f"Error in general detection: {e}")
+
         # 2. Run traffic sign detection with custom model (if available)
         if self.traffic_model:
             try:
-                traffic_results = self.traffic_model(frame, conf=self.traffic_conf_threshold, verbose=False)
-                
-                for result in traffic_results:
-                    boxes = result.boxes
-                    for box in boxes:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                        w = x2 - x1
-                        h = y2 - y1
-                        center_x = (x1 + x2) / 2
-                        
-                        class_id = int(box.cls[0])
-                        confidence = float(box.conf[0])
-                        
-                        if hasattr(self.traffic_model, 'names') and class_id in self.traffic_model.names:
-                            label = self.traffic_model.names[class_id].lower()
-                        else:
-                            label = f"traffic_sign_{class_id}"
-                        
-                        real_width = 0.6
-                        distance = self.calculate_distance(w, real_width)
-                        position = self.get_position(frame_width, center_x)
-                        
-                        traffic_sign = {
-                            "label": label,
-                            "confidence": confidence,
-                            "position": position,
-                            "distance": f"{distance:.1f}m" if distance else None,
-                            "box": [x1, y1, x2, y2],
-                            "type": "traffic_sign"
-                        }
-                        traffic_signs.append(traffic_sign)
-                        
+                traffic_results = self._run_traffic_full(frames, tier.imgsz)
+                for result, traffic_result in zip(results, traffic_results):
+                    self._parse_traffic(traffic_result, result)
             except Exception as e:
-                print(f"Error in traffic sign detection: {e}")
-        
+                logger.error(f"Error in traffic sign detection: {e}")
+
+        return results
+
+    def _detect_batch_parallel(self, frames, results, tier):
+        """Letterbox and normalize the batch once, then run the general and traffic models concurrently on it.
+
+        PyTorch models get the batch's stride-aligned rectangle, like ultralytics' own
+        `predict`; exported models were built for a fixed `imgsz` square.
+        """
+        rect = set(self.backends.values()) == {'torch'}
+        inputs, transforms = letterbox_batch(frames, tier.imgsz, rect=rect)
+
+        general_future = self._executor.submit(self._run_general, inputs, tier)
+        traffic_future = self._executor.submit(self._run_traffic_full, inputs, tier.imgsz)
+
+        try:
+            for result, general_result, transform in zip(results, general_future.result(), transforms):
+                self._parse_general(general_result, result, transform)
+        except Exception as e:
+            logger.error(f"Error in general detection: {e}")
+
+        try:
+            for result, traffic_result, transform in zip(results, traffic_future.result(), transforms):
+                self._parse_traffic(traffic_result, result, transform)
+        except Exception as e:
+            logger.error(f"Error in traffic sign detection: {e}")
+
+        return results
+
+    def _detect_batch_tiled(self, frames, results, tier):
+        """SAHI-style sliced inference for small objects in high-resolution frames.
+
+        The general model still sees each whole frame once. The tiled models (traffic by
+        default, see YOLO_TILE_MODELS) additionally run on overlapping `tile_size` crops at
+        native resolution, restricted to YOLO_TILE_ROIS if set; all crops of the batch go
+        through the model together. Tile boxes are shifted back to frame coordinates and
+        merged with the full-frame boxes by cross-tile NMS.
+        """
+        general_parts = [[] for _ in frames]
+        traffic_parts = [[] for _ in frames]
+
+        try:
+            for parts, general_result in zip(general_parts, self._run_general(frames, tier)):
+                parts.append(self._box_arrays(general_result.boxes))
+        except Exception as e:
+            logger.error(f"Error in general detection: {e}")
+
+        tiled = set(self.tile_models) if self.traffic_model else {'general'}
+        crops = []  # (frame index, x0, y0, crop view)
+        for index, frame in enumerate(frames):
+            frame_height, frame_width = frame.shape[:2]
+            tiles = tile_grid(frame_width, frame_height, self.tile_size, self.tile_overlap, self.tile_rois)
+            crops.extend((index, x0, y0, crop) for (x0, y0, _, _), crop in zip(tiles, crop_tiles(frame, tiles)))
+
+        for role, run, parts in (('general', lambda c: self._run_general(c, tier, self.tile_size), general_parts),
+                                 ('traffic', lambda c: self._run_traffic(c, self.tile_size), traffic_parts)):
+            if role not in tiled:
+                continue
+            try:
+                for start in range(0, len(crops), self.tile_batch):
+                    chunk = crops[start:start + self.tile_batch]
+                    for (index, x0, y0, _), tile_result in zip(chunk, run([crop for _, _, _, crop in chunk])):
+                        parts[index].append(self._box_arrays(tile_result.boxes, (x0, y0)))
+            except Exception as e:
+                logger.error(f"Error in tiled {role} detection: {e}")
+
+        if self.traffic_model and 'traffic' not in tiled:
+            try:
+                for parts, traffic_result in zip(traffic_parts, self._run_traffic(frames, tier.imgsz)):
+                    parts.append(self._box_arrays(traffic_result.boxes))
+            except Exception as e:
+                logger.error(f"Error in traffic sign detection: {e}")
+
+        for result, general, traffic in zip(results, general_parts, traffic_parts):
+            xyxy, cls, conf = concat_boxes(general)
+            keep = merge_nms(xyxy, cls, conf)
+            self._fill_general(result, xyxy[keep], cls[keep], conf[keep])
+
+            xyxy, cls, conf = concat_boxes(traffic)
+            keep = merge_nms(xyxy, cls, conf)
+            self._fill_traffic(result, xyxy[keep], cls[keep], conf[keep])
+
+    def _detect_batch_cascade(self, frames, results, tier):
+        """Two-stage detection: the traffic model only looks where a sign is likely.
+
+        Candidates come from the general model's COCO traffic classes (TRAFFIC_COCO_IDS)
+        and, unless CASCADE_PREFILTER is off, from a cheap colour/shape pre-filter. Padded
+        crops around them from all frames of the batch go through the traffic model
+        together at CASCADE_CROP_IMGSZ; frames without candidates skip it entirely. Each
+        result gets a "cascade" entry with what ran and the time saved against running
+        the traffic model on the whole frame.
+        """
+        general = [None] * len(frames)
+        try:
+            general = [self._box_arrays(r.boxes) for r in self._run_general(frames, tier)]
+            for result, (xyxy, cls, conf) in zip(results, general):
+                self._fill_general(result, xyxy, cls, conf)
+        except Exception as e:
+            logger.error(f"Error in general detection: {e}")
+
+        if not self.traffic_model:
+            return
+
+        crops = []  # (frame index, x0, y0, crop view)
+        candidates = []  # (coco, colour) counts per frame
+        frame_ms = []  # pre-filter time per frame, crop inference added below
+        for index, (frame, boxes) in enumerate(zip(frames, general)):
+            started = time.perf_counter()
+            frame_height, frame_width = frame.shape[:2]
+            coco = [] if boxes is None else \
+                [box for box, c in zip(boxes[0], boxes[1]) if int(c) in self.TRAFFIC_COCO_IDS]
+            colour = colour_candidates(frame) if self.cascade_prefilter else []
+            windows = crop_windows(coco + colour, frame_width, frame_height, self.cascade_pad, self.cascade_min_crop)
+            crops.extend((index, x0, y0, crop) for (x0, y0, _, _), crop in zip(windows, crop_tiles(frame, windows)))
+            candidates.append((len(coco), len(colour)))
+            frame_ms.append((time.perf_counter() - started) * 1000.0)
+
+        traffic_parts = [[] for _ in frames]
+        crop_counts = [0] * len(frames)
+        try:
+            for start in range(0, len(crops), self.cascade_batch):
+                chunk = crops[start:start + self.cascade_batch]
+                started = time.perf_counter()
+                crop_results = self._run_traffic([crop for _, _, _, crop in chunk], self.cascade_imgsz)
+                per_crop_ms = (time.perf_counter() - started) * 1000.0 / len(chunk)
+                for (index, x0, y0, _), crop_result in zip(chunk, crop_results):
+                    traffic_parts[index].append(self._box_arrays(crop_result.boxes, (x0, y0)))
+                    crop_counts[index] += 1
+                    frame_ms[index] += per_crop_ms
+        except Exception as e:
+            logger.error(f"Error in cascade traffic sign detection: {e}")
+
+        for i, (result, parts) in enumerate(zip(results, traffic_parts)):
+            xyxy, cls, conf = concat_boxes(parts)
+            keep = merge_nms(xyxy, cls, conf)
+            self._fill_traffic(result, xyxy[keep], cls[keep], conf[keep])
+            result["cascade"] = self.cascade.record_frame(frame_ms[i], crop_counts[i], *candidates[i])
+
+    def _run_traffic_full(self, frames, imgsz=None):
+        """Traffic model on whole frames, timed as the baseline cascade mode is compared against."""
+        started = time.perf_counter()
+        traffic_results = self._run_traffic(frames, imgsz)
+        self.cascade.record_full((time.perf_counter() - started) * 1000.0, len(frames))
+        return traffic_results
+
+    def _run_general(self, frames, tier, imgsz=None):
+        model = self.tiers.get(tier.name)
+        with stage('general_model', model=f'yolo:{tier.name}'):
+            return model(frames, conf=self.general_conf_threshold, imgsz=imgsz or tier.imgsz, verbose=False)
+
+    def _run_traffic(self, frames, imgsz=None):
+        with stage('traffic_model', model='yolo:traffic'):
+            return self.traffic_model(frames, conf=self.traffic_conf_threshold, imgsz=imgsz or self.imgsz,
+                                      verbose=False)
+
+    def set_queue_depth_fn(self, queue_depth_fn):
+        """Let the load governor see how many frames are waiting for a batch."""
+        self.governor.queue_depth_fn = queue_depth_fn
+
+    def tier_stats(self):
+        return self.governor.stats()
+
+    def cascade_stats(self):
+        return self.cascade.stats()
+
+    @staticmethod
+    def _empty_result(frame, tier=None):
+        frame_height, frame_width = frame.shape[:2]
         return {
-            "objects": objects,
-            "persons": persons,
-            "traffic_signs": traffic_signs,
-            "person_count": person_count,
+            "tier": tier,
+            "objects": [],
+            "persons": [],
+            "traffic_signs": [],
+            "person_count": 0,
             "frame_height": frame_height,
             "frame_width": frame_width
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def _box_arrays(boxes, offset=None):
+        """(xyxy, cls, conf) arrays of a result's boxes, shifted by a tile's (x0, y0) origin."""
+        xyxy = boxes.xyxy.cpu().numpy()
+        if offset is not None:
+            xyxy = xyxy + np.array([offset[0], offset[1], offset[0], offset[1]], dtype=xyxy.dtype)
+        return xyxy, boxes.cls.cpu().numpy().astype(np.int64), boxes.conf.cpu().numpy()
+
+    @staticmethod
+    def _box_coords(boxes, result, transform=None):
+        """xyxy coordinates of all boxes in original-frame pixels, as one (N, 4) array."""
+        xyxy = boxes.xyxy.cpu().numpy()
+        if transform is not None:
+            xyxy = unletterbox_boxes(xyxy, transform, (result["frame_height"], result["frame_width"]))
+        return xyxy
+
+    def _parse_general(self, general_result, result, transform=None):
+        """Split one frame's general-model boxes into objects / persons / traffic signs."""
+        boxes = general_result.boxes
+        self._fill_general(result, self._box_coords(boxes, result, transform),
+                           boxes.cls.cpu().numpy(), boxes.conf.cpu().numpy())
+
+    def _parse_traffic(self, traffic_result, result, transform=None):
+        """Append one frame's traffic-model boxes to its traffic signs."""
+        boxes = traffic_result.boxes
+        self._fill_traffic(result, self._box_coords(boxes, result, transform),
+                           boxes.cls.cpu().numpy(), boxes.conf.cpu().numpy())
+
+    def _fill_general(self, result, xyxy, cls, conf):
+        with stage('postprocess', model='yolo:general'):
+            parsed = postprocess_general(
+                xyxy, cls, conf,
+                result["frame_width"],
+                self.classNames,
+                self.real_widths,
+                self.focal_length,
+                self.TRAFFIC_COCO_IDS
+            )
+        result["objects"].extend(parsed["objects"])
+        result["persons"].extend(parsed["persons"])
+        result["traffic_signs"].extend(parsed["traffic_signs"])
+        result["person_count"] += parsed["person_count"]
+
+    def _fill_traffic(self, result, xyxy, cls, conf):
+        with stage('postprocess', model='yolo:traffic'):
+            result["traffic_signs"].extend(postprocess_traffic(
+                xyxy, cls, conf,
+                result["frame_width"],
+                getattr(self.traffic_model, 'names', None),
+                self.focal_length
+            ))
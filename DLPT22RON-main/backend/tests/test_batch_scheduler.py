@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from services.batch_scheduler import BatchScheduler
+
+
+def test_batches_concurrent_items_and_keeps_order():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    scheduler = BatchScheduler(batch_fn, max_batch_size=4, max_wait_ms=200, name='test-order')
+    futures = [scheduler.submit_async(i) for i in range(8)]
+
+    assert [f.result(timeout=5) for f in futures] == [i * 10 for i in range(8)]
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    stats = scheduler.stats()
+    assert stats["batches"] == 2
+    assert stats["items"] == 8
+    assert stats["fill_rate"] == 1.0
+
+
+def test_partial_batch_closes_after_wait_window():
+    scheduler = BatchScheduler(lambda items: items, max_batch_size=64, max_wait_ms=20, name='test-window')
+    started = time.perf_counter()
+    assert scheduler.submit('a', timeout=5) == 'a'
+    assert time.perf_counter() - started < 2.0
+
+
+def test_batch_error_fails_every_waiter():
+    release = threading.Event()
+
+    def batch_fn(items):
+        release.wait(5)
+        raise RuntimeError("model crashed")
+
+    scheduler = BatchScheduler(batch_fn, max_batch_size=3, max_wait_ms=200, name='test-error')
+    futures = [scheduler.submit_async(i) for i in range(3)]
+    release.set()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            future.result(timeout=5)
+    assert scheduler.stats()["errors"] == 1
+
+
+def test_wrong_result_count_fails_every_waiter():
+    scheduler = BatchScheduler(lambda items: items[:1], max_batch_size=2, max_wait_ms=200, name='test-count')
+    futures = [scheduler.submit_async(i) for i in range(2)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="returned 1 results for 2 items"):
+            future.result(timeout=5)
+
+
+def test_exception_result_fails_only_its_item():
+    def batch_fn(items):
+        return [ValueError(f"bad {item}") if item == 'bad' else item.upper() for item in items]
+
+    scheduler = BatchScheduler(batch_fn, max_batch_size=3, max_wait_ms=200, name='test-item-error')
+    futures = [scheduler.submit_async(item) for item in ('a', 'bad', 'c')]
+
+    assert futures[0].result(timeout=5) == 'A'
+    with pytest.raises(ValueError, match="bad bad"):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 'C'
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from services.inference_pool import InferencePool, _Worker
+
+
+class _BrokenConn:
+    def send(self, message):
+        raise OSError("connection reset")
+
+
+@pytest.fixture
+def worker():
+    worker = _Worker(0, None, slots=2, slot_bytes=64)
+    yield worker
+    worker.shm.close()
+    worker.shm.unlink()
+
+
+def test_failed_submit_releases_its_slots(worker):
+    pool = InferencePool(num_workers=1, threads_per_worker=1, slots_per_worker=2, slot_bytes=64)
+    worker.alive = True
+    worker.conn = _BrokenConn()
+    pool._workers = [worker]
+
+    future = pool._submit([np.zeros(16, np.uint8), np.zeros(16, np.uint8)])
+
+    with pytest.raises(OSError, match="connection reset"):
+        future.result(timeout=5)
+    assert sorted(worker.free_slots) == [0, 1]
+    assert worker.pending == {}
+    assert worker.in_flight == 0
+
+
+def test_oversized_frames_do_not_take_slots(worker):
+    pool = InferencePool(num_workers=1, threads_per_worker=1, slots_per_worker=2, slot_bytes=64)
+    worker.alive = True
+    worker.conn = _BrokenConn()
+    pool._workers = [worker]
+
+    future = pool._submit([np.zeros(128, np.uint8)])
+
+    with pytest.raises(OSError):
+        future.result(timeout=5)
+    assert worker.inline_frames == 1
+    assert sorted(worker.free_slots) == [0, 1]
+
+
+def test_release_after_reset_is_ignored(worker):
+    lease = worker.acquire_slots(2)
+    worker.reset_slots()
+    worker.release_slots(lease)
+
+    assert sorted(worker.free_slots) == [0, 1]
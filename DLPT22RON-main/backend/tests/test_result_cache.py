@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from services.result_cache import ResultCache
+
+
+def test_coalesces_concurrent_misses_on_the_same_key():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"value": 42}
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+    owner.start()
+    assert started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+               for _ in range(4)]
+    for thread in waiters:
+        thread.start()
+    # Let the waiters reach the pending future before the owner finishes
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in [owner] + waiters:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_distinct_keys_are_computed_separately():
+    cache = ResultCache()
+    key_a = ResultCache.key_for(b'frame-a')
+    key_b = ResultCache.key_for(b'frame-b')
+
+    assert key_a != key_b
+    assert cache.get_or_compute(key_a, lambda: 'a') == 'a'
+    assert cache.get_or_compute(key_b, lambda: 'b') == 'b'
+    assert cache.get_or_compute(key_a, lambda: 'recomputed') == 'a'
+
+
+def test_error_reaches_waiters_and_is_not_cached():
+    cache = ResultCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("decode failed")
+
+    errors = []
+
+    def lookup():
+        try:
+            cache.get_or_compute('k', fail)
+        except RuntimeError as e:
+            errors.append(e)
+
+    owner = threading.Thread(target=lookup)
+    owner.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=lookup)
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert len(errors) == 2
+    assert cache.get_or_compute('k', lambda: 'ok') == 'ok'
+
+
+def test_entries_expire_and_are_evicted_least_recently_used():
+    cache = ResultCache(max_entries=2, ttl_seconds=0.05)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+
+    time.sleep(0.1)
+    assert cache.get('a') is None
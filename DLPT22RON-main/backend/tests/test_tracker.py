@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+
+from services.tracker import IoUTracker, TrackedDetector, TrackingSessions
+
+
+def _result(objects=(), persons=(), width=640, height=480):
+    return {
+        "objects": [{"label": label, "box": list(box), "confidence": 0.9} for label, box in objects],
+        "persons": [{"label": "person", "box": list(box), "confidence": 0.9} for box in persons],
+        "traffic_signs": [],
+        "person_count": len(persons),
+        "frame_width": width,
+        "frame_height": height,
+    }
+
+
+def test_track_ids_stay_stable_across_detections():
+    tracker = IoUTracker(iou_threshold=0.3)
+    first = tracker.update(_result(objects=[("car", (100, 100, 200, 200))], persons=[(300, 100, 360, 300)]), 0)
+    second = tracker.update(_result(objects=[("car", (105, 102, 205, 202))], persons=[(304, 100, 364, 300)]), 1)
+
+    assert second["objects"][0]["track_id"] == first["objects"][0]["track_id"]
+    assert second["persons"][0]["track_id"] == first["persons"][0]["track_id"]
+    assert second["persons"][0]["label"] == "Person 1"
+    assert first["objects"][0]["track_id"] != first["persons"][0]["track_id"]
+
+
+def test_different_labels_do_not_share_a_track():
+    tracker = IoUTracker(iou_threshold=0.3)
+    first = tracker.update(_result(objects=[("car", (100, 100, 200, 200))]), 0)
+    second = tracker.update(_result(objects=[("truck", (100, 100, 200, 200))]), 1)
+
+    assert second["objects"][0]["track_id"] != first["objects"][0]["track_id"]
+
+
+def test_unmatched_tracks_expire_after_max_missed_rounds():
+    tracker = IoUTracker(iou_threshold=0.3, max_missed=2)
+    first = tracker.update(_result(objects=[("car", (100, 100, 200, 200))]), 0)
+    track_id = first["objects"][0]["track_id"]
+
+    tracker.update(_result(), 1)
+    tracker.update(_result(), 2)
+    assert [t.id for t in tracker.tracks] == [track_id]
+    tracker.update(_result(), 3)
+    assert tracker.tracks == []
+
+    # A car reappearing after expiry is a new track
+    again = tracker.update(_result(objects=[("car", (100, 100, 200, 200))]), 4)
+    assert again["objects"][0]["track_id"] != track_id
+
+
+def test_tracked_detector_propagates_between_detections():
+    detections = []
+    boxes = iter([(100, 100, 200, 200), (120, 100, 220, 200)])
+
+    def detect(frame):
+        detections.append(frame)
+        return _result(objects=[("car", next(boxes))])
+
+    tracked = TrackedDetector(detect, detect_every=3)
+    frame = np.zeros((480, 640, 3), np.uint8)
+    results = [tracked.process(lambda: frame) for _ in range(4)]
+
+    assert len(detections) == 2
+    assert [r["detected"] for r in results] == [True, False, False, True]
+    assert [r["frames_since_detection"] for r in results] == [0, 1, 2, 0]
+    ids = {r["objects"][0]["track_id"] for r in results}
+    assert len(ids) == 1
+    assert results[1]["objects"][0]["predicted"] is True
+    assert results[3]["objects"][0]["predicted"] is False
+
+
+def test_tracked_detector_does_not_decode_propagated_frames():
+    tracked = TrackedDetector(lambda frame: _result(objects=[("car", (100, 100, 200, 200))]), detect_every=5)
+    frame = np.zeros((480, 640, 3), np.uint8)
+    tracked.process(lambda: frame)
+
+    def fail():
+        raise AssertionError("propagated frame was decoded")
+
+    assert tracked.process(fail)["detected"] is False
+
+
+def test_tracking_sessions_expire_idle_streams():
+    sessions = TrackingSessions(lambda: TrackedDetector(lambda frame: _result()), ttl_seconds=60)
+    assert sessions.get('a') is sessions.get('a')
+    assert sessions.get('a') is not sessions.get('b')
+    assert len(sessions) == 2
+
+    sessions = TrackingSessions(lambda: TrackedDetector(lambda frame: _result()), ttl_seconds=0.01)
+    first = sessions.get('a')
+    time.sleep(0.05)
+    assert sessions.get('a') is not first
+    assert len(sessions) == 1
@@ -0,0 +1,127 @@
+import base64
+import binascii
+import cv2
+import numpy as np
+from utils.metrics import stage
+
+ENCODED_IMAGE_TYPES = {'image/jpeg', 'image/jpg', 'image/png', 'image/webp', 'image/bmp'}
+RAW_PIXEL_FORMATS = {'bgr', 'rgb'}
+# Leading bytes of JPEG, PNG and BMP files; WebP is RIFF....WEBP
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'BM')
+
+
+class BadFrame(ValueError):
+    """The request body does not hold a usable frame (a client error, answered with 400)."""
+
+
+@stage('base64_decode')
+def decode_data_url(data_url):
+    """Return the raw image bytes of a `data:image/...;base64,` string."""
+    return base64.b64decode(data_url.split(',')[1])
+
+
+@stage('imdecode')
+def decode_image(image_bytes):
+    """Decode encoded image bytes (JPEG/PNG/...) into a BGR frame, or None if undecodable."""
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+class FramePayload:
+    """A frame as it arrived over HTTP, before decoding.
+
+    `data` holds either encoded image bytes (JPEG/PNG/...) or, when `width`/`height`
+    are set, a raw packed 8-bit BGR or RGB pixel buffer.
+    """
+
+    def __init__(self, data, width=None, height=None, pixel_format=None):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+        self._frame = None
+
+    @property
+    def is_raw(self):
+        return self.width is not None
+
+    def key_parts(self):
+        """Bytes identifying this frame's content, for the result caches."""
+        if self.is_raw:
+            return (self.data, f'{self.width}x{self.height}:{self.pixel_format}'.encode())
+        return (self.data,)
+
+    def check(self):
+        """Raise BadFrame unless the payload can be a frame, without decoding it.
+
+        Raw buffers must match their size; encoded images need a JPEG, PNG, WebP or BMP
+        signature. For callers that do not decode every frame, such as tracking.
+        """
+        if self.is_raw:
+            if len(self.data) != self.width * self.height * 3:
+                raise BadFrame(f"Raw frame is {len(self.data)} bytes, expected {self.width}x{self.height}x3")
+        elif not (self.data.startswith(IMAGE_SIGNATURES) or
+                  (self.data[:4] == b'RIFF' and self.data[8:12] == b'WEBP')):
+            raise BadFrame("Frame is not a JPEG, PNG, WebP or BMP image")
+
+    def decode(self):
+        """Return the BGR frame, or None if the encoded image cannot be decoded (decoded once)."""
+        if self._frame is not None:
+            return self._frame
+        if not self.is_raw:
+            self._frame = decode_image(self.data)
+            return self._frame
+
+        # Raw buffers are wrapped without copying; only RGB input needs a channel swap
+        frame = np.frombuffer(self.data, np.uint8).reshape(self.height, self.width, 3)
+        if self.pixel_format == 'rgb':
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        self._frame = frame
+        return frame
+
+
+@stage('request_parse')
+def read_frame_payload(req):
+    """Extract the frame from a Flask request in any of the supported ingestion formats.
+
+    - JSON `{"frame": "data:image/jpeg;base64,..."}` (original format)
+    - A raw `image/jpeg` (or png/webp/bmp) body
+    - `multipart/form-data` with the image in a `frame` file field
+    - `application/octet-stream` raw pixels with `X-Frame-Width`, `X-Frame-Height`
+      and optional `X-Pixel-Format` (`bgr` default, or `rgb`) headers
+
+    Timed as the `request_parse` stage (which includes `base64_decode` for JSON bodies).
+    Raises BadFrame if the request does not carry a frame in one of these formats.
+    """
+    mimetype = req.mimetype
+
+    if mimetype in ENCODED_IMAGE_TYPES:
+        return FramePayload(req.get_data(cache=False))
+
+    if mimetype == 'multipart/form-data':
+        if 'frame' not in req.files:
+            raise BadFrame("No frame file in request")
+        return FramePayload(req.files['frame'].read())
+
+    if mimetype == 'application/octet-stream':
+        try:
+            width = int(req.headers['X-Frame-Width'])
+            height = int(req.headers['X-Frame-Height'])
+        except (KeyError, ValueError):
+            raise BadFrame("Raw frames need integer X-Frame-Width and X-Frame-Height headers")
+
+        pixel_format = req.headers.get('X-Pixel-Format', 'bgr').lower()
+        if pixel_format not in RAW_PIXEL_FORMATS:
+            raise BadFrame(f"Unsupported X-Pixel-Format: {pixel_format}")
+
+        data = req.get_data(cache=False)
+        if width <= 0 or height <= 0 or len(data) != width * height * 3:
+            raise BadFrame(f"Raw frame is {len(data)} bytes, expected {width}x{height}x3")
+        return FramePayload(data, width, height, pixel_format)
+
+    data = req.get_json(silent=True)
+    try:
+        return FramePayload(decode_data_url(data['frame']))
+    except (TypeError, KeyError, IndexError, AttributeError, binascii.Error):
+        raise BadFrame('Expected a JSON body with a "frame" data URL, an image body, '
+                       'a multipart "frame" file or raw pixels')
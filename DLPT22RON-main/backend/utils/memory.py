@@ -0,0 +1,62 @@
+import os
+import resource
+import sys
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, else the peak as an upper bound)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def smaps_rollup_mb(pid='self'):
+    """Rss / Pss / shared and private pages of a process in MB, from /proc/<pid>/smaps_rollup.
+
+    PSS splits each shared page between the processes mapping it, so summing PSS over
+    the workers of a server gives its real memory use, while summing RSS counts shared
+    weights once per worker.
+    """
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024.0
+    return {
+        "rss_mb": fields.get('Rss', 0.0),
+        "pss_mb": fields.get('Pss', 0.0),
+        "shared_mb": fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0),
+        "private_mb": fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0),
+    }
+
+
+def child_pids(pid):
+    """Direct children of a process (Linux /proc)."""
+    children = []
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may contain spaces; the parent pid follows its closing ')'
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == int(pid):
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return sorted(children)
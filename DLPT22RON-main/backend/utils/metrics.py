@@ -0,0 +1,247 @@
+"""In-process metrics rendered in the Prometheus text exposition format (served at /metrics).
+
+Stages are timed with `stage(name, model=...)`; the Flask route handling the current
+request is added as the `route` label automatically (empty for work done on batch
+scheduler and other background threads, which serve several requests at once).
+Under gunicorn each worker keeps its own metrics, so scrape workers individually or
+sum them on the Prometheus side.
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from utils.memory import current_rss_mb
+
+# Seconds; from sub-millisecond stages (decode, post-processing) to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_route = contextvars.ContextVar('metrics_route', default='')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; `set_function` computes it when scraped instead."""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        """`fn()` returns the value for these labels, or a {label value tuple: value} dict for all of them."""
+        with self._lock:
+            self._functions[self._key(labels)] = fn
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, fn in functions:
+            try:
+                value = fn()
+            except Exception:
+                continue  # a failing callback must not break the scrape
+            if isinstance(value, dict):
+                values.update({tuple(str(v) for v in k): v for k, v in value.items()})
+            elif value is not None:
+                values[key] = value
+        return [(self.name, self._labels(key), value) for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def totals(self):
+        """{label value tuple: (count, sum)} of everything observed so far."""
+        with self._lock:
+            return {key: (count, total) for key, (_, total, count) in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            states = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in states:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", self._labels(key, [('le', _format_value(float(bound)))]),
+                                cumulative))
+            samples.append((f"{self.name}_sum", self._labels(key), total))
+            samples.append((f"{self.name}_count", self._labels(key), count))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'visionguide_request_seconds', 'HTTP request latency by route', ['route', 'method', 'status']))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'visionguide_requests_in_flight', 'Requests being handled (WebSocket streams count while open)', ['route']))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'visionguide_stage_seconds', 'Time per processing stage, by route and model', ['stage', 'route', 'model']))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'visionguide_queue_depth', 'Items waiting in a batch scheduler', ['scheduler']))
+MODEL_STATE = REGISTRY.register(Gauge(
+    'visionguide_model_ready', '1 when a registered model is loaded and warmed up', ['model']))
+MODEL_MEMORY_MB = REGISTRY.register(Gauge(
+    'visionguide_model_rss_delta_mb', 'Process RSS growth while the model loaded', ['model']))
+PROCESS_RSS_MB = REGISTRY.register(Gauge(
+    'visionguide_process_rss_mb', 'Resident set size of this process'))
+PROCESS_RSS_MB.set_function(current_rss_mb)
+
+
+@contextmanager
+def stage(name, model='', route=None):
+    """Time a block as one observation of `name` (route defaults to the current request's)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name, model=model,
+                              route=_route.get() if route is None else route)
+
+
+def observe_stage(name, seconds, model='', route=None):
+    """Record a stage measured elsewhere (e.g. queue wait)."""
+    STAGE_SECONDS.observe(seconds, stage=name, model=model, route=_route.get() if route is None else route)
+
+
+def init_app(app):
+    """Per-request latency, in-flight count and route labels, plus timed JSON serialization."""
+    from flask import g, request
+
+    provider_class = app.json_provider_class
+
+    class TimedJSONProvider(provider_class):
+        def dumps(self, obj, **kwargs):
+            with stage('json_serialize'):
+                return super().dumps(obj, **kwargs)
+
+    app.json_provider_class = TimedJSONProvider
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def _start_request_metrics():
+        route = request.endpoint or 'unmatched'
+        g.metrics_route = route
+        g.metrics_token = _route.set(route)
+        g.metrics_started = time.perf_counter()
+        g.metrics_status = 500
+        REQUESTS_IN_FLIGHT.inc(route=route)
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exc):
+        if 'metrics_started' not in g:
+            return
+        REQUESTS_IN_FLIGHT.dec(route=g.metrics_route)
+        REQUEST_SECONDS.observe(time.perf_counter() - g.metrics_started, route=g.metrics_route,
+                                method=request.method, status=g.metrics_status)
+        try:
+            _route.reset(g.metrics_token)
+        except ValueError:
+            pass  # torn down in another context
+
+
+def render():
+    return REGISTRY.render()
@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+
+# Largest downsampling stride of the YOLO models; input sides must be multiples of it
+STRIDE = 32
+
+
+def letterbox(frame, new_size=640, color=(114, 114, 114), shape=None):
+    """Resize a frame to fit a `new_size` square, padding the rest (same as ultralytics' LetterBox).
+
+    `shape` (height, width) pads to that canvas instead of the square; it must hold the
+    resized frame (see `rect_shape`). Returns the padded image plus the (ratio, pad_x,
+    pad_y) needed to map boxes back.
+    """
+    height, width = frame.shape[:2]
+    canvas_h, canvas_w = shape or (new_size, new_size)
+    ratio = min(new_size / height, new_size / width)
+    resized_w, resized_h = int(round(width * ratio)), int(round(height * ratio))
+
+    if (resized_w, resized_h) != (width, height):
+        frame = cv2.resize(frame, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_x = (canvas_w - resized_w) / 2
+    pad_y = (canvas_h - resized_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    padded = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+
+    return padded, (ratio, left, top)
+
+
+def rect_shape(frames, new_size=640, stride=STRIDE):
+    """Smallest stride-aligned (height, width) canvas that holds every frame resized to fit `new_size`.
+
+    The rectangular padding ultralytics' `predict` uses: a 16:9 frame at 640 becomes
+    384x640 instead of 640x640, about 40% fewer pixels through the backbone.
+    """
+    height = width = 0
+    for frame in frames:
+        h, w = frame.shape[:2]
+        ratio = min(new_size / h, new_size / w)
+        height, width = max(height, int(round(h * ratio))), max(width, int(round(w * ratio)))
+    return -(-height // stride) * stride, -(-width // stride) * stride
+
+
+def letterbox_batch(frames, new_size=640, rect=True):
+    """Letterbox frames onto one common canvas and normalize them in a single batched op.
+
+    The canvas is `rect_shape` when `rect`, else the `new_size` square (models exported at a
+    fixed input size). Returns a float32 RGB BCHW tensor in [0, 1], ready to pass to an
+    ultralytics model, and each frame's transform for `unletterbox_boxes`.
+    """
+    import torch
+
+    shape = rect_shape(frames, new_size) if rect else (new_size, new_size)
+    batch = np.empty((len(frames), shape[0], shape[1], 3), dtype=np.uint8)
+    transforms = []
+    for i, frame in enumerate(frames):
+        batch[i], transform = letterbox(frame, new_size, shape=shape)
+        transforms.append(transform)
+    # BGR HWC uint8 -> RGB CHW float, once for the whole batch
+    tensor = torch.from_numpy(np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2)))
+    return tensor.float().div_(255.0), transforms
+
+
+def unletterbox_boxes(xyxy, transform, frame_shape):
+    """Map xyxy boxes from letterboxed coordinates back onto the original frame."""
+    ratio, pad_x, pad_y = transform
+    height, width = frame_shape[:2]
+    boxes = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4).copy()
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / ratio
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad_y) / ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+    return boxes
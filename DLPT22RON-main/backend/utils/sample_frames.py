@@ -0,0 +1,52 @@
+"""Local sample frames used for INT8 calibration and by the benchmark scripts.
+
+Images come from the repository's `signs/` folder and frames are sampled at a fixed
+stride from the videos in `signs/New folder/`.
+"""
+from pathlib import Path
+
+import cv2
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# The sample images/videos live at the repository root, next to the frontend and backend
+DEFAULT_SIGNS_DIR = BACKEND_DIR.parent.parent / 'signs'
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp'}
+VIDEO_SUFFIXES = {'.mp4', '.avi', '.mov', '.mkv'}
+
+
+def iter_images(signs_dir=DEFAULT_SIGNS_DIR):
+    for path in sorted(Path(signs_dir).glob('*')):
+        if path.suffix.lower() in IMAGE_SUFFIXES:
+            frame = cv2.imread(str(path))
+            if frame is not None:
+                yield path.name, frame
+
+
+def iter_video_frames(video_dir=None, stride=30, max_per_video=None):
+    video_dir = Path(video_dir) if video_dir else DEFAULT_SIGNS_DIR / 'New folder'
+    for path in sorted(video_dir.glob('*')):
+        if path.suffix.lower() not in VIDEO_SUFFIXES:
+            continue
+        cap = cv2.VideoCapture(str(path))
+        frame_idx = taken = 0
+        while cap.grab():
+            if frame_idx % stride == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield f"{path.name}#{frame_idx}", frame
+                taken += 1
+                if max_per_video and taken >= max_per_video:
+                    break
+            frame_idx += 1
+        cap.release()
+
+
+def load_sample_frames(signs_dir=DEFAULT_SIGNS_DIR, stride=30, max_per_video=None, max_frames=None):
+    """List of (name, BGR frame): every image in `signs_dir`, then sampled video frames."""
+    frames = list(iter_images(signs_dir))
+    for item in iter_video_frames(Path(signs_dir) / 'New folder', stride, max_per_video):
+        frames.append(item)
+        if max_frames and len(frames) >= max_frames:
+            break
+    return frames[:max_frames] if max_frames else frames